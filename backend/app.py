@@ -7,30 +7,339 @@
 """
 
 import os
-import json
-from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory, send_file
+import time
+import threading
+from datetime import datetime, timezone
+from flask import Flask, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+from werkzeug.http import is_resource_modified
 import logging
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+from archive import ConfigArchive, VersionNotFound
+from config_store import ConfigStore, ItemNotFound
+from events import ChangeBroadcaster, TooManySubscribers, peer_closed
+from favicon import FaviconResolver, site_origin
+from history import ChangeHistory
+from images import ImageSourceError, ImageUnavailable, ThumbnailService, collect_image_urls
+import codec
+from http_cache import SUPPORTED_ENCODINGS, CachedPayload, CodecJSONProvider
+from items import ID_FIELD, assign_item_ids, new_item_id
+from log_pipeline import install_request_logging, setup_logging
+from metrics import REGISTRY as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE, instrument_app
+from music import MusicMetadataProxy, MusicUpstreamError
+from query import CollectionQuery, QueryError
+from sites import Site, SiteRegistry, SiteSpec, UnknownSite, load_site_specs
+from sqlite_store import SqliteConfigStore
+from static_assets import send_static
+from patch import JSON_PATCH, MERGE_PATCH, PatchConflict, PatchError, escape_pointer, make_json_patch
+from schema import ConfigValidationError, ConfigValidator, expect_object, section_schemas
+
+# 配置日志: 请求线程只入队，后台线程写文件（JSON 行格式，按大小或时间轮转）
+LOG_FILE = os.environ.get('LOG_FILE', '../logs/app.log')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', '7'))
+# 设置后按时间轮转（如 midnight），否则按大小轮转
+LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN') or None
+# 未设置时仅在终端中运行才输出到控制台
+LOG_CONSOLE = os.environ['LOG_CONSOLE'].lower() == 'true' if 'LOG_CONSOLE' in os.environ else None
+LOG_ACCESS = os.environ.get('LOG_ACCESS', 'true').lower() == 'true'
+# 高频只读接口成功请求的访问日志每 N 条记录一条
+LOG_ACCESS_SAMPLE = int(os.environ.get('LOG_ACCESS_SAMPLE', '10'))
+
+log_pipeline = setup_logging(
+    LOG_FILE,
+    level=LOG_LEVEL,
+    json_format=LOG_FORMAT == 'json',
+    console=LOG_CONSOLE,
+    max_bytes=LOG_MAX_BYTES,
+    backup_count=LOG_BACKUP_COUNT,
+    when=LOG_ROTATE_WHEN
 )
 logger = logging.getLogger(__name__)
 
 # 创建Flask应用
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)  # jsonify 和请求体解析使用 codec（安装了 orjson 时更快）
 CORS(app)  # 允许跨域请求
+instrument_app(app)  # 按路由记录请求数、状态码和耗时，见 /api/metrics
+install_request_logging(app, access_log=LOG_ACCESS, sample_every=LOG_ACCESS_SAMPLE)
 
 # 配置
-CONFIG_FILE = '../frontend/public/config.json'
-STATIC_DIR = '../frontend'
+# 配置文件路径（相对 backend/），基准测试等场景可指向其他文件
+CONFIG_FILE = os.environ.get('CONFIG_FILE', '../frontend/public/config.json')
+# 配置存储后端: json 为 config.json + 变更日志；sqlite 为每个项目一行的数据库，
+# 首次启动时从 CONFIG_FILE 导入，修改后定期导出回 CONFIG_FILE
+CONFIG_BACKEND = os.environ.get('CONFIG_BACKEND', 'json').lower()
+CONFIG_DB = os.environ.get('CONFIG_DB', '../data/config.db')
+# SQLite 每次提交的落盘方式: FULL 每次提交都 fsync，NORMAL 只在检查点 fsync（断电可能丢失最近的提交）
+CONFIG_DB_SYNCHRONOUS = os.environ.get('CONFIG_DB_SYNCHRONOUS', 'FULL').upper()
+# config.json 的格式: pretty 为缩进 2 格（便于手工编辑），compact 为紧凑格式（文件更小、加载和写入更快）
+CONFIG_FILE_FORMAT = os.environ.get('CONFIG_FILE_FORMAT', 'pretty').lower()
+# 版本存档: 保存每个已提交的版本（未变化的部分不重复保存），可以比较和回滚；每个站点一个子目录
+CONFIG_SNAPSHOTS = os.environ.get('CONFIG_SNAPSHOTS', 'true').lower() == 'true'
+CONFIG_SNAPSHOT_DIR = os.environ.get('CONFIG_SNAPSHOT_DIR', '../data/history')
+# 保留最近多少个版本，以及最多保留多少天（0 表示不按时间删除）
+CONFIG_SNAPSHOT_KEEP = int(os.environ.get('CONFIG_SNAPSHOT_KEEP', '1000'))
+CONFIG_SNAPSHOT_KEEP_DAYS = float(os.environ.get('CONFIG_SNAPSHOT_KEEP_DAYS', '0'))
+# 多站点托管: 站点清单（JSON），设置后按请求的 Host 选择站点的配置文件、静态文件和管理密码，
+# CONFIG_FILE 不再使用；未设置时所有请求都使用 CONFIG_FILE 这一个站点
+SITES_FILE = os.environ.get('SITES_FILE') or None
+# 同时加载的站点数上限（LRU），以及站点空闲多久（秒）后卸载，0 表示不按空闲时间卸载
+SITES_MAX_LOADED = int(os.environ.get('SITES_MAX_LOADED', '32'))
+SITES_IDLE_TIMEOUT = float(os.environ.get('SITES_IDLE_TIMEOUT', '600'))
+# 启动时预热的读取接口（逗号分隔）: 加载站点后预先生成这些响应的序列化和压缩结果
+WARMUP_PATHS = [path.strip() for path in os.environ.get(
+    'WARMUP_PATHS',
+    '/api/config,/api/profile,/api/contact,/api/skills,/api/projects,'
+    '/api/friendlinks,/api/sociallinks,/api/music,/api/background'
+).split(',') if path.strip()]
+# 配置缓存的 stat 校验间隔（秒），期间读请求直接使用内存中的配置
+CONFIG_STAT_TTL = float(os.environ.get('CONFIG_STAT_TTL', '1.0'))
+# 变更日志组提交的等待窗口（秒），窗口内的并发修改共用一次 fsync
+CONFIG_COMMIT_DELAY = float(os.environ.get('CONFIG_COMMIT_DELAY', '0.002'))
+# 变更日志空闲多久（秒）或累计多少条记录后合并回 config.json
+CONFIG_COMPACT_INTERVAL = float(os.environ.get('CONFIG_COMPACT_INTERVAL', '5'))
+CONFIG_COMPACT_MAX_RECORDS = int(os.environ.get('CONFIG_COMPACT_MAX_RECORDS', '200'))
+# SSE 变更推送: 单个连接最长存活时间（秒）、订阅者上限、每个订阅者的事件队列长度
+CONFIG_STREAM_LIFETIME = float(os.environ.get('CONFIG_STREAM_LIFETIME', '300'))
+# 每个推送连接占用一个服务线程（THREADS，见 serve.py），订阅者上限按进程计算（所有站点合计），
+# 默认比线程数少 2 并且最多为线程数减 1，普通请求和存活检查始终有空闲线程
+SERVER_THREADS = int(os.environ.get('THREADS', '8'))
+CONFIG_STREAM_MAX_SUBSCRIBERS = max(0, min(
+    int(os.environ.get('CONFIG_STREAM_MAX_SUBSCRIBERS', str(max(SERVER_THREADS - 2, 1)))),
+    SERVER_THREADS - 1
+))
+CONFIG_STREAM_QUEUE_SIZE = int(os.environ.get('CONFIG_STREAM_QUEUE_SIZE', '64'))
+# 后台监视配置文件的变化（inotify，不可用时轮询），关闭后由读请求按 CONFIG_STAT_TTL 校验
+CONFIG_WATCH = os.environ.get('CONFIG_WATCH', 'true').lower() == 'true'
+CONFIG_WATCH_INTERVAL = float(os.environ.get('CONFIG_WATCH_INTERVAL', '2'))
+# 运行时缓存目录（图标解析结果等）
+CACHE_DIR = os.environ.get('CACHE_DIR', '../cache')
+# 访问第三方地址（网站图标、歌曲信息、远程图片）时不做公网地址检查的域名、IP 或网段，逗号分隔，
+# 如本地测试用的替身服务 127.0.0.1；默认拒绝本机、内网、链路本地和保留地址
+OUTBOUND_ALLOW_HOSTS = [host for host in os.environ.get('OUTBOUND_ALLOW_HOSTS', '').split(',') if host.strip()]
+# 图标兜底服务，逗号分隔，{domain} 替换为站点域名；设为空字符串则不使用
+FAVICON_SERVICES = os.environ.get('FAVICON_SERVICES', 'https://www.google.com/s2/favicons?domain={domain}&sz=64')
+# 歌曲信息上游接口，地址中含 {id} 时替换，否则把歌曲 ID 拼接在末尾
+MUSIC_API_BASE = os.environ.get('MUSIC_API_BASE', 'https://api.paugram.com/netease/?id=')
+MUSIC_CACHE_TTL = float(os.environ.get('MUSIC_CACHE_TTL', '86400'))
+# 一次批量请求最多获取多少首歌
+MUSIC_MAX_BATCH = int(os.environ.get('MUSIC_MAX_BATCH', '100'))
+# 缩略图磁盘缓存上限（MB）和渲染线程数
+IMAGE_CACHE_MAX_MB = int(os.environ.get('IMAGE_CACHE_MAX_MB', '256'))
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+# 多进程部署时各工作进程的指标写到这个目录，/api/metrics 合并后导出
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(CACHE_DIR, 'metrics'))
+# 内存中保留多少个最近版本的差异，供 /api/config/changes 增量同步
+CONFIG_HISTORY_SIZE = int(os.environ.get('CONFIG_HISTORY_SIZE', '256'))
+# 写接口的请求体大小上限（KB）: 整体保存 / 补丁、单个配置部分、单个项目
+CONFIG_MAX_BODY_KB = int(os.environ.get('CONFIG_MAX_BODY_KB', '4096'))
+SECTION_MAX_BODY_KB = int(os.environ.get('SECTION_MAX_BODY_KB', '256'))
+ITEM_MAX_BODY_KB = int(os.environ.get('ITEM_MAX_BODY_KB', '32'))
+# 技能、项目、友链、社交链接各自最多的项目数；一次 JSON Patch 最多的操作数
+CONFIG_MAX_ITEMS = int(os.environ.get('CONFIG_MAX_ITEMS', '1000'))
+PATCH_MAX_OPS = int(os.environ.get('PATCH_MAX_OPS', '1000'))
+
+# 未登记的写接口按单个项目的上限处理
+BODY_LIMITS = {
+    'save_config': CONFIG_MAX_BODY_KB,
+    'patch_config': CONFIG_MAX_BODY_KB,
+    'handle_profile': SECTION_MAX_BODY_KB,
+    'handle_contact': SECTION_MAX_BODY_KB,
+    'handle_sociallinks': SECTION_MAX_BODY_KB,
+    'handle_music': SECTION_MAX_BODY_KB,
+    'handle_background': SECTION_MAX_BODY_KB,
+}
+# 超过最大的上限时 Werkzeug 在读取请求体时直接拒绝（没有 Content-Length 的分块请求也有效）
+app.config['MAX_CONTENT_LENGTH'] = max([CONFIG_MAX_BODY_KB, SECTION_MAX_BODY_KB, ITEM_MAX_BODY_KB]) * 1024
+
+# 各配置部分的结构在启动时编译一次，所有写入在提交前校验
+config_validator = ConfigValidator(section_schemas(max_items=CONFIG_MAX_ITEMS))
+
+
+# 所有站点的推送连接共用本进程的连接名额
+stream_slots = threading.BoundedSemaphore(CONFIG_STREAM_MAX_SUBSCRIBERS)
+
+
+def create_site(spec):
+    """创建站点的配置存储，并把变更推送和变更历史注册为它的回调"""
+    if CONFIG_BACKEND == 'sqlite':
+        store = SqliteConfigStore(
+            spec.db or os.path.join(os.path.dirname(CONFIG_DB), f'{spec.name}.db'),
+            stat_ttl=CONFIG_STAT_TTL,
+            export_path=spec.config_file,
+            export_interval=CONFIG_COMPACT_INTERVAL,
+            synchronous=CONFIG_DB_SYNCHRONOUS,
+            pretty=CONFIG_FILE_FORMAT != 'compact',
+            normalize=assign_item_ids,
+            validate=config_validator
+        )
+    else:
+        store = ConfigStore(
+            spec.config_file,
+            stat_ttl=CONFIG_STAT_TTL,
+            commit_delay=CONFIG_COMMIT_DELAY,
+            compact_interval=CONFIG_COMPACT_INTERVAL,
+            compact_max_records=CONFIG_COMPACT_MAX_RECORDS,
+            pretty=CONFIG_FILE_FORMAT != 'compact',
+            normalize=assign_item_ids,
+            validate=config_validator
+        )
+
+    # 配置每次提交新版本都推送给 /api/config/stream 的订阅者
+    broadcaster = ChangeBroadcaster(
+        queue_size=CONFIG_STREAM_QUEUE_SIZE,
+        poll_interval=CONFIG_STAT_TTL,
+        max_lifetime=CONFIG_STREAM_LIFETIME,
+        max_subscribers=CONFIG_STREAM_MAX_SUBSCRIBERS,
+        slots=stream_slots
+    )
+    store.add_listener(broadcaster.publish)
+
+    # 记录每个版本的差异，所有写入接口都经过配置存储，无需单独登记
+    history = ChangeHistory(size=CONFIG_HISTORY_SIZE)
+    store.add_listener(history.record)
+
+    # 每个版本写入存档（后台线程），误操作后可以回滚
+    archive = None
+    if CONFIG_SNAPSHOTS:
+        archive = ConfigArchive(
+            os.path.join(CONFIG_SNAPSHOT_DIR, spec.name),
+            keep=CONFIG_SNAPSHOT_KEEP,
+            keep_days=CONFIG_SNAPSHOT_KEEP_DAYS
+        )
+        store.add_listener(archive.record)
+
+    if CONFIG_BACKEND == 'sqlite':
+        # 一次性迁移: 数据库为空时导入 config.json，已有数据时不做任何事。
+        # 必须在注册回调之后执行，导入（或首次读取）的版本才会推送给订阅者并写入存档
+        store.import_json(spec.config_file)
+    return Site(spec, store, broadcaster, history, archive)
+
+
+if SITES_FILE:
+    site_specs, default_site = load_site_specs(SITES_FILE)
+else:
+    site_specs = {'default': SiteSpec('default', config_file=CONFIG_FILE, db=CONFIG_DB,
+                                      password_env='ADMIN_PASSWORD')}
+    default_site = 'default'
+
+site_registry = SiteRegistry(
+    site_specs,
+    create_site,
+    default=default_site,
+    max_loaded=SITES_MAX_LOADED,
+    idle_timeout=SITES_IDLE_TIMEOUT
+)
+
+
+def current_site():
+    """当前请求所属的站点（由 resolve_site 在请求开始时确定）"""
+    return g.site
+
+
+def start_config_watcher():
+    """在当前进程中启动配置文件监视线程（多进程部署时每个工作进程各启动一个）"""
+    if CONFIG_WATCH:
+        site_registry.watch(CONFIG_WATCH_INTERVAL)
+
+
+def start_metrics_sharing():
+    """多进程部署时在每个工作进程中调用，定期写出本进程的指标供其他进程合并"""
+    metrics_registry.share(METRICS_DIR)
+
+
+# 就绪状态: 预热完成后就绪；工作进程开始平滑退出后不再就绪
+_ready = threading.Event()
+_warmup_ms = None
+_drain_check = None
+
+
+def warm_up():
+    """加载站点并预先生成 WARMUP_PATHS 的响应（解析配置、序列化、各种压缩），完成后标记为就绪
+
+    多进程部署时在工作进程开始接受连接之前调用（见 serve.py），新进程收到的第一个请求就命中缓存。
+    默认站点最先加载，最多加载 SITES_MAX_LOADED 个站点。
+    """
+    global _warmup_ms
+    started = time.perf_counter()
+    names = sorted(site_specs, key=lambda name: name != default_site)[:SITES_MAX_LOADED]
+    for name in names:
+        try:
+            site = site_registry.load(name)
+            for path in WARMUP_PATHS:
+                for encoding in ('identity',) + SUPPORTED_ENCODINGS:
+                    # 直接调用视图函数，不经过请求钩子，预热请求不计入运行指标和访问日志
+                    with app.test_request_context(path, headers={'Accept-Encoding': encoding}):
+                        g.site = site
+                        app.dispatch_request()
+        except Exception as e:
+            logger.error(f"❌ 预热站点 {name} 失败: {e}")
+    _warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+    _ready.set()
+    logger.info(f"🔥 预热完成: {len(names)} 个站点，{_warmup_ms} ms")
+
+
+def set_drain_check(check):
+    """多进程部署时由 serve.py 传入 check()，返回 True 表示本工作进程正在平滑退出"""
+    global _drain_check
+    _drain_check = check
+
+
+def is_draining():
+    return _drain_check is not None and _drain_check()
+
+
+def is_ready():
+    return _ready.is_set() and not is_draining()
+
+
+def _site_snapshot_attrs(name):
+    values = {}
+    for site in site_registry.loaded:
+        snapshot = site.store.current
+        if snapshot is not None:
+            values[(site.name,)] = getattr(snapshot, name)
+    return values
+
+
+metrics_registry.gauge('homepage_config_version', '当前配置版本号', labelnames=('site',),
+                       function=lambda: _site_snapshot_attrs('version'), multiprocess_mode='max')
+metrics_registry.gauge('homepage_config_journal_records', '尚未合并进 config.json 的变更记录数',
+                       labelnames=('site',), function=lambda: _site_snapshot_attrs('journal_records'),
+                       multiprocess_mode='max')
+metrics_registry.gauge('homepage_config_stream_subscribers', '配置变更推送的订阅者数',
+                       function=lambda: sum(site.broadcaster.subscriber_count for site in site_registry.loaded))
+metrics_registry.gauge('homepage_sites_loaded', '已加载的站点数',
+                       function=lambda: len(site_registry.loaded))
+
+
+# 服务端解析网站图标，结果缓存到磁盘
+favicon_resolver = FaviconResolver(
+    os.path.join(CACHE_DIR, 'favicons.json'),
+    services=[service for service in FAVICON_SERVICES.split(',') if service.strip()],
+    allow_hosts=OUTBOUND_ALLOW_HOSTS
+)
+
+# 服务端获取并缓存歌曲信息，访客不再直接请求音乐接口
+music_proxy = MusicMetadataProxy(
+    os.path.join(CACHE_DIR, 'music.json'),
+    api_base=MUSIC_API_BASE,
+    ttl=MUSIC_CACHE_TTL,
+    allow_hosts=OUTBOUND_ALLOW_HOSTS
+)
+
+# 背景图片等大图的缩略图，源图可以是站点目录下的文件或配置中引用的远程图片
+# （站内图片在请求所属站点的静态文件目录中查找）
+thumbnail_service = ThumbnailService(
+    os.path.join(CACHE_DIR, 'images'),
+    local_roots=(),
+    max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024,
+    max_workers=IMAGE_WORKERS,
+    allow_hosts=OUTBOUND_ALLOW_HOSTS
+)
 
 
 class ConfigManager:
@@ -38,31 +347,28 @@ class ConfigManager:
 
     @staticmethod
     def load_config():
-        """加载配置文件"""
-        try:
-            if not os.path.exists(CONFIG_FILE):
-                logger.warning(f"⚠️ 配置文件不存在: {CONFIG_FILE}")
-                return None
+        """加载配置文件
 
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            logger.info("📖 配置文件读取成功")
-            return config
-        except Exception as e:
-            logger.error(f"❌ 读取配置文件失败: {e}")
-            return None
+        返回进程内共享的缓存对象，调用方不得原地修改，
+        需要修改时请使用当前站点存储的 transaction()。
+        """
+        snapshot = current_site().store.snapshot()
+        return snapshot.config if snapshot is not None else None
+
+    @staticmethod
+    def get_snapshot():
+        """获取当前配置快照（含版本信息），文件不存在或读取失败时返回 None"""
+        return current_site().store.snapshot()
 
     @staticmethod
     def save_config(config_data):
         """保存完整配置文件"""
         try:
-            # 验证数据
-            if not isinstance(config_data, dict):
-                raise ValueError("配置数据必须是字典格式")
+            # 验证数据（各部分的结构由配置存储在写入前校验）
+            expect_object(config_data, '')
 
-            # 保存新配置
-            with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=2)
+            # 保存新配置（临时文件 + 原子重命名）
+            current_site().store.write(config_data)
 
             logger.info("💾 配置文件已更新")
             return True
@@ -70,16 +376,50 @@ class ConfigManager:
             logger.error(f"❌ 保存配置文件失败: {e}")
             raise
 
+    @staticmethod
+    def patch_config(patch_format, patch):
+        """以一次写入原子地应用补丁（JSON Patch 或 JSON Merge Patch），返回新版本号"""
+        try:
+            _, version = current_site().store.mutate({'op': 'patch', 'format': patch_format, 'patch': patch})
+            logger.info(f"🩹 配置补丁已应用，当前版本 {version}")
+            return version
+        except Exception as e:
+            logger.error(f"❌ 应用配置补丁失败: {e}")
+            raise
+
+    @staticmethod
+    def rollback(ref):
+        """把配置恢复为存档中的某个版本，返回 (存档记录, 新版本号)
+
+        配置存储仍是唯一的数据来源，所以回滚不是把“当前版本”指针移到存档上，
+        而是把与存档内容不同的部分作为一个 JSON Patch 提交为新版本（经过校验、写入变更日志、推送给订阅者）。
+        开销与变化的部分成正比: 只读取和写入这些部分，不重新序列化整个配置，也不立即重写 config.json
+        （由后台合并）。与存档完全相同时不产生新版本。比较之后并发修改的其他部分保持修改后的内容。
+        """
+        try:
+            site = current_site()
+            entry = site.archive.find(ref)
+            snapshot = site.store.snapshot()
+            changed, removed = site.archive.restore_sections(entry['snapshot'], snapshot.config if snapshot else {})
+            ops = [{'op': 'add', 'path': '/' + escape_pointer(name), 'value': value}
+                   for name, value in changed.items()]
+            ops += [{'op': 'remove', 'path': '/' + escape_pointer(name)} for name in removed]
+            if not ops:
+                logger.info(f"⏪ 当前配置与 v{entry['version']} 相同，无需回滚")
+                return entry, snapshot.version
+            _, version = site.store.mutate({'op': 'patch', 'format': JSON_PATCH, 'patch': ops})
+            logger.info(f"⏪ 配置已回滚到 v{entry['version']}（{entry['snapshot'][:12]}），"
+                        f"恢复 {len(ops)} 个部分，当前版本 {version}")
+            return entry, version
+        except Exception as e:
+            logger.error(f"❌ 回滚配置到 {ref} 失败: {e}")
+            raise
+
     @staticmethod
     def update_section(section, data):
         """更新配置文件的某个部分"""
         try:
-            config = ConfigManager.load_config()
-            if config is None:
-                config = {}
-
-            config[section] = data
-            ConfigManager.save_config(config)
+            current_site().store.mutate({'op': 'set', 'section': section, 'value': data})
             logger.info(f"💾 配置部分 '{section}' 已更新")
             return True
         except Exception as e:
@@ -100,22 +440,13 @@ class ConfigManager:
 
     @staticmethod
     def add_item_to_array(section, item):
-        """向数组类型的配置部分添加项目"""
+        """向数组类型的配置部分添加项目，返回服务端分配的项目 ID"""
         try:
-            config = ConfigManager.load_config()
-            if config is None:
-                config = {}
-
-            if section not in config:
-                config[section] = []
-
-            if not isinstance(config[section], list):
-                raise ValueError(f"配置部分 '{section}' 不是数组类型")
-
-            config[section].append(item)
-            ConfigManager.save_config(config)
-            logger.info(f"➕ 向 '{section}' 添加项目成功")
-            return True
+            expect_object(item, section)
+            item = dict(item, **{ID_FIELD: new_item_id(section)})
+            current_site().store.mutate({'op': 'append', 'section': section, 'value': item})
+            logger.info(f"➕ 向 '{section}' 添加项目 {item[ID_FIELD]} 成功")
+            return item[ID_FIELD]
         except Exception as e:
             logger.error(f"❌ 向 '{section}' 添加项目失败: {e}")
             raise
@@ -124,18 +455,7 @@ class ConfigManager:
     def update_item_in_array(section, index, item):
         """更新数组类型配置部分的某个项目"""
         try:
-            config = ConfigManager.load_config()
-            if config is None or section not in config:
-                raise ValueError(f"配置部分 '{section}' 不存在")
-
-            if not isinstance(config[section], list):
-                raise ValueError(f"配置部分 '{section}' 不是数组类型")
-
-            if index < 0 or index >= len(config[section]):
-                raise ValueError(f"索引 {index} 超出范围")
-
-            config[section][index] = item
-            ConfigManager.save_config(config)
+            current_site().store.mutate({'op': 'replace', 'section': section, 'index': index, 'value': item})
             logger.info(f"✏️ 更新 '{section}' 索引 {index} 的项目成功")
             return True
         except Exception as e:
@@ -143,21 +463,39 @@ class ConfigManager:
             raise
 
     @staticmethod
-    def delete_item_from_array(section, index):
-        """从数组类型的配置部分删除项目"""
-        try:
-            config = ConfigManager.load_config()
-            if config is None or section not in config:
-                raise ValueError(f"配置部分 '{section}' 不存在")
+    def get_item(section, item_id):
+        """按 ID 获取数组类型配置部分的项目，不存在时返回 None"""
+        snapshot = current_site().store.snapshot()
+        return snapshot.get_item(section, item_id) if snapshot is not None else None
 
-            if not isinstance(config[section], list):
-                raise ValueError(f"配置部分 '{section}' 不是数组类型")
+    @staticmethod
+    def update_item_by_id(section, item_id, item):
+        """按 ID 更新数组类型配置部分的项目"""
+        try:
+            current_site().store.mutate({'op': 'replace', 'section': section, ID_FIELD: item_id,
+                                 'value': dict(item, **{ID_FIELD: item_id})})
+            logger.info(f"✏️ 更新 '{section}' 的项目 {item_id} 成功")
+            return True
+        except Exception as e:
+            logger.error(f"❌ 更新 '{section}' 的项目 {item_id} 失败: {e}")
+            raise
 
-            if index < 0 or index >= len(config[section]):
-                raise ValueError(f"索引 {index} 超出范围")
+    @staticmethod
+    def delete_item_by_id(section, item_id):
+        """按 ID 删除数组类型配置部分的项目，返回被删除的项目"""
+        try:
+            deleted_item, _ = current_site().store.mutate({'op': 'delete', 'section': section, ID_FIELD: item_id})
+            logger.info(f"🗑️ 从 '{section}' 删除项目 {item_id} 成功")
+            return deleted_item
+        except Exception as e:
+            logger.error(f"❌ 从 '{section}' 删除项目 {item_id} 失败: {e}")
+            raise
 
-            deleted_item = config[section].pop(index)
-            ConfigManager.save_config(config)
+    @staticmethod
+    def delete_item_from_array(section, index):
+        """从数组类型的配置部分删除项目"""
+        try:
+            deleted_item, _ = current_site().store.mutate({'op': 'delete', 'section': section, 'index': index})
             logger.info(f"🗑️ 从 '{section}' 删除索引 {index} 的项目成功")
             return deleted_item
         except Exception as e:
@@ -165,24 +503,145 @@ class ConfigManager:
             raise
 
 
+def config_response(snapshot, section, message, default=None, query=None):
+    """返回配置读取响应
+
+    响应体按配置版本预先序列化并缓存（含 gzip / brotli 压缩版本），
+    附带 ETag / Last-Modified 校验头，客户端缓存仍然有效时直接返回 304 空响应。
+    section 为 None 时返回完整配置。
+    带查询参数（分页、过滤、投影）时只序列化当前页，不缓存。
+    """
+    if snapshot is None:
+        return jsonify({
+            'success': True,
+            'data': default,
+            'message': message
+        })
+
+    if query is not None:
+        page, paging = query.run(snapshot, section)
+        payload = CachedPayload(dict({
+            'success': True,
+            'data': page,
+            'message': message
+        }, **paging))
+    else:
+        payload = snapshot.derive(('payload', section), lambda: CachedPayload(dict({
+            'success': True,
+            'data': snapshot.section(section, default),
+            'message': message
+        }, **({'version': snapshot.version} if section is None else {}))))
+    return payload_response(snapshot, payload)
+
+
+def payload_response(snapshot, payload):
+    """按 Accept-Encoding 返回预序列化的响应体，并处理条件请求"""
+    encoding, body, etag = payload.negotiate(request.accept_encodings)
+    last_modified = datetime.fromtimestamp(snapshot.mtime, timezone.utc)
+
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = app.response_class(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    else:
+        response = app.response_class(status=304)
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # 允许浏览器和代理缓存，但每次使用前都需要重新验证
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def default_admin_password():
+    """站点没有单独设置密码时使用环境变量 ADMIN_PASSWORD，如果没有设置则使用默认值"""
+    return os.getenv('ADMIN_PASSWORD', 'LongDz6299')
+
+
+def is_admin_request():
+    """请求头 X-Admin-Password 为当前站点的管理密码时返回 True
+
+    用于公开接口中会绕过缓存、直接访问第三方服务的选项（如 refresh=1）。
+    """
+    password = request.headers.get('X-Admin-Password')
+    site = current_site()
+    return bool(password) and site is not None and site.spec.check_password(password, default_admin_password())
+
+
+def admin_required_response(message):
+    return jsonify({
+        'success': False,
+        'error': '需要管理密码',
+        'message': message
+    }), 403
+
+
+def validation_error_response(e):
+    """配置校验失败: details 中逐条列出出错的字段路径、错误类型和说明"""
+    return jsonify({
+        'success': False,
+        'error': '配置数据校验失败',
+        'message': str(e),
+        'details': e.errors
+    }), 400
+
+
+@app.before_request
+def resolve_site():
+    """按请求的 Host 确定站点；健康检查和运行指标不属于任何站点"""
+    if request.endpoint in ('liveness_check', 'readiness_check'):
+        # 存活和就绪检查不加载站点，只反映进程本身的状态
+        g.site = None
+        return None
+    try:
+        g.site = site_registry.get(request.host)
+    except UnknownSite as e:
+        g.site = None
+        if request.endpoint in ('health_check', 'get_metrics'):
+            return None
+        logger.warning(f"⚠️ {e}")
+        return jsonify({
+            'success': False,
+            'error': '站点不存在',
+            'message': str(e)
+        }), 404
+    return None
+
+
+@app.before_request
+def check_body_size():
+    """在解析 JSON 之前按接口检查请求体大小"""
+    if request.method not in ('POST', 'PUT', 'PATCH'):
+        return None
+    limit = BODY_LIMITS.get(request.endpoint, ITEM_MAX_BODY_KB) * 1024
+    length = request.content_length
+    if length is None:
+        # 分块上传: 先读入请求体（受 MAX_CONTENT_LENGTH 限制），再按实际大小判断
+        length = len(request.get_data(cache=True))
+    if length > limit:
+        return jsonify({
+            'success': False,
+            'error': '请求体过大',
+            'message': f'请求体 {length} 字节，超过该接口的上限 {limit} 字节'
+        }), 413
+    return None
+
+
 # API路由
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """获取配置信息"""
     try:
-        config = ConfigManager.load_config()
-        if config is None:
+        snapshot = ConfigManager.get_snapshot()
+        if snapshot is None:
             return jsonify({
                 'success': False,
                 'error': '配置文件不存在或读取失败',
                 'message': 'config.json文件未找到或格式错误'
             }), 404
-        
-        return jsonify({
-            'success': True,
-            'data': config,
-            'message': '配置加载成功'
-        })
+
+        return config_response(snapshot, None, '配置加载成功')
     except Exception as e:
         logger.error(f"获取配置失败: {e}")
         return jsonify({
@@ -192,6 +651,101 @@ def get_config():
         }), 500
 
 
+@app.route('/api/config/stream', methods=['GET'])
+def stream_config_changes():
+    """以 Server-Sent Events 推送配置变更
+
+    每提交一个新版本推送一条 change 事件（版本号和变化的配置部分），
+    断线重连时根据 Last-Event-ID 补发错过的事件。
+    """
+    try:
+        last_event_id = request.headers.get('Last-Event-ID', type=int)
+        # 先校验一次配置文件，确保订阅时的版本是最新的
+        ConfigManager.get_snapshot()
+        broadcaster = current_site().broadcaster
+        subscription, backlog = broadcaster.subscribe(last_event_id)
+    except TooManySubscribers as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify({
+            'success': False,
+            'error': '订阅者过多',
+            'message': str(e)
+        }), 503
+    except Exception as e:
+        logger.error(f"订阅配置变更失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '订阅配置变更失败',
+            'message': str(e)
+        }), 500
+
+    # 工作进程平滑退出时结束推送，客户端按 retry 重连到新的工作进程；客户端断开后立即归还线程
+    sock = request.environ.get('gunicorn.socket') or request.environ.get('werkzeug.socket')
+    stream = broadcaster.stream(subscription, backlog, poll=ConfigManager.get_snapshot,
+                                stop=lambda: is_draining() or (sock is not None and peer_closed(sock)))
+    response = app.response_class(stream_with_context(stream), mimetype='text/event-stream')
+    # 客户端在消息流开始之前断开时生成器不会执行，也要归还连接名额
+    response.call_on_close(lambda: broadcaster.unsubscribe(subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    # 关闭 nginx 对该响应的缓冲，事件才能立即送达
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/config/changes', methods=['GET'])
+def get_config_changes():
+    """增量同步: 返回自 since 版本以来的修改
+
+    since 仍在保留范围内时返回 JSON Patch 操作列表（full 为 false），
+    否则返回完整配置（full 为 true）。
+    """
+    try:
+        since = request.args.get('since', type=int)
+        if since is None:
+            return jsonify({
+                'success': False,
+                'error': '无效的请求参数',
+                'message': '请提供整数类型的 since 版本号'
+            }), 400
+
+        snapshot = ConfigManager.get_snapshot()
+        if snapshot is None:
+            return jsonify({
+                'success': False,
+                'error': '配置文件不存在或读取失败',
+                'message': 'config.json文件未找到或格式错误'
+            }), 404
+
+        ops = current_site().history.changes_since(since, snapshot)
+        if ops is None:
+            # 所有过期的 since 共用同一份完整配置响应
+            payload = snapshot.derive(('changes', None, None), lambda: CachedPayload({
+                'success': True,
+                'full': True,
+                'version': snapshot.version,
+                'data': snapshot.config,
+                'message': '版本已过期，返回完整配置'
+            }))
+        else:
+            # 有效的 since 取值受历史长度限制，按 (since, 当前版本) 缓存
+            payload = snapshot.derive(('changes', None, since), lambda: CachedPayload({
+                'success': True,
+                'full': False,
+                'since': since,
+                'version': snapshot.version,
+                'ops': ops,
+                'message': '增量修改获取成功'
+            }))
+        return payload_response(snapshot, payload)
+    except Exception as e:
+        logger.error(f"获取增量修改失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '获取增量修改失败',
+            'message': str(e)
+        }), 500
+
+
 @app.route('/api/config', methods=['POST'])
 def save_config():
     """保存配置信息"""
@@ -213,6 +767,8 @@ def save_config():
             'message': '配置保存成功！',
             'timestamp': datetime.now().isoformat()
         })
+    except ConfigValidationError as e:
+        return validation_error_response(e)
     except Exception as e:
         logger.error(f"保存配置失败: {e}")
         return jsonify({
@@ -222,6 +778,205 @@ def save_config():
         }), 500
 
 
+@app.route('/api/config', methods=['PATCH'])
+def patch_config():
+    """批量修改配置
+
+    Content-Type 为 application/merge-patch+json 时按 JSON Merge Patch 处理，
+    否则按 JSON Patch 操作数组处理。所有操作在一次写入中原子生效。
+    """
+    try:
+        if request.mimetype == 'application/merge-patch+json':
+            patch_format = MERGE_PATCH
+        else:
+            patch_format = JSON_PATCH
+
+        patch = request.get_json(force=True, silent=True)
+        if patch is None:
+            return jsonify({
+                'success': False,
+                'error': '无效的请求数据',
+                'message': '请提供有效的JSON Patch或JSON Merge Patch文档'
+            }), 400
+        if patch_format == JSON_PATCH and isinstance(patch, list) and len(patch) > PATCH_MAX_OPS:
+            return jsonify({
+                'success': False,
+                'error': '无效的补丁文档',
+                'message': f'一次最多 {PATCH_MAX_OPS} 个操作，实际 {len(patch)} 个'
+            }), 400
+
+        version = ConfigManager.patch_config(patch_format, patch)
+        return jsonify({
+            'success': True,
+            'message': '配置更新成功',
+            'version': version,
+            'timestamp': datetime.now().isoformat()
+        })
+    except PatchConflict as e:
+        return jsonify({
+            'success': False,
+            'error': '补丁无法应用到当前配置',
+            'message': str(e)
+        }), 409
+    except PatchError as e:
+        return jsonify({
+            'success': False,
+            'error': '无效的补丁文档',
+            'message': str(e)
+        }), 400
+    except ConfigValidationError as e:
+        return validation_error_response(e)
+    except Exception as e:
+        logger.error(f"修改配置失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '修改配置失败',
+            'message': str(e)
+        }), 500
+
+
+def archive_unavailable_response():
+    return jsonify({
+        'success': False,
+        'error': '版本存档未启用',
+        'message': '设置 CONFIG_SNAPSHOTS=true 后保存每个版本'
+    }), 501
+
+
+def version_not_found_response(e):
+    return jsonify({
+        'success': False,
+        'error': '版本不存在',
+        'message': str(e)
+    }), 404
+
+
+@app.route('/api/config/versions', methods=['GET'])
+def list_config_versions():
+    """列出存档中的版本（从新到旧），支持 offset / limit 分页"""
+    try:
+        archive = current_site().archive
+        if archive is None:
+            return archive_unavailable_response()
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        entries = archive.entries()
+        total = len(entries)
+        page = entries[max(total - offset - limit, 0):max(total - offset, 0)]
+        return jsonify({
+            'success': True,
+            'data': page[::-1],
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'message': '版本列表获取成功'
+        })
+    except Exception as e:
+        logger.error(f"获取版本列表失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '获取版本列表失败',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/config/versions/diff', methods=['GET'])
+def diff_config_versions():
+    """比较两个版本: from / to 为快照 ID 或 v<版本号>，to 省略时与当前配置比较"""
+    try:
+        archive = current_site().archive
+        if archive is None:
+            return archive_unavailable_response()
+        ref_from = request.args.get('from', '').strip()
+        ref_to = request.args.get('to', '').strip() or 'current'
+        if not ref_from:
+            return jsonify({
+                'success': False,
+                'error': '无效的请求参数',
+                'message': '请提供 from 版本（快照 ID 或 v<版本号>）'
+            }), 400
+
+        entry_from = archive.find(ref_from)
+        old = archive.load(entry_from['snapshot'])
+        if ref_to == 'current':
+            snapshot = ConfigManager.get_snapshot()
+            entry_to, new = {'version': snapshot.version if snapshot else None}, ConfigManager.load_config() or {}
+        else:
+            entry_to = archive.find(ref_to)
+            new = archive.load(entry_to['snapshot'])
+
+        ops = make_json_patch(old, new)
+        return jsonify({
+            'success': True,
+            'from': entry_from,
+            'to': entry_to,
+            'sections': sorted({op['path'].split('/')[1] for op in ops if op['path']}),
+            'ops': ops,
+            'message': '版本比较成功'
+        })
+    except VersionNotFound as e:
+        return version_not_found_response(e)
+    except Exception as e:
+        logger.error(f"比较版本失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '比较版本失败',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/config/versions/<ref>', methods=['GET'])
+def get_config_version(ref):
+    """获取存档中某个版本的完整配置"""
+    try:
+        archive = current_site().archive
+        if archive is None:
+            return archive_unavailable_response()
+        entry = archive.find(ref)
+        return jsonify({
+            'success': True,
+            'data': archive.load(entry['snapshot']),
+            'entry': entry,
+            'message': '版本获取成功'
+        })
+    except VersionNotFound as e:
+        return version_not_found_response(e)
+    except Exception as e:
+        logger.error(f"获取版本 {ref} 失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '获取版本失败',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/config/versions/<ref>/rollback', methods=['POST'])
+def rollback_config(ref):
+    """回滚到存档中的某个版本（作为新版本提交，之后仍可再回滚回来）"""
+    try:
+        if current_site().archive is None:
+            return archive_unavailable_response()
+        entry, version = ConfigManager.rollback(ref)
+        return jsonify({
+            'success': True,
+            'message': f"已回滚到版本 v{entry['version']}",
+            'version': version,
+            'restored': entry,
+            'timestamp': datetime.now().isoformat()
+        })
+    except VersionNotFound as e:
+        return version_not_found_response(e)
+    except ConfigValidationError as e:
+        return validation_error_response(e)
+    except Exception as e:
+        logger.error(f"回滚配置失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '回滚配置失败',
+            'message': str(e)
+        }), 500
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """健康检查"""
@@ -229,11 +984,46 @@ def health_check():
         'success': True,
         'message': '服务运行正常',
         'timestamp': datetime.now().isoformat(),
-        'config_exists': os.path.exists(CONFIG_FILE),
+        'site': g.site.name if g.site is not None else None,
+        'config_exists': g.site is not None and os.path.exists(g.site.spec.config_file),
+        'json_codec': codec.BACKEND,
+        'ready': is_ready(),
         'version': '2.0.0'
     })
 
 
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """存活检查: 进程能处理请求即返回 200，不访问配置"""
+    return jsonify({
+        'success': True,
+        'status': 'alive',
+        'pid': os.getpid(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """就绪检查: 预热完成且没有在平滑退出时返回 200，否则返回 503"""
+    ready = is_ready()
+    return jsonify({
+        'success': ready,
+        'status': 'ready' if ready else ('draining' if is_draining() else 'warming'),
+        'pid': os.getpid(),
+        'warmup_ms': _warmup_ms,
+        'sites_loaded': len(site_registry.loaded),
+        'timestamp': datetime.now().isoformat()
+    }), 200 if ready else 503
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """以 Prometheus 文本格式导出运行指标"""
+    return metrics_registry.render(), 200, {'Content-Type': METRICS_CONTENT_TYPE,
+                                            'Cache-Control': 'no-store'}
+
+
 @app.route('/api/login', methods=['POST'])
 def login():
     """登录验证"""
@@ -246,10 +1036,7 @@ def login():
             }), 400
 
         password = data['password']
-        # 从环境变量读取密码，如果没有设置则使用默认值
-        correct_password = os.getenv('ADMIN_PASSWORD', 'LongDz6299')
-
-        if password == correct_password:
+        if isinstance(password, str) and current_site().spec.check_password(password, default_admin_password()):
             logger.info("✅ 用户登录成功")
             return jsonify({
                 'success': True,
@@ -277,12 +1064,8 @@ def handle_profile():
     """处理个人信息"""
     if request.method == 'GET':
         try:
-            profile = ConfigManager.get_section('profile')
-            return jsonify({
-                'success': True,
-                'data': profile,
-                'message': '个人信息获取成功'
-            })
+            return config_response(ConfigManager.get_snapshot(), 'profile',
+                                   '个人信息获取成功')
         except Exception as e:
             logger.error(f"获取个人信息失败: {e}")
             return jsonify({
@@ -307,6 +1090,8 @@ def handle_profile():
                 'message': '个人信息更新成功',
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"更新个人信息失败: {e}")
             return jsonify({
@@ -321,12 +1106,8 @@ def handle_contact():
     """处理联系信息"""
     if request.method == 'GET':
         try:
-            contact = ConfigManager.get_section('contact')
-            return jsonify({
-                'success': True,
-                'data': contact,
-                'message': '联系信息获取成功'
-            })
+            return config_response(ConfigManager.get_snapshot(), 'contact',
+                                   '联系信息获取成功')
         except Exception as e:
             logger.error(f"获取联系信息失败: {e}")
             return jsonify({
@@ -351,6 +1132,8 @@ def handle_contact():
                 'message': '联系信息更新成功',
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"更新联系信息失败: {e}")
             return jsonify({
@@ -365,12 +1148,15 @@ def handle_skills():
     """处理技能列表"""
     if request.method == 'GET':
         try:
-            skills = ConfigManager.get_section('skills')
+            return config_response(ConfigManager.get_snapshot(), 'skills',
+                                   '技能列表获取成功', default=[],
+                                   query=CollectionQuery.parse(request.args))
+        except QueryError as e:
             return jsonify({
-                'success': True,
-                'data': skills or [],
-                'message': '技能列表获取成功'
-            })
+                'success': False,
+                'error': '无效的查询参数',
+                'message': str(e)
+            }), 400
         except Exception as e:
             logger.error(f"获取技能列表失败: {e}")
             return jsonify({
@@ -389,12 +1175,15 @@ def handle_skills():
                     'message': '请提供技能名称'
                 }), 400
 
-            ConfigManager.add_item_to_array('skills', skill_data)
+            item_id = ConfigManager.add_item_to_array('skills', skill_data)
             return jsonify({
                 'success': True,
                 'message': '技能添加成功',
+                'data': {'id': item_id},
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"添加技能失败: {e}")
             return jsonify({
@@ -423,6 +1212,8 @@ def handle_skill_item(index):
                 'message': f'技能 {index} 更新成功',
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"更新技能失败: {e}")
             return jsonify({
@@ -454,12 +1245,15 @@ def handle_projects():
     """处理项目列表"""
     if request.method == 'GET':
         try:
-            projects = ConfigManager.get_section('projects')
+            return config_response(ConfigManager.get_snapshot(), 'projects',
+                                   '项目列表获取成功', default=[],
+                                   query=CollectionQuery.parse(request.args))
+        except QueryError as e:
             return jsonify({
-                'success': True,
-                'data': projects or [],
-                'message': '项目列表获取成功'
-            })
+                'success': False,
+                'error': '无效的查询参数',
+                'message': str(e)
+            }), 400
         except Exception as e:
             logger.error(f"获取项目列表失败: {e}")
             return jsonify({
@@ -478,12 +1272,15 @@ def handle_projects():
                     'message': '请提供项目名称'
                 }), 400
 
-            ConfigManager.add_item_to_array('projects', project_data)
+            item_id = ConfigManager.add_item_to_array('projects', project_data)
             return jsonify({
                 'success': True,
                 'message': '项目添加成功',
+                'data': {'id': item_id},
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"添加项目失败: {e}")
             return jsonify({
@@ -512,6 +1309,8 @@ def handle_project_item(index):
                 'message': f'项目 {index} 更新成功',
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"更新项目失败: {e}")
             return jsonify({
@@ -543,12 +1342,15 @@ def handle_friendlinks():
     """处理友情链接列表"""
     if request.method == 'GET':
         try:
-            friendlinks = ConfigManager.get_section('friendLinks')
+            return config_response(ConfigManager.get_snapshot(), 'friendLinks',
+                                   '友情链接列表获取成功', default=[],
+                                   query=CollectionQuery.parse(request.args))
+        except QueryError as e:
             return jsonify({
-                'success': True,
-                'data': friendlinks or [],
-                'message': '友情链接列表获取成功'
-            })
+                'success': False,
+                'error': '无效的查询参数',
+                'message': str(e)
+            }), 400
         except Exception as e:
             logger.error(f"获取友情链接列表失败: {e}")
             return jsonify({
@@ -567,12 +1369,15 @@ def handle_friendlinks():
                     'message': '请提供友情链接名称'
                 }), 400
 
-            ConfigManager.add_item_to_array('friendLinks', friendlink_data)
+            item_id = ConfigManager.add_item_to_array('friendLinks', friendlink_data)
             return jsonify({
                 'success': True,
                 'message': '友情链接添加成功',
+                'data': {'id': item_id},
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"添加友情链接失败: {e}")
             return jsonify({
@@ -601,6 +1406,8 @@ def handle_friendlink_item(index):
                 'message': f'友情链接 {index} 更新成功',
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"更新友情链接失败: {e}")
             return jsonify({
@@ -632,12 +1439,8 @@ def handle_sociallinks():
     """处理社交链接"""
     if request.method == 'GET':
         try:
-            sociallinks = ConfigManager.get_section('socialLinks')
-            return jsonify({
-                'success': True,
-                'data': sociallinks or [],
-                'message': '社交链接获取成功'
-            })
+            return config_response(ConfigManager.get_snapshot(), 'socialLinks',
+                                   '社交链接获取成功', default=[])
         except Exception as e:
             logger.error(f"获取社交链接失败: {e}")
             return jsonify({
@@ -662,6 +1465,8 @@ def handle_sociallinks():
                 'message': '社交链接更新成功',
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"更新社交链接失败: {e}")
             return jsonify({
@@ -671,17 +1476,118 @@ def handle_sociallinks():
             }), 500
 
 
-@app.route('/api/music', methods=['GET', 'PUT'])
-def handle_music():
-    """处理音乐配置"""
+def handle_collection_item(section, item_id, label):
+    """按 ID 获取、更新或删除数组类型配置部分中的单个项目"""
     if request.method == 'GET':
         try:
-            music = ConfigManager.get_section('music')
+            item = ConfigManager.get_item(section, item_id)
+            if item is None:
+                return jsonify({
+                    'success': False,
+                    'error': f'{label}不存在',
+                    'message': f'项目 {item_id} 不存在'
+                }), 404
+            return jsonify({
+                'success': True,
+                'data': item,
+                'message': f'{label}获取成功'
+            })
+        except Exception as e:
+            logger.error(f"获取{label}失败: {e}")
+            return jsonify({
+                'success': False,
+                'error': f'获取{label}失败',
+                'message': str(e)
+            }), 500
+
+    elif request.method == 'PUT':
+        try:
+            item_data = request.get_json()
+            if not item_data or not isinstance(item_data, dict):
+                return jsonify({
+                    'success': False,
+                    'error': '无效的请求数据',
+                    'message': f'请提供{label}数据'
+                }), 400
+
+            ConfigManager.update_item_by_id(section, item_id, item_data)
             return jsonify({
                 'success': True,
-                'data': music,
-                'message': '音乐配置获取成功'
+                'message': f'{label} {item_id} 更新成功',
+                'timestamp': datetime.now().isoformat()
             })
+        except ItemNotFound as e:
+            return jsonify({
+                'success': False,
+                'error': f'{label}不存在',
+                'message': str(e)
+            }), 404
+        except ConfigValidationError as e:
+            return validation_error_response(e)
+        except Exception as e:
+            logger.error(f"更新{label}失败: {e}")
+            return jsonify({
+                'success': False,
+                'error': f'更新{label}失败',
+                'message': str(e)
+            }), 500
+
+    elif request.method == 'DELETE':
+        try:
+            deleted_item = ConfigManager.delete_item_by_id(section, item_id)
+            return jsonify({
+                'success': True,
+                'message': f'{label}删除成功',
+                'data': deleted_item,
+                'timestamp': datetime.now().isoformat()
+            })
+        except ItemNotFound as e:
+            return jsonify({
+                'success': False,
+                'error': f'{label}不存在',
+                'message': str(e)
+            }), 404
+        except Exception as e:
+            logger.error(f"删除{label}失败: {e}")
+            return jsonify({
+                'success': False,
+                'error': f'删除{label}失败',
+                'message': str(e)
+            }), 500
+
+
+# 按 ID 访问单个项目（数字路径仍按数组下标处理，ID 带有字母前缀不会与之冲突）
+@app.route('/api/skills/<item_id>', methods=['GET', 'PUT', 'DELETE'])
+def handle_skill_by_id(item_id):
+    """按 ID 处理单个技能"""
+    return handle_collection_item('skills', item_id, '技能')
+
+
+@app.route('/api/projects/<item_id>', methods=['GET', 'PUT', 'DELETE'])
+def handle_project_by_id(item_id):
+    """按 ID 处理单个项目"""
+    return handle_collection_item('projects', item_id, '项目')
+
+
+@app.route('/api/friendlinks/<item_id>', methods=['GET', 'PUT', 'DELETE'])
+def handle_friendlink_by_id(item_id):
+    """按 ID 处理单个友情链接"""
+    return handle_collection_item('friendLinks', item_id, '友情链接')
+
+
+@app.route('/api/sociallinks/<item_id>', methods=['GET', 'PUT', 'DELETE'])
+def handle_sociallink_by_id(item_id):
+    """按 ID 处理单个社交链接"""
+    return handle_collection_item('socialLinks', item_id, '社交链接')
+
+
+@app.route('/api/music', methods=['GET', 'PUT'])
+def handle_music():
+    """处理音乐配置"""
+    if request.method == 'GET':
+        try:
+            return config_response(ConfigManager.get_snapshot(), 'music',
+                                   '音乐配置获取成功')
         except Exception as e:
             logger.error(f"获取音乐配置失败: {e}")
             return jsonify({
@@ -706,6 +1612,8 @@ def handle_music():
                 'message': '音乐配置更新成功',
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"更新音乐配置失败: {e}")
             return jsonify({
@@ -715,17 +1623,114 @@ def handle_music():
             }), 500
 
 
+def configured_song_ids(snapshot):
+    """配置中的当前歌曲和歌单，访客只能查询这些歌曲"""
+    music = (snapshot.section('music', {}) if snapshot else None) or {}
+    song_ids = {str(song_id).strip() for song_id in music.get('playlist') or []}
+    if music.get('currentSongId'):
+        song_ids.add(str(music['currentSongId']).strip())
+    return song_ids
+
+
+def music_access_error(song_ids, refresh):
+    """访客查询配置之外的歌曲或使用 refresh=1 时返回 403 响应，否则返回 None
+
+    否则任何人都可以借服务端无限制地访问音乐接口，缓存也就失去了作用。
+    """
+    if is_admin_request():
+        return None
+    if refresh:
+        return admin_required_response('refresh=1 需要管理密码（X-Admin-Password 请求头）')
+    snapshot = ConfigManager.get_snapshot()
+    allowed = snapshot.derive(('music-ids', None), lambda: configured_song_ids(snapshot)) if snapshot else set()
+    if any(str(song_id).strip() not in allowed for song_id in song_ids):
+        return admin_required_response('只能查询音乐配置中的歌曲，查询其他歌曲需要管理密码')
+    return None
+
+
+@app.route('/api/music/track/<song_id>', methods=['GET'])
+def get_music_track(song_id):
+    """获取单首歌曲的信息；配置之外的歌曲和 refresh=1（忽略缓存重新请求上游）需要管理密码"""
+    try:
+        refresh = request.args.get('refresh') == '1'
+        denied = music_access_error([song_id], refresh)
+        if denied is not None:
+            return denied
+        track, cached = music_proxy.track(song_id, refresh=refresh)
+        return jsonify({
+            'success': True,
+            'data': dict(track, cached=cached),
+            'message': '歌曲信息获取成功'
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': '无效的歌曲 ID',
+            'message': str(e)
+        }), 400
+    except MusicUpstreamError as e:
+        return jsonify({
+            'success': False,
+            'error': '音乐接口不可用',
+            'message': str(e)
+        }), 502
+    except Exception as e:
+        logger.error(f"获取歌曲信息失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '获取歌曲信息失败',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/music/playlist', methods=['GET'])
+def get_music_playlist():
+    """一次返回歌单中所有歌曲的信息，ids=1,2,3 时获取指定的歌曲（配置之外的歌曲需要管理密码）"""
+    try:
+        refresh = request.args.get('refresh') == '1'
+        music = {}
+        if request.args.get('ids'):
+            song_ids = [song_id for song_id in request.args['ids'].split(',') if song_id.strip()]
+        else:
+            snapshot = ConfigManager.get_snapshot()
+            music = (snapshot.section('music', {}) if snapshot else None) or {}
+            song_ids = list(music.get('playlist') or [])
+
+        if len(song_ids) > MUSIC_MAX_BATCH:
+            return jsonify({
+                'success': False,
+                'error': '无效的请求参数',
+                'message': f'一次最多获取 {MUSIC_MAX_BATCH} 首歌曲'
+            }), 400
+
+        denied = music_access_error(song_ids, refresh)
+        if denied is not None:
+            return denied
+        tracks = music_proxy.tracks(song_ids, refresh=refresh)
+        return jsonify({
+            'success': True,
+            'data': {
+                'currentSongId': music.get('currentSongId'),
+                'tracks': tracks
+            },
+            'message': f'已获取 {len(tracks)} 首歌曲的信息'
+        })
+    except Exception as e:
+        logger.error(f"批量获取歌曲信息失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '批量获取歌曲信息失败',
+            'message': str(e)
+        }), 500
+
+
 @app.route('/api/background', methods=['GET', 'PUT'])
 def handle_background():
     """处理背景配置"""
     if request.method == 'GET':
         try:
-            background = ConfigManager.get_section('background')
-            return jsonify({
-                'success': True,
-                'data': background,
-                'message': '背景配置获取成功'
-            })
+            return config_response(ConfigManager.get_snapshot(), 'background',
+                                   '背景配置获取成功')
         except Exception as e:
             logger.error(f"获取背景配置失败: {e}")
             return jsonify({
@@ -750,6 +1755,8 @@ def handle_background():
                 'message': '背景配置更新成功',
                 'timestamp': datetime.now().isoformat()
             })
+        except ConfigValidationError as e:
+            return validation_error_response(e)
         except Exception as e:
             logger.error(f"更新背景配置失败: {e}")
             return jsonify({
@@ -759,23 +1766,193 @@ def handle_background():
             }), 500
 
 
+# ==================== 网站图标 API ====================
+
+# 带网站图标的配置部分（项目和友情链接的 url 字段）
+FAVICON_SECTIONS = ('projects', 'friendLinks')
+
+
+def configured_site_urls(snapshot):
+    """[(部分名, 项目, 网站地址)]: 配置中需要显示图标的网站"""
+    items = []
+    for section in FAVICON_SECTIONS:
+        for item in (snapshot.section(section, []) if snapshot else []):
+            url = item.get('url') if isinstance(item, dict) else None
+            if url and url != '#':
+                items.append((section, item, url))
+    return items
+
+
+def configured_site_origins(snapshot):
+    """配置中网站的根地址，访客只能解析这些网站的图标"""
+    origins = set()
+    for _, _, url in configured_site_urls(snapshot):
+        try:
+            origins.add(site_origin(url))
+        except ValueError:
+            continue
+    return origins
+
+
+def favicon_access_error(url, refresh):
+    """访客解析配置之外的网站或使用 refresh=1 时返回 403 响应，否则返回 None
+
+    每次解析都会同时探测目标网站的多个路径，不加限制时任何人都能借服务端向任意主机发起请求。
+    """
+    if is_admin_request():
+        return None
+    if refresh:
+        return admin_required_response('refresh=1 需要管理密码（X-Admin-Password 请求头）')
+    snapshot = ConfigManager.get_snapshot()
+    allowed = snapshot.derive(('favicon-origins', None),
+                              lambda: configured_site_origins(snapshot)) if snapshot else set()
+    if site_origin(url) not in allowed:
+        return admin_required_response('只能解析配置中项目和友情链接的图标，解析其他网站需要管理密码')
+    return None
+
+
+@app.route('/api/favicon', methods=['GET'])
+def get_favicon():
+    """解析单个网站的图标地址；配置之外的网站和 refresh=1（忽略缓存重新探测）需要管理密码"""
+    try:
+        refresh = request.args.get('refresh') == '1'
+        url = request.args.get('url', '').strip()
+        if not url:
+            return jsonify({
+                'success': False,
+                'error': '无效的请求参数',
+                'message': '请提供网站地址 url'
+            }), 400
+        denied = favicon_access_error(url, refresh)
+        if denied is not None:
+            return denied
+
+        result = favicon_resolver.resolve(url, refresh=refresh)
+        return jsonify({
+            'success': True,
+            'data': result,
+            'message': '图标获取成功' if result['icon'] else '未找到网站图标'
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': '无效的网站地址',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"获取网站图标失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '获取网站图标失败',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/favicon/all', methods=['GET'])
+def get_all_favicons():
+    """一次性解析所有项目和友情链接的图标，refresh=1 时全部重新探测（需要管理密码）"""
+    try:
+        refresh = request.args.get('refresh') == '1'
+        if refresh and not is_admin_request():
+            return admin_required_response('refresh=1 需要管理密码（X-Admin-Password 请求头）')
+        items = configured_site_urls(ConfigManager.get_snapshot())
+        results = favicon_resolver.resolve_many([url for _, _, url in items], refresh=refresh)
+        return jsonify({
+            'success': True,
+            'data': [dict(result, section=section, id=item.get(ID_FIELD), name=item.get('name'), url=url)
+                     for (section, item, url), result in zip(items, results)],
+            'message': f'已解析 {len(items)} 个网站的图标'
+        })
+    except Exception as e:
+        logger.error(f"批量获取网站图标失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '批量获取网站图标失败',
+            'message': str(e)
+        }), 500
+
+
+# ==================== 图片缩略图 API ====================
+
+@app.route('/api/image', methods=['GET'])
+def get_image_thumbnail():
+    """返回图片的缩略图，w 向上取整到标准宽度，format 省略时按 Accept 选择 WebP 或 JPEG
+
+    refresh=1 重新下载远程原图，需要管理密码。
+    """
+    try:
+        refresh = request.args.get('refresh') == '1'
+        if refresh and not is_admin_request():
+            return admin_required_response('refresh=1 需要管理密码（X-Admin-Password 请求头）')
+        src = request.args.get('src', '').strip()
+        try:
+            width = int(request.args.get('w', '640'))
+        except ValueError:
+            width = 0
+        if not src or width <= 0:
+            return jsonify({
+                'success': False,
+                'error': '无效的请求参数',
+                'message': '请提供图片地址 src 和正整数宽度 w'
+            }), 400
+
+        fmt = request.args.get('format')
+        if not fmt:
+            # 只认显式声明的 image/webp，*/* 不代表浏览器能解码 WebP
+            webp = any(mimetype == 'image/webp' and quality > 0
+                       for mimetype, quality in request.accept_mimetypes)
+            fmt = 'webp' if webp else 'jpeg'
+
+        snapshot = ConfigManager.get_snapshot()
+        allowed = snapshot.derive(('image-sources', None),
+                                  lambda: collect_image_urls(snapshot.config)) if snapshot else set()
+        path, mimetype, etag = thumbnail_service.thumbnail(
+            src, width, fmt.lower(), allowed, refresh=refresh,
+            local_roots=current_site().spec.static_roots)
+
+        response = send_file(path, mimetype=mimetype, etag=etag, max_age=86400, conditional=True)
+        response.cache_control.public = True
+        if not request.args.get('format'):
+            response.vary.add('Accept')
+        return response
+    except ImageUnavailable as e:
+        return jsonify({
+            'success': False,
+            'error': '缩略图功能不可用',
+            'message': str(e)
+        }), 501
+    except ImageSourceError as e:
+        return jsonify({
+            'success': False,
+            'error': '无法生成缩略图',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"生成缩略图失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '生成缩略图失败',
+            'message': str(e)
+        }), 500
+
+
 # 静态文件路由
 @app.route('/')
 def index():
     """主页"""
-    return send_file('../frontend/index.html')
+    return send_static(current_site().spec.static_dir, 'index.html', request.accept_encodings)
 
 
 @app.route('/admin')
 def admin():
     """管理后台"""
-    return send_file('../frontend/admin.html')
+    return send_static(current_site().spec.static_dir, 'admin.html', request.accept_encodings)
 
 
 @app.route('/<path:filename>')
 def static_files(filename):
     """静态文件服务"""
-    return send_from_directory(STATIC_DIR, filename)
+    return send_static(current_site().spec.static_dir, filename, request.accept_encodings)
 
 
 # 错误处理
@@ -788,6 +1965,15 @@ def not_found(error):
     }), 404
 
 
+@app.errorhandler(413)
+def request_too_large(error):
+    return jsonify({
+        'success': False,
+        'error': '请求体过大',
+        'message': f'请求体超过上限 {app.config["MAX_CONTENT_LENGTH"]} 字节'
+    }), 413
+
+
 @app.errorhandler(500)
 def internal_error(error):
     return jsonify({
@@ -805,23 +1991,44 @@ if __name__ == '__main__':
     print("🚀 个人主页配置管理系统 v2.1 启动中...")
     print(f"📍 主页地址: http://localhost:{port}")
     print(f"🔧 管理后台: http://localhost:{port}/admin")
-    print(f"📁 配置文件: {os.path.abspath(CONFIG_FILE)}")
+    if SITES_FILE:
+        print(f"🌐 站点清单: {os.path.abspath(SITES_FILE)}（{len(site_specs)} 个站点）")
+    else:
+        print(f"📁 配置文件: {os.path.abspath(CONFIG_FILE)}")
+        if CONFIG_BACKEND == 'sqlite':
+            print(f"🗄️ 配置数据库: {os.path.abspath(CONFIG_DB)}")
+    print(f"📝 日志文件: {os.path.abspath(LOG_FILE)}")
     print("\n🔧 API端点:")
     print(f"   GET  /api/config         - 读取完整配置")
     print(f"   POST /api/config         - 保存完整配置")
+    print(f"   PATCH /api/config        - 批量修改配置 (JSON Patch / Merge Patch)")
+    print(f"   GET  /api/config/stream  - 配置变更推送 (Server-Sent Events)")
+    print(f"   GET  /api/config/changes?since=<版本> - 增量同步")
+    print(f"   GET  /api/config/versions - 版本存档列表")
+    print(f"   GET  /api/config/versions/diff?from=&to= - 比较两个版本")
+    print(f"   POST /api/config/versions/<版本>/rollback - 回滚到指定版本")
     print(f"   POST /api/login          - 登录验证")
     print(f"   GET  /api/health         - 健康检查")
+    print(f"   GET  /api/health/live    - 存活检查")
+    print(f"   GET  /api/health/ready   - 就绪检查（预热完成后返回 200）")
+    print(f"   GET  /api/metrics        - 运行指标 (Prometheus)")
+    print(f"   GET  /api/favicon?url=   - 解析网站图标")
+    print(f"   GET  /api/favicon/all    - 批量解析项目和友链图标")
+    print(f"   GET  /api/image?src=&w=  - 图片缩略图 (WebP/JPEG)")
     print(f"\n📋 细粒度CRUD API:")
     print(f"   GET/PUT  /api/profile    - 个人信息")
     print(f"   GET/PUT  /api/contact    - 联系信息")
-    print(f"   GET/POST /api/skills     - 技能列表")
-    print(f"   PUT/DEL  /api/skills/<id> - 单个技能")
+    print(f"   GET/POST /api/skills     - 技能列表 (支持 offset/limit/cursor/prefix/filter/fields)")
+    print(f"   GET/PUT/DEL /api/skills/<id> - 单个技能（数字路径按下标）")
     print(f"   GET/POST /api/projects   - 项目列表")
-    print(f"   PUT/DEL  /api/projects/<id> - 单个项目")
+    print(f"   GET/PUT/DEL /api/projects/<id> - 单个项目（数字路径按下标）")
     print(f"   GET/POST /api/friendlinks - 友情链接")
-    print(f"   PUT/DEL  /api/friendlinks/<id> - 单个友链")
+    print(f"   GET/PUT/DEL /api/friendlinks/<id> - 单个友链（数字路径按下标）")
     print(f"   GET/PUT  /api/sociallinks - 社交链接")
+    print(f"   GET/PUT/DEL /api/sociallinks/<id> - 单个社交链接")
     print(f"   GET/PUT  /api/music      - 音乐配置")
+    print(f"   GET  /api/music/track/<id> - 单首歌曲信息（服务端缓存）")
+    print(f"   GET  /api/music/playlist - 歌单中所有歌曲的信息")
     print(f"   GET/PUT  /api/background - 背景配置")
     print("\n💡 使用说明:")
     print(f"   1. 访问主页: http://localhost:{port}")
@@ -829,6 +2036,9 @@ if __name__ == '__main__':
     print(f"   3. 使用细粒度API进行精确的数据管理!")
     print(f"   4. 每个页面都有独立的保存按钮，只更新对应数据!")
     
+    start_config_watcher()
+    warm_up()
+
     # 启动应用
     app.run(
         host='0.0.0.0',
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置版本存档
+功能: 保存配置的每一个已提交版本，可以列出、比较任意两个版本，并回滚到其中任意一个
+
+目录结构（每个站点一个目录）:
+    objects/ab/<sha1>     一个配置部分的内容（紧凑 JSON，zlib 压缩），以内容的 sha1 命名
+    snapshots/<sha1>      一个版本由哪些部分组成: [[部分名, 内容 sha1], ...]，以自身内容的 sha1 命名
+    log.jsonl             版本记录，每行 {"seq", "version", "snapshot", "time", "changed"}
+    lock                  写入和清理时的跨进程文件锁
+
+- 内容寻址: 没有变化的部分不重复保存，只改了一个部分的版本只新增这一部分和一个很小的快照文件；
+  回滚到旧版本或改回原样时连快照文件也不新增
+- 写入在后台线程中进行，不拖慢配置提交；多个工作进程重复记录同一个版本时只保留一条
+- 读取任意版本只需读一个快照文件和它引用的部分（已解析的部分按内容缓存），与历史长度无关
+- 保留策略: 最多保留最近 keep 条记录，并删除早于 keep_days 天的记录（0 表示不按时间删除）；
+  超出后清理日志，并删除不再被引用的快照和内容（标记-清除）
+
+用法:
+    python3 archive.py list  --dir ../data/history/default
+    python3 archive.py stats --dir ../data/history/default
+    python3 archive.py gc    --dir ../data/history/default --keep 1000
+"""
+
+import os
+import zlib
+import time
+import queue
+import atexit
+import hashlib
+import argparse
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import codec
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，仅保留进程内锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 判断重复记录时向前比较的记录数（多个工作进程会各自记录同一个版本）
+DEDUPE_WINDOW = 16
+# zlib 压缩级别: 3 比默认的 6 快约 2.5 倍，体积只大约 15%
+COMPRESS_LEVEL = 3
+
+
+class VersionNotFound(LookupError):
+    """存档中没有该版本"""
+
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+class ConfigArchive:
+    """内容寻址的配置版本存档，record 可直接注册为配置存储的快照回调"""
+
+    def __init__(self, directory, keep=1000, keep_days=0, cache_size=256):
+        self.directory = directory
+        self.keep = max(1, keep)
+        self.keep_days = keep_days
+        self.cache_size = cache_size
+        self.lock_path = os.path.join(directory, 'lock')
+        self.log_path = os.path.join(directory, 'log.jsonl')
+        # 内存中的版本记录，按文件的 (inode, 偏移) 增量读取
+        self._entries = []
+        # 快照 sha1 / 'v<版本号>' -> 最近的一条记录
+        self._index = {}
+        self._log_key = None
+        self._log_lock = threading.Lock()
+        # 内容 sha1 -> 解析后的部分（只读，多个版本共享同一对象）
+        self._objects = OrderedDict()
+        self._objects_lock = threading.Lock()
+        # 上一次记录的各部分: id(值) -> (值, sha1)，未变化的部分不再重新序列化
+        self._hashes = {}
+        self._queue = queue.Queue()
+        self._writer = None
+        self._closed = threading.Event()
+        self._writer_lock = threading.Lock()
+        self._process_lock = threading.Lock()
+
+    # ---------- 记录 ----------
+
+    def record(self, snapshot, previous=None):
+        """配置存储发布新快照时调用（在存储的加载锁内执行，只入队）"""
+        if self._closed.is_set() or (previous is not None and snapshot.config is previous.config):
+            return
+        self._queue.put(snapshot)
+        self._ensure_writer()
+
+    def _ensure_writer(self):
+        """按需启动后台写入线程（首次记录时启动，确保在工作进程内运行）"""
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name='config-archive', daemon=True)
+            self._writer.start()
+            # 进程正常退出（包括工作进程被平滑重启）时先写完队列中的版本
+            atexit.register(self.close)
+
+    def _write_loop(self):
+        while True:
+            snapshot = self._queue.get()
+            if snapshot is None:
+                return
+            try:
+                self.save(snapshot.config, snapshot.version)
+            except Exception as e:
+                logger.error(f"❌ 保存配置版本 {snapshot.version} 失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout=10.0):
+        """等待已入队的版本写完（用于测试和关闭前）"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            if self._writer is None or not self._writer.is_alive():
+                break
+            time.sleep(0.01)
+
+    def close(self):
+        """写完队列中的版本后停止后台线程"""
+        self._closed.set()
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10.0)
+
+    def _section_hashes(self, config):
+        """返回 [(部分名, sha1, 值, 序列化结果或 None)]；与上一次记录相同的部分不重新序列化"""
+        sections = []
+        hashes = {}
+        for name, value in config.items():
+            known = self._hashes.get(id(value))
+            if known is not None and known[0] is value:
+                digest, data = known[1], None
+            else:
+                data = codec.dumps(value)
+                digest = _sha1(data)
+            hashes[id(value)] = (value, digest)
+            sections.append((name, digest, value, data))
+        self._hashes = hashes
+        return sections
+
+    def save(self, config, version):
+        """保存一个版本，返回快照 sha1；与最近记录的同一版本相同时不重复记录"""
+        sections = self._section_hashes(config)
+        manifest = codec.dumps([[name, digest] for name, digest, _, _ in sections])
+        snapshot_id = _sha1(manifest)
+
+        with self._locked():
+            entries = self._read_log()
+            for entry in entries[-DEDUPE_WINDOW:]:
+                if entry['snapshot'] == snapshot_id and entry['version'] == version:
+                    return snapshot_id
+
+            for _, digest, value, data in sections:
+                path = self._object_path(digest)
+                if not os.path.exists(path):
+                    self._write_file(path, zlib.compress(data if data is not None else codec.dumps(value), COMPRESS_LEVEL))
+            snapshot_path = self._snapshot_path(snapshot_id)
+            if not os.path.exists(snapshot_path):
+                self._write_file(snapshot_path, manifest)
+
+            changed = self._changed(entries[-1]['snapshot'] if entries else None, sections)
+            entry = {
+                'seq': entries[-1]['seq'] + 1 if entries else 1,
+                'version': version,
+                'snapshot': snapshot_id,
+                'time': time.time(),
+                'changed': changed,
+            }
+            with open(self.log_path, 'ab') as f:
+                f.write(codec.dumps(entry) + b'\n')
+            self._read_log()
+
+            if len(self._entries) > self.keep + max(16, self.keep // 10) or self._expired(self._entries):
+                self._collect_locked()
+        return snapshot_id
+
+    def _changed(self, previous_id, sections):
+        """与上一条记录相比发生变化的部分名"""
+        if previous_id is None:
+            return [section[0] for section in sections]
+        try:
+            previous = dict(self._manifest(previous_id))
+        except VersionNotFound:
+            return [section[0] for section in sections]
+        names = [name for name, digest, _, _ in sections if previous.get(name) != digest]
+        current = {section[0] for section in sections}
+        return names + [name for name in previous if name not in current]
+
+    # ---------- 读取 ----------
+
+    def entries(self):
+        """全部版本记录（从旧到新）"""
+        with self._log_lock:
+            self._read_log_unlocked()
+            return list(self._entries)
+
+    def find(self, ref):
+        """按快照 sha1 或 'v<版本号>' 查找最近的一条记录"""
+        with self._log_lock:
+            self._read_log_unlocked()
+            entry = self._index.get(ref)
+        if entry is None:
+            raise VersionNotFound(f"存档中没有版本 {ref}")
+        return entry
+
+    def load(self, snapshot_id):
+        """返回快照对应的完整配置（未变化的部分与其他版本共享同一对象，调用方不得原地修改）"""
+        return {name: self._object(digest) for name, digest in self._manifest(snapshot_id)}
+
+    def restore_sections(self, snapshot_id, config):
+        """比较快照与当前配置，返回 (内容不同的部分 {部分名: 快照中的值}, 快照中没有的部分名列表)
+
+        按内容哈希比较: 写入线程记录过的部分（同一对象）直接使用已知的哈希，
+        只有快照中不同的部分才会读取和解压，回滚的开销与变化的部分成正比，与配置大小和历史长度无关。
+        """
+        manifest = self._manifest(snapshot_id)
+        # 写入线程整体替换 _hashes，这里只读取引用，无需加锁
+        known = self._hashes
+        current = {}
+        for name, value in config.items():
+            entry = known.get(id(value))
+            current[name] = entry[1] if entry is not None and entry[0] is value else _sha1(codec.dumps(value))
+        changed = {name: self._object(digest) for name, digest in manifest if current.get(name) != digest}
+        kept = {name for name, _ in manifest}
+        return changed, [name for name in config if name not in kept]
+
+    def _manifest(self, snapshot_id):
+        if len(snapshot_id) != 40 or not all(c in '0123456789abcdef' for c in snapshot_id):
+            raise VersionNotFound(f"无效的快照 ID: {snapshot_id}")
+        try:
+            with open(self._snapshot_path(snapshot_id), 'rb') as f:
+                return codec.loads(f.read())
+        except FileNotFoundError:
+            raise VersionNotFound(f"存档中没有快照 {snapshot_id}") from None
+
+    def _object(self, digest):
+        with self._objects_lock:
+            value = self._objects.get(digest)
+            if value is not None:
+                self._objects.move_to_end(digest)
+                return value
+        try:
+            with open(self._object_path(digest), 'rb') as f:
+                value = codec.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            raise VersionNotFound(f"版本数据缺失: {digest}") from None
+        with self._objects_lock:
+            value = self._objects.setdefault(digest, value)
+            while len(self._objects) > self.cache_size:
+                self._objects.popitem(last=False)
+        return value
+
+    def stats(self):
+        """存档占用: 记录数、快照数、内容数和字节数"""
+        objects, size = 0, 0
+        for path in self._files('objects'):
+            objects += 1
+            size += os.path.getsize(path)
+        snapshots = list(self._files('snapshots'))
+        size += sum(os.path.getsize(path) for path in snapshots)
+        if os.path.exists(self.log_path):
+            size += os.path.getsize(self.log_path)
+        return {'entries': len(self.entries()), 'snapshots': len(snapshots),
+                'objects': objects, 'bytes': size}
+
+    # ---------- 清理 ----------
+
+    def collect(self):
+        """按保留策略清理，返回删除的 (记录数, 快照数, 内容数)"""
+        with self._locked():
+            self._read_log()
+            return self._collect_locked()
+
+    def _expired(self, entries):
+        return bool(self.keep_days) and bool(entries) and \
+            entries[0]['time'] < time.time() - self.keep_days * 86400
+
+    def _collect_locked(self):
+        entries = self._entries
+        kept = entries[-self.keep:]
+        if self.keep_days:
+            cutoff = time.time() - self.keep_days * 86400
+            # 至少保留最新的一条，保证当前配置总能找到
+            kept = [entry for entry in kept[:-1] if entry['time'] >= cutoff] + kept[-1:]
+        dropped = len(entries) - len(kept)
+        if dropped:
+            self._write_file(self.log_path, b''.join(codec.dumps(entry) + b'\n' for entry in kept),
+                             replace=True)
+            self._read_log()
+
+        # 标记: 保留的记录引用的快照和内容
+        live_snapshots = {entry['snapshot'] for entry in kept}
+        live_objects = set()
+        for snapshot_id in live_snapshots:
+            try:
+                live_objects.update(digest for _, digest in self._manifest(snapshot_id))
+            except VersionNotFound:
+                pass
+
+        # 清除: 其余文件
+        removed_snapshots = removed_objects = 0
+        for path in list(self._files('snapshots')):
+            if os.path.basename(path) not in live_snapshots:
+                os.unlink(path)
+                removed_snapshots += 1
+        for path in list(self._files('objects')):
+            if os.path.basename(path) not in live_objects:
+                os.unlink(path)
+                removed_objects += 1
+        if dropped or removed_snapshots or removed_objects:
+            logger.info(f"🧹 已清理配置存档: {dropped} 条记录、{removed_snapshots} 个快照、{removed_objects} 个内容")
+        return dropped, removed_snapshots, removed_objects
+
+    # ---------- 文件 ----------
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    def _snapshot_path(self, snapshot_id):
+        return os.path.join(self.directory, 'snapshots', snapshot_id)
+
+    def _files(self, kind):
+        root = os.path.join(self.directory, kind)
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if not name.startswith('.'):
+                    yield os.path.join(directory, name)
+
+    @staticmethod
+    def _write_file(path, data, replace=False):
+        """临时文件 + 原子重命名；内容寻址的文件已存在时内容必然相同，不覆盖"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp.', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            if replace:
+                os.replace(tmp_path, path)
+            else:
+                os.rename(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @contextmanager
+    def _locked(self):
+        """进程内锁 + 跨进程的 flock 文件锁"""
+        with self._process_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_log(self):
+        with self._log_lock:
+            return self._read_log_unlocked()
+
+    def _read_log_unlocked(self):
+        """增量读取 log.jsonl 中新增的记录；文件被清理替换后重新读取"""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            self._entries, self._index, self._log_key = [], {}, None
+            return self._entries
+        inode, offset = self._log_key or (None, 0)
+        if inode != st.st_ino or st.st_size < offset:
+            self._entries, self._index, offset = [], {}, 0
+        if st.st_size > offset:
+            with open(self.log_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            end = data.rfind(b'\n') + 1
+            for line in data[:end].splitlines():
+                try:
+                    entry = codec.loads(line)
+                except ValueError:
+                    logger.warning("⚠️ 跳过无法解析的存档记录")
+                    continue
+                self._entries.append(entry)
+                self._index[entry['snapshot']] = entry
+                self._index[f"v{entry['version']}"] = entry
+            offset += end
+        self._log_key = (st.st_ino, offset)
+        return self._entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='配置版本存档工具')
+    parser.add_argument('action', choices=('list', 'stats', 'gc'))
+    parser.add_argument('--dir', default='../data/history/default', help='存档目录')
+    parser.add_argument('--keep', type=int, default=1000, help='gc: 保留的记录数')
+    parser.add_argument('--keep-days', type=float, default=0, help='gc: 删除早于该天数的记录（0 表示不按时间删除）')
+    parser.add_argument('--limit', type=int, default=20, help='list: 显示的记录数')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    archive = ConfigArchive(args.dir, keep=args.keep, keep_days=args.keep_days)
+    if args.action == 'list':
+        for entry in reversed(archive.entries()[-args.limit:]):
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['time']))
+            print(f"#{entry['seq']:<6} v{entry['version']:<6} {entry['snapshot'][:12]}  {stamp}  "
+                  f"{', '.join(entry['changed']) or '-'}")
+    elif args.action == 'stats':
+        stats = archive.stats()
+        print(f"📦 {stats['entries']} 条记录、{stats['snapshots']} 个快照、{stats['objects']} 个内容，"
+              f"共 {stats['bytes'] // 1024} KB")
+    else:
+        dropped, snapshots, objects = archive.collect()
+        print(f"🧹 删除 {dropped} 条记录、{snapshots} 个快照、{objects} 个内容")
+
+
+if __name__ == '__main__':
+    main()
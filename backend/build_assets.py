@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+前端静态资源构建
+功能: 把 frontend/ 下的页面和静态资源发布到 frontend/dist/
+
+- CSS / JS / 图片等资源按内容哈希重命名（styles.css -> styles.3f2a9c01be.css），
+  内容不变文件名就不变，可以放心设置一年的 immutable 缓存
+- 改写 index.html / admin.html 和 CSS 中对这些资源的引用
+- 为可压缩的文件生成 .gz / .br 预压缩版本，运行时无需再压缩
+- 生成 manifest.json 记录原文件名到发布文件名的映射
+
+用法:
+    cd backend && python3 build_assets.py
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import tempfile
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只生成 .gz
+    brotli = None
+
+from http_cache import MIN_COMPRESS_SIZE
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend')
+DIST_NAME = 'dist'
+
+# 页面文件: 不加哈希（地址固定），每次访问都需要重新验证
+PAGES = ('index.html', 'admin.html')
+# 原样复制、不加哈希的文件（浏览器按固定地址请求）
+PLAIN_FILES = ('favicon.ico',)
+# 需要加哈希的资源目录
+ASSET_DIRS = ('assets', 'src')
+
+COMPRESSIBLE = ('.html', '.css', '.js', '.json', '.svg', '.ico', '.ttf', '.otf', '.txt', '.xml')
+HASH_LENGTH = 10
+GZIP_LEVEL = 9
+# 离线构建不在乎耗时，使用 brotli 最高压缩等级
+BROTLI_QUALITY = 11
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+_HTML_REF = re.compile(r'''(\b(?:src|href)=)(["'])([^"']+)\2''')
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()[:HASH_LENGTH]
+
+
+def fingerprint_name(path, data):
+    """styles.css -> styles.<hash>.css"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{content_hash(data)}{ext}"
+
+
+def _is_local(ref):
+    return not re.match(r'^(?:[a-z][a-z0-9+.-]*:|//|#|data:)', ref, re.IGNORECASE)
+
+
+def _split_ref(ref):
+    """拆出引用中的查询串和锚点"""
+    for sep in ('?', '#'):
+        if sep in ref:
+            index = ref.index(sep)
+            return ref[:index], ref[index:]
+    return ref, ''
+
+
+def rewrite_css(text, css_path, manifest):
+    """把 CSS 中 url(...) 引用的资源改为带哈希的文件名"""
+    base = os.path.dirname(css_path)
+
+    def replace(match):
+        quote, ref = match.group(1), match.group(2)
+        path, suffix = _split_ref(ref)
+        if not _is_local(path):
+            return match.group(0)
+        target = os.path.normpath(os.path.join(base, path)).replace(os.sep, '/')
+        if target not in manifest:
+            return match.group(0)
+        hashed = os.path.relpath(manifest[target], base or '.').replace(os.sep, '/')
+        return f"url({quote}{hashed}{suffix}{quote})"
+    return _CSS_URL.sub(replace, text)
+
+
+def rewrite_html(text, manifest):
+    """把页面中 src / href 引用的资源改为带哈希的文件名"""
+    def replace(match):
+        attr, quote, ref = match.groups()
+        path, suffix = _split_ref(ref)
+        target = os.path.normpath(path).replace(os.sep, '/').lstrip('/') if _is_local(path) else None
+        if target not in manifest:
+            return match.group(0)
+        return f"{attr}{quote}{manifest[target]}{suffix}{quote}"
+    return _HTML_REF.sub(replace, text)
+
+
+def write_file(dist, name, data):
+    path = os.path.join(dist, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    compress_file(path, data)
+
+
+def compress_file(path, data):
+    """为可压缩的文件写出 .gz / .br，压缩后没有变小的不写"""
+    if not path.lower().endswith(COMPRESSIBLE) or len(data) < MIN_COMPRESS_SIZE:
+        return
+    variants = [('.gz', gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=BROTLI_QUALITY)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+
+
+def collect_assets(frontend):
+    """列出需要加哈希的资源（相对路径），CSS 排在最后以便改写其中的引用"""
+    files = []
+    for directory in ASSET_DIRS:
+        for root, _, names in os.walk(os.path.join(frontend, directory)):
+            for name in names:
+                path = os.path.relpath(os.path.join(root, name), frontend).replace(os.sep, '/')
+                files.append(path)
+    return sorted(files, key=lambda path: (path.endswith('.css'), path))
+
+
+def build(frontend=FRONTEND_DIR):
+    """构建到临时目录后整体替换 dist/，返回 manifest"""
+    frontend = os.path.abspath(frontend)
+    dist = os.path.join(frontend, DIST_NAME)
+    staging = tempfile.mkdtemp(prefix='.dist.', dir=frontend)
+    manifest = {}
+    try:
+        for path in collect_assets(frontend):
+            with open(os.path.join(frontend, path), 'rb') as f:
+                data = f.read()
+            if path.endswith('.css'):
+                data = rewrite_css(data.decode('utf-8'), path, manifest).encode('utf-8')
+            manifest[path] = fingerprint_name(path, data)
+            write_file(staging, manifest[path], data)
+
+        for path in PLAIN_FILES:
+            source = os.path.join(frontend, path)
+            if os.path.exists(source):
+                with open(source, 'rb') as f:
+                    write_file(staging, path, f.read())
+
+        for page in PAGES:
+            with open(os.path.join(frontend, page), 'r', encoding='utf-8') as f:
+                text = rewrite_html(f.read(), manifest)
+            write_file(staging, page, text.encode('utf-8'))
+
+        with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        os.chmod(staging, 0o755)
+        old = None
+        if os.path.exists(dist):
+            old = dist + '.old'
+            shutil.rmtree(old, ignore_errors=True)
+            os.rename(dist, old)
+        os.rename(staging, dist)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return manifest
+
+
+def main():
+    frontend = sys.argv[1] if len(sys.argv) > 1 else FRONTEND_DIR
+    manifest = build(frontend)
+    print(f"📦 静态资源构建完成: {os.path.join(os.path.abspath(frontend), DIST_NAME)}")
+    for source, target in manifest.items():
+        print(f"   {source} -> {target}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通用缓存工具
+功能: 持久化到磁盘的 LRU + TTL 缓存，以及合并并发相同请求的单飞调用
+"""
+
+import os
+import json
+import time
+import atexit
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class PersistentCache:
+    """带过期时间的 LRU 缓存，内容以 JSON 文件持久化
+
+    值必须可以 JSON 序列化。写入后延迟 save_delay 秒合并保存一次（原子替换文件），
+    进程退出时保存未落盘的修改。多个进程共用一个文件时以最后保存的为准。
+    """
+
+    def __init__(self, path, max_entries=1000, ttl=86400.0, save_delay=1.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.save_delay = save_delay
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ 缓存文件 {self.path} 无法读取，已忽略: {e}")
+            return
+        now = time.time()
+        for key, (value, expires) in data.items():
+            if expires > now:
+                self._entries[key] = (value, expires)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key, default=MISSING):
+        """返回未过期的值，不存在或已过期时返回 default"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.time() + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.save_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def flush(self):
+        """立即把缓存写回磁盘"""
+        with self._lock:
+            self._timer = None
+            if not self._dirty:
+                return
+            data = {key: list(entry) for key, entry in self._entries.items()}
+            self._dirty = False
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.cache.', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            logger.error(f"❌ 保存缓存文件 {self.path} 失败: {e}")
+
+
+class SingleFlight:
+    """同一个 key 的并发调用只执行一次，其余调用方等待并共享结果（或异常）"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'event': threading.Event()}
+
+        if not leader:
+            call['event'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn()
+            return call['result']
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['event'].set()
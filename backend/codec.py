@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 编解码
+功能: 配置文件的加载与保存、变更日志、SQLite 存储和 API 响应统一经过这里；
+      安装了 orjson 时使用 orjson（解析和序列化大配置快数倍），否则使用标准库 json
+
+- dumps() 总是返回 UTF-8 字节，中文不转义；pretty 为 True 时缩进 2 个空格（与原来的 config.json 格式相同）
+- orjson 不支持的值（超过 64 位的整数、非字符串的键等）自动退回标准库，结果与标准库一致
+- 项目 ID 的推导（items.py）仍使用标准库，保证装与不装 orjson 的进程推导出相同的 ID
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库
+    orjson = None
+
+# 实际使用的实现，见 /api/health
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data):
+    """解析 JSON（bytes 或 str），格式错误时抛出 ValueError"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode('utf-8')
+    return json.loads(data)
+
+
+def dumps(value, pretty=False, sort_keys=False, default=None):
+    """序列化为 UTF-8 字节；default 为无法序列化的对象的转换函数"""
+    if orjson is not None:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(value, default=default, option=option)
+        except TypeError:
+            # orjson.JSONEncodeError 是 TypeError 的子类: 退回标准库再试一次，
+            # 标准库也无法序列化时由它抛出异常
+            pass
+    if pretty:
+        text = json.dumps(value, ensure_ascii=False, indent=2, sort_keys=sort_keys, default=default)
+    else:
+        text = json.dumps(value, ensure_ascii=False, separators=(',', ':'),
+                          sort_keys=sort_keys, default=default)
+    return text.encode('utf-8')
+
+
+def dumps_text(value, sort_keys=False):
+    """紧凑序列化为 str（用于拼接到文本中，如 SQLite 字段和 SSE 事件）"""
+    return dumps(value, sort_keys=sort_keys).decode('utf-8')
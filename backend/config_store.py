@@ -0,0 +1,815 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置文件存储层
+功能: 以进程级缓存持有解析后的配置，按文件 (inode, mtime, size) 判断是否需要重新读取；
+      完整写入采用临时文件 + fsync + 原子重命名，细粒度修改先追加到变更日志，
+      所有写入以进程内锁和文件锁串行化
+"""
+
+import os
+import copy
+import stat
+import time
+import hashlib
+import mmap
+import zlib
+import ctypes
+import tempfile
+import threading
+import logging
+import multiprocessing
+from contextlib import contextmanager
+
+import codec
+from items import ID_COLLECTIONS, ID_FIELD, build_id_index
+from journal import MutationJournal, apply_mutation
+from metrics import REGISTRY
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，仅保留进程内锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 读写配置的耗时以毫秒级为主
+_STORE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+CONFIG_LOOKUPS = REGISTRY.counter(
+    'homepage_config_cache_lookups_total',
+    '配置快照查找次数: hit 直接使用内存中的快照，replay 只重放日志尾部，reload 重新解析文件', ('result',))
+CONFIG_PARSE_SECONDS = REGISTRY.histogram(
+    'homepage_config_parse_seconds', '读取并解析 config.json 的耗时', buckets=_STORE_BUCKETS)
+CONFIG_READ_BYTES = REGISTRY.counter('homepage_config_read_bytes_total', '解析配置文件读取的字节数')
+CONFIG_WRITE_SECONDS = REGISTRY.histogram(
+    'homepage_config_write_seconds',
+    '保存配置的耗时（含 fsync）: full 为完整写入，journal 为追加变更日志并等待组提交', ('mode',),
+    buckets=_STORE_BUCKETS)
+CONFIG_WRITE_BYTES = REGISTRY.counter('homepage_config_write_bytes_total', '保存配置写入的字节数', ('mode',))
+CONFIG_FILE_BYTES = REGISTRY.gauge(
+    'homepage_config_file_bytes', '最近一次读取或写入的 config.json 大小', multiprocess_mode='max')
+
+_LOOKUP_HIT = CONFIG_LOOKUPS.labels('hit')
+_LOOKUP_REPLAY = CONFIG_LOOKUPS.labels('replay')
+_LOOKUP_RELOAD = CONFIG_LOOKUPS.labels('reload')
+_WRITE_FULL_SECONDS = CONFIG_WRITE_SECONDS.labels('full')
+_WRITE_JOURNAL_SECONDS = CONFIG_WRITE_SECONDS.labels('journal')
+_WRITE_FULL_BYTES = CONFIG_WRITE_BYTES.labels('full')
+_WRITE_JOURNAL_BYTES = CONFIG_WRITE_BYTES.labels('journal')
+
+
+class ItemNotFound(ValueError):
+    """按 ID 查找的项目不存在"""
+
+
+def check_config(config):
+    """校验配置的基本结构，不合法时抛出 ValueError"""
+    if not isinstance(config, dict):
+        raise ValueError("配置数据必须是字典格式")
+    for section in ID_COLLECTIONS:
+        if section in config and not isinstance(config[section], list):
+            raise ValueError(f"配置部分 '{section}' 必须是数组")
+
+
+class ConfigSnapshot:
+    """某一版本配置的只读快照（config.json + 已重放的变更日志）
+
+    config 在多个请求线程间共享，调用方不得原地修改；
+    需要修改时请先深拷贝，或通过 ConfigStore.mutate() 提交变更。
+    """
+
+    __slots__ = ('config', 'key', 'mtime', 'version', 'base',
+                 'journal_offset', 'journal_records', 'journal_valid', 'dirty',
+                 '_derived', '_derive_lock')
+
+    def __init__(self, config, key, mtime, version=0, base=None,
+                 journal_offset=0, journal_records=0, journal_valid=False, dirty=False):
+        self.config = config
+        self.key = key
+        self.mtime = mtime
+        self.version = version
+        # config.json 内容的 sha1，用于判断变更日志是否基于该文件
+        self.base = base
+        self.journal_offset = journal_offset
+        self.journal_records = journal_records
+        self.journal_valid = journal_valid
+        # 加载时做过迁移（如补齐项目 ID），内存中的内容尚未写回 config.json
+        self.dirty = dirty
+        # 按版本缓存的派生数据（ETag、预序列化响应等），随快照一起失效
+        self._derived = {}
+        self._derive_lock = threading.Lock()
+
+    def section(self, section, default=None):
+        """返回某个配置部分，section 为 None 时返回完整配置"""
+        if section is None:
+            return self.config
+        data = self.config.get(section)
+        return default if data is None else data
+
+    def derive(self, key, factory):
+        """获取本版本的派生数据，不存在时调用 factory() 生成，每个 key 只生成一次"""
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        with self._derive_lock:
+            if key not in self._derived:
+                self._derived[key] = factory()
+            return self._derived[key]
+
+    def inherit(self, previous):
+        """沿用上一版本中未变化部分的派生数据
+
+        变更只会替换被修改的部分，未修改的部分与上一版本是同一个对象，
+        其 ETag 和预序列化结果可以直接复用。派生数据的 key 约定为 (类型, 部分名, ...)。
+        """
+        if self.config is previous.config:
+            self._derived.update(previous._derived)
+            return
+        for key, value in previous._derived.items():
+            section = key[1] if len(key) > 1 else None
+            if section is not None and self.config.get(section) is previous.config.get(section):
+                self._derived.setdefault(key, value)
+
+    def changed_sections(self, previous):
+        """与上一版本相比发生变化的配置部分"""
+        if previous is None:
+            return set(self.config)
+        names = set(self.config) | set(previous.config)
+        return {name for name in names
+                if self.config.get(name) is not previous.config.get(name)}
+
+    def find_item(self, section, item_id):
+        """按 ID 查找项目的数组下标，找不到时返回 None
+
+        ID 索引按版本构建一次；未修改的部分沿用上一版本的索引。
+        """
+        index = self.derive(('index', section), lambda: build_id_index(self.config.get(section)))
+        return index.get(item_id)
+
+    def get_item(self, section, item_id):
+        """按 ID 获取项目，找不到时返回 None"""
+        position = self.find_item(section, item_id)
+        return None if position is None else self.config[section][position]
+
+    def etag(self, section=None):
+        """配置（或某个部分）内容的强校验值，同一版本只计算一次"""
+        def compute():
+            return hashlib.sha1(codec.dumps(self.section(section), sort_keys=True)).hexdigest()
+        return self.derive(('etag', section), compute)
+
+
+class SharedGenerations:
+    """保存在文件映射中的修改代数表，供 enable_shared_invalidation() 使用
+
+    multiprocessing 分配的共享内存只能由 fork 出的子进程继承，平滑重启（USR2）时新主进程是
+    exec 出来的，新旧工作进程并存期间看不到彼此的代数。映射同一个文件的所有进程（包括新旧两代主进程
+    的工作进程）共享同一份代数。名称按 crc32 映射到固定的槽位，重启前后站点清单变化也不影响对应关系；
+    槽位冲突只会多触发一次重新校验。
+    """
+
+    SLOTS = 1024
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = self.SLOTS * ctypes.sizeof(ctypes.c_uint64)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self.lock = _RecordLock(self._fd)
+
+    def slot(self, name):
+        """名称对应的代数（带 value 属性，与 multiprocessing.RawValue 用法相同）"""
+        index = zlib.crc32(name.encode('utf-8')) % self.SLOTS
+        return ctypes.c_uint64.from_buffer(self._map, index * ctypes.sizeof(ctypes.c_uint64))
+
+
+class _RecordLock:
+    """进程内线程锁 + 文件记录锁: 记录锁属于进程而不是文件描述符，fork 和 exec 之后依然互斥"""
+
+    def __init__(self, fd):
+        self._fd = fd
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        if fcntl is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+
+class SnapshotStore:
+    """配置存储的公共部分: 快照的发布与变更回调、多进程间的失效通知、后台监视
+
+    子类实现 _lookup(fresh)、mutate(record)、write(config, version) 和 watch_paths，
+    app.py 只通过这些接口访问存储，可以在不同的存储后端之间切换。
+    """
+
+    def __init__(self, stat_ttl=1.0, normalize=None, validate=None):
+        # normalize(新配置, 旧配置) -> 新配置: 每次加载和修改后统一调整配置（如补齐项目 ID），
+        # 必须是确定性的，保证重放变更日志的结果与最初执行时一致
+        self.normalize = normalize
+        # validate(新配置, 旧配置): 每次修改和整体保存在提交前调用，不合法时抛出异常放弃本次写入；
+        # 加载、重放日志和合并不校验，已有的文件不会因为规则收紧而无法读取
+        self.validate = validate
+        self.stat_ttl = stat_ttl
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._load_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._listeners = []
+        # 多进程部署时共享的修改代数，见 enable_shared_invalidation()
+        self._generation = None
+        self._generation_lock = None
+        self._seen_generation = 0
+        # 后台监视线程，启动后请求线程不再访问磁盘
+        self._watcher = None
+        # close() 后后台线程退出且不再启动
+        self._closed = threading.Event()
+
+    def _apply(self, config, record):
+        new_config, result = apply_mutation(config, record)
+        if self.normalize is not None:
+            new_config = self.normalize(new_config, config)
+        return new_config, result
+
+    @property
+    def watch_paths(self):
+        """需要监视的文件，变化后调用 refresh()"""
+        raise NotImplementedError
+
+    @property
+    def current(self):
+        """最近一次加载的快照（不访问磁盘，也不检查文件是否变化）"""
+        return self._snapshot
+
+    def snapshot(self, fresh=False):
+        """返回当前配置快照，没有数据或加载失败时返回 None
+
+        fresh 为 True 时忽略 stat_ttl，立即校验存储是否已被其他进程修改。
+        """
+        return self._lookup(fresh)
+
+    def _lookup(self, fresh):
+        raise NotImplementedError
+
+    def refresh(self):
+        """立即校验存储，有变化时重新加载（供监视线程调用）"""
+        return self._lookup(fresh=True)
+
+    def watch(self, interval=2.0):
+        """启动后台监视线程（在工作进程内调用，fork 之前启动的线程不会被继承）
+
+        先同步加载一次配置，此后读请求只使用内存中的快照。
+        """
+        from watcher import ConfigWatcher
+
+        self.refresh()
+        if self._watcher is None:
+            self._watcher = ConfigWatcher(self, interval=interval)
+        self._watcher.start()
+        return self._watcher
+
+    def add_listener(self, listener):
+        """注册快照发布回调 listener(新快照, 旧快照)
+
+        回调在加载锁内同步执行，必须迅速返回且不能再访问存储。
+        无论修改来自本进程还是其他进程（重新加载时发现），都会触发回调。
+        """
+        self._listeners.append(listener)
+
+    def _publish(self, snapshot, previous=None):
+        """替换当前快照（调用方需持有加载锁）"""
+        if previous is not None:
+            snapshot.inherit(previous)
+        self._snapshot = snapshot
+        self._checked_at = time.monotonic()
+        for listener in self._listeners:
+            try:
+                listener(snapshot, previous)
+            except Exception as e:
+                logger.error(f"❌ 配置变更回调执行失败: {e}")
+
+    def _publish_locked(self, snapshot, previous=None):
+        with self._load_lock:
+            self._publish(snapshot, previous)
+
+    def enable_shared_invalidation(self, generation=None, lock=None):
+        """在多个工作进程间共享修改代数（必须在 fork 工作进程之前调用）
+
+        任一进程提交修改后递增共享内存中的代数，其他进程的下一次读取发现代数变化，
+        不再等待 stat_ttl 到期，立即重新校验存储。
+        fork 之后才创建的存储可以传入 fork 之前预先分配的 generation 和 lock。
+        """
+        if self._generation is None:
+            self._generation = generation if generation is not None else multiprocessing.RawValue('Q', 0)
+            self._generation_lock = lock if lock is not None else multiprocessing.Lock()
+            self._seen_generation = self._generation.value
+
+    def _generation_changed(self):
+        """其他进程是否在本进程上次检查之后提交过修改"""
+        generation = self._generation
+        if generation is None or generation.value == self._seen_generation:
+            return False
+        self._seen_generation = generation.value
+        return True
+
+    def _bump_generation(self):
+        if self._generation is None:
+            return
+        with self._generation_lock:
+            self._generation.value += 1
+            self._seen_generation = self._generation.value
+
+    def invalidate(self):
+        """丢弃缓存，下一次读取时重新加载"""
+        with self._load_lock:
+            self._snapshot = None
+            self._checked_at = 0.0
+
+    def close(self):
+        """停止后台线程（用于卸载不再使用的存储）
+
+        关闭后仍可读写，只是不再有后台监视和合并，读取退回按 stat_ttl 校验。
+        """
+        self._closed.set()
+        if self._watcher is not None:
+            self._watcher.stop()
+
+
+class ConfigStore(SnapshotStore):
+    """带缓存的配置文件存储
+
+    - 读取: 在 stat_ttl 秒内直接返回内存快照，超过后仅做 stat 校验；
+            读取不会等待写锁，重新加载期间其他线程继续使用上一份完整快照
+    - 未命中: 同一时刻只有一个线程解析文件，其余线程等待并复用结果
+    - 完整写入: 临时文件写入并 fsync 后原子替换，读者永远不会看到写了一半的文件
+    - 细粒度修改: 追加到变更日志，并发修改合并 fsync，后台定期合并回 config.json
+    - 所有写入在进程内锁 + 跨进程文件锁下串行执行
+    """
+
+    def __init__(self, path, stat_ttl=1.0, commit_delay=0.002,
+                 compact_interval=5.0, compact_max_records=200, pretty=True, normalize=None, validate=None):
+        super().__init__(stat_ttl=stat_ttl, normalize=normalize, validate=validate)
+        self.path = path
+        # config.json 的格式: True 为缩进 2 格（便于手工编辑和 diff），False 为紧凑格式（更小、写入更快）
+        self.pretty = pretty
+        self.lock_path = path + '.lock'
+        self.compact_interval = compact_interval
+        self.compact_max_records = compact_max_records
+        self.journal = MutationJournal(path + '.journal', commit_delay=commit_delay)
+        # 写锁的持有线程和重入深度，只有持有 _write_lock 的线程会修改
+        self._write_owner = None
+        self._write_depth = 0
+        self._lock_file = None
+        self._last_mutation = 0.0
+        self._compactor = None
+        # 最近一次解析失败的文件，避免反复解析同一个损坏的文件
+        self._failed_key = None
+
+    @property
+    def watch_paths(self):
+        return (self.path, self.journal.path)
+
+    @staticmethod
+    def _key_of(st):
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _journal_key_of(st):
+        return (st.st_ino, st.st_size) if st is not None else None
+
+    def _stat(self):
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    # ---------- 读取 ----------
+
+    def snapshot(self, fresh=False):
+        """返回当前配置快照，文件不存在或解析失败时返回 None
+
+        fresh 为 True 时忽略 stat_ttl，立即校验文件是否已被其他进程修改。
+        """
+        snapshot = self._lookup(fresh)
+        if snapshot is not None and snapshot.dirty and self._write_owner is None:
+            self._ensure_compactor()
+        return snapshot
+
+    def _lookup(self, fresh):
+        if self._watcher is not None and not fresh and self._snapshot is not None:
+            # 文件变化由监视线程负责发现
+            _LOOKUP_HIT.inc()
+            return self._snapshot
+
+        if self._generation_changed():
+            # 其他工作进程提交过修改，跳过 stat_ttl 立即校验
+            fresh = True
+        snapshot = self._snapshot
+        if (not fresh and snapshot is not None
+                and time.monotonic() - self._checked_at < self.stat_ttl):
+            _LOOKUP_HIT.inc()
+            return snapshot
+
+        st = self._stat()
+        if st is not None and snapshot is not None:
+            journal_st = self.journal.stat()
+            key = (self._key_of(st), self._journal_key_of(journal_st))
+            if snapshot.key == key:
+                self._checked_at = time.monotonic()
+                _LOOKUP_HIT.inc()
+                return snapshot
+            if self._can_replay_tail(snapshot, key):
+                replayed = self._replay_tail(fresh)
+                if replayed is not None:
+                    _LOOKUP_REPLAY.inc()
+                    return replayed
+
+        _LOOKUP_RELOAD.inc()
+        return self._reload(fresh)
+
+    @staticmethod
+    def _can_replay_tail(snapshot, key):
+        """config.json 未变、日志只是被追加时，只需重放新增的记录"""
+        config_key, journal_key = key
+        old_config_key, old_journal_key = snapshot.key
+        return (snapshot.journal_valid and config_key == old_config_key
+                and journal_key is not None and old_journal_key is not None
+                and journal_key[0] == old_journal_key[0]
+                and journal_key[1] > snapshot.journal_offset)
+
+    def _replay_tail(self, fresh):
+        """重放日志新增的记录，失败时返回 None 由调用方完整重新加载"""
+        if not self._load_lock.acquire(blocking=fresh):
+            # 其他线程正在加载，先继续使用旧快照
+            return self._snapshot
+        try:
+            snapshot = self._snapshot
+            if snapshot is None or not snapshot.journal_valid:
+                return None
+            records, offset = self.journal.read(snapshot.journal_offset)
+            config, version = snapshot.config, snapshot.version
+            for record in records:
+                config, _ = self._apply(config, record)
+                version = record.get('v', version + 1)
+            journal_st = self.journal.stat()
+            if (journal_st is None or snapshot.key[1] is None
+                    or journal_st.st_ino != snapshot.key[1][0]):
+                return None
+            key = (snapshot.key[0], (journal_st.st_ino, offset))
+            self._publish(ConfigSnapshot(
+                config, key, max(snapshot.mtime, journal_st.st_mtime), version,
+                base=snapshot.base, journal_offset=offset,
+                journal_records=snapshot.journal_records + len(records),
+                journal_valid=True, dirty=snapshot.dirty), previous=snapshot)
+            return self._snapshot
+        except Exception as e:
+            logger.error(f"❌ 重放变更日志失败: {e}")
+            return None
+        finally:
+            self._load_lock.release()
+
+    def _reload(self, fresh=False):
+        """重新解析 config.json 并重放变更日志（单飞: 并发未命中只解析一次）
+
+        加锁顺序固定为 共享文件锁 -> 加载锁，与写入方的 写锁 -> 加载锁 不会形成环。
+        已有快照时两把锁都不等待，拿不到就继续返回旧快照。
+        """
+        blocking = fresh or self._snapshot is None
+        with self._shared_lock(blocking) as acquired:
+            if not acquired or not self._load_lock.acquire(blocking=blocking):
+                return self._snapshot
+            try:
+                return self._reload_locked()
+            finally:
+                self._load_lock.release()
+
+    def _reload_locked(self):
+        st = self._stat()
+        if st is None:
+            self._snapshot = None
+            logger.warning(f"⚠️ 配置文件不存在: {self.path}")
+            return None
+
+        previous = self._snapshot
+        journal_st = self.journal.stat()
+        key = (self._key_of(st), self._journal_key_of(journal_st))
+        if previous is not None and previous.key == key:
+            # 等锁期间已由其他线程加载完成
+            self._checked_at = time.monotonic()
+            return previous
+        if key[0] == self._failed_key:
+            # 文件仍是上次解析失败的那一份，继续使用上一份完好的配置
+            self._checked_at = time.monotonic()
+            return previous
+
+        started = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f:
+                # 以实际读取到的文件为准，避免 stat 与 open 之间文件被替换
+                st = os.fstat(f.fileno())
+                data = f.read()
+            config = codec.loads(data)
+            check_config(config)
+            dirty = False
+            if self.normalize is not None:
+                # 先迁移再重放日志，与最初执行这些修改时的状态保持一致
+                normalized = self.normalize(config, None)
+                dirty = normalized is not config
+                config = normalized
+        except Exception as e:
+            self._failed_key = self._key_of(st)
+            self._checked_at = time.monotonic()
+            if previous is not None:
+                logger.error(f"❌ 配置文件无效，继续使用版本 {previous.version}: {e}")
+            else:
+                logger.error(f"❌ 读取配置文件失败: {e}")
+            return previous
+
+        self._failed_key = None
+        CONFIG_PARSE_SECONDS.observe(time.perf_counter() - started)
+        CONFIG_READ_BYTES.inc(len(data))
+        CONFIG_FILE_BYTES.set(len(data))
+        base = hashlib.sha1(data).hexdigest()
+
+        records, offset = self.journal.read()
+        header = records.pop(0) if records and records[0].get('type') == 'header' else None
+        last_version = max([header['version'] if header else 0] +
+                           [record.get('v', 0) for record in records])
+
+        mtime = st.st_mtime
+        journal_valid = header is not None and header.get('base') == base
+        if journal_valid:
+            version = header['version']
+            for i, record in enumerate(records):
+                try:
+                    config, _ = self._apply(config, record)
+                except Exception as e:
+                    logger.error(f"❌ 重放变更记录 v{record.get('v')} 失败，忽略其后的记录: {e}")
+                    records = records[:i]
+                    break
+                version = record.get('v', version + 1)
+            if records:
+                mtime = max(mtime, journal_st.st_mtime)
+            logger.info(f"📖 配置文件读取成功（重放 {len(records)} 条变更记录）")
+        else:
+            # 日志已被合并，或 config.json 被外部修改: 以文件内容为准并推进版本号
+            version = last_version + 1 if header is not None else 0
+            if previous is not None:
+                # 还没有日志时 config.json 被外部修改也要推进版本号，
+                # 否则客户端按版本号判断是否更新，会错过这次修改；版本号也不能回退
+                version = max(version, previous.version + 1 if config != previous.config else previous.version)
+            records = []
+            logger.info("📖 配置文件读取成功")
+
+        journal_key = (journal_st.st_ino, offset) if journal_st is not None else None
+        self._publish(ConfigSnapshot(
+            config, (self._key_of(st), journal_key), mtime, version,
+            base=base, journal_offset=offset, journal_records=len(records),
+            journal_valid=journal_valid, dirty=dirty), previous=previous)
+        if dirty:
+            # 迁移结果由后台合并线程写回 config.json
+            logger.info("🔧 配置已在加载时迁移，稍后写回配置文件")
+        return self._snapshot
+
+    # ---------- 锁 ----------
+
+    @contextmanager
+    def locked(self):
+        """获取写锁（可重入）: 进程内 RLock + 跨进程的 flock 文件锁"""
+        with self._write_lock:
+            if self._write_depth == 0:
+                self._write_owner = threading.get_ident()
+                if fcntl is not None:
+                    self._lock_file = open(self.lock_path, 'a')
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._write_depth += 1
+            try:
+                yield
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._write_owner = None
+                    if self._lock_file is not None:
+                        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                        self._lock_file.close()
+                        self._lock_file = None
+
+    @contextmanager
+    def _shared_lock(self, blocking=True):
+        """完整加载时持有共享文件锁，避免读到合并过程中 config.json 与日志不一致的中间状态
+
+        产出是否成功加锁；blocking 为 False 且有写入方持锁时产出 False。
+        """
+        if fcntl is None or self._write_owner == threading.get_ident():
+            yield True
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            flags = fcntl.LOCK_SH if blocking else fcntl.LOCK_SH | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock_file.fileno(), flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    # ---------- 写入 ----------
+
+    @contextmanager
+    def transaction(self):
+        """串行化的读-改-写事务
+
+        在写锁内读取最新配置（包括其他进程刚写入的内容），交给调用方修改副本，
+        with 块正常结束后整体写回；块内抛出异常则放弃本次修改。
+        """
+        with self.locked():
+            snapshot = self.snapshot(fresh=True)
+            config = copy.deepcopy(snapshot.config) if snapshot is not None else {}
+            yield config
+            self.write(config)
+
+    def mutate(self, record):
+        """提交一条细粒度变更，返回 (操作结果, 新版本号)，操作结果例如被删除的项目
+
+        记录在写锁内追加到变更日志并立即对读请求可见，
+        随后在锁外等待组提交落盘后才返回。
+        记录带 id 字段时在锁内按 ID 解析出数组下标，找不到则抛出 ItemNotFound。
+        """
+        with self.locked():
+            snapshot = self.snapshot(fresh=True)
+            if ID_FIELD in record:
+                position = snapshot.find_item(record['section'], record[ID_FIELD]) if snapshot else None
+                if position is None:
+                    raise ItemNotFound(f"项目 {record[ID_FIELD]} 不存在")
+                record = dict(record, index=position)
+
+            if snapshot is None:
+                # 还没有配置文件: 直接写出完整文件（write 中校验）
+                config, result = self._apply({}, record)
+                self.write(config)
+                return result, self._snapshot.version
+
+            config, result = self._apply(snapshot.config, record)
+            if self.validate is not None:
+                self.validate(config, snapshot.config)
+            if self._failed_key is not None:
+                # 磁盘上的 config.json 已损坏，直接以修改后的完整配置覆盖它
+                self.write(config)
+                return result, self._snapshot.version
+            if not snapshot.journal_valid:
+                self._reset_journal(snapshot)
+                snapshot = self._snapshot
+
+            version = snapshot.version + 1
+            started = time.perf_counter()
+            ticket, journal_st = self.journal.append(dict(record, v=version))
+            _WRITE_JOURNAL_BYTES.inc(journal_st.st_size - snapshot.journal_offset)
+            self._publish_locked(ConfigSnapshot(
+                config, (snapshot.key[0], self._journal_key_of(journal_st)),
+                journal_st.st_mtime, version, base=snapshot.base,
+                journal_offset=journal_st.st_size,
+                journal_records=snapshot.journal_records + 1,
+                journal_valid=True, dirty=snapshot.dirty), previous=snapshot)
+            self._last_mutation = time.monotonic()
+
+        self.journal.sync(ticket)
+        _WRITE_JOURNAL_SECONDS.observe(time.perf_counter() - started)
+        # 记录已落盘，再通知其他工作进程
+        self._bump_generation()
+        self._ensure_compactor()
+        return result, version
+
+    def write(self, config, version=None):
+        """原子写入完整配置并替换缓存，同时清空变更日志，返回版本号
+
+        version 为 None 时版本号在当前版本基础上加一（整体保存），并先经过 validate 校验；
+        合并日志时传入当前版本号保持不变，内容已在修改时校验过。
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+
+        with self.locked():
+            previous = self.snapshot(fresh=True)
+            check = version is None
+            if version is None:
+                version = previous.version + 1 if previous is not None else 1
+            if self.normalize is not None:
+                config = self.normalize(config, previous.config if previous is not None else None)
+            if self.validate is not None and check:
+                self.validate(config, previous.config if previous is not None else None)
+            started = time.perf_counter()
+            data = codec.dumps(config, pretty=self.pretty)
+
+            fd, tmp_path = tempfile.mkstemp(prefix='.config.', suffix='.tmp', dir=directory)
+            try:
+                # mkstemp 默认 0600，沿用原文件权限以免 nginx 无法读取
+                os.chmod(tmp_path, self._file_mode())
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    st = os.fstat(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+            self._fsync_directory(directory)
+            _WRITE_FULL_SECONDS.observe(time.perf_counter() - started)
+            _WRITE_FULL_BYTES.inc(len(data))
+            CONFIG_FILE_BYTES.set(len(data))
+
+            base = hashlib.sha1(data).hexdigest()
+            journal_st = self.journal.reset({'type': 'header', 'base': base, 'version': version})
+            self._publish_locked(ConfigSnapshot(
+                config, (self._key_of(st), self._journal_key_of(journal_st)),
+                st.st_mtime, version, base=base, journal_offset=journal_st.st_size,
+                journal_valid=True), previous=previous)
+            self._bump_generation()
+        return version
+
+    def _reset_journal(self, snapshot):
+        """日志与 config.json 不匹配（外部修改过配置文件）时，以当前文件为基础重建日志"""
+        journal_st = self.journal.reset(
+            {'type': 'header', 'base': snapshot.base, 'version': snapshot.version})
+        self._publish_locked(ConfigSnapshot(
+            snapshot.config, (snapshot.key[0], self._journal_key_of(journal_st)),
+            snapshot.mtime, snapshot.version, base=snapshot.base,
+            journal_offset=journal_st.st_size, journal_valid=True,
+            dirty=snapshot.dirty), previous=snapshot)
+
+    def compact(self):
+        """把变更日志合并进 config.json，返回是否实际执行了合并"""
+        with self.locked():
+            snapshot = self.snapshot(fresh=True)
+            if snapshot is None or not (snapshot.journal_records or snapshot.dirty):
+                return False
+            self.write(snapshot.config, version=snapshot.version)
+        logger.info(f"🗜️ 已合并 {snapshot.journal_records} 条变更记录到配置文件")
+        return True
+
+    def close(self):
+        """停止后台线程，并把尚未合并的变更日志合并进 config.json"""
+        super().close()
+        snapshot = self._snapshot
+        if snapshot is not None and (snapshot.journal_records or snapshot.dirty):
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"❌ 合并变更日志失败: {e}")
+        self.journal.close()
+
+    def _ensure_compactor(self):
+        """按需启动后台合并线程（在首次修改时启动，确保在工作进程内运行）"""
+        if self._closed.is_set():
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        with self._load_lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self._compact_loop, name='config-compactor', daemon=True)
+            self._compactor.start()
+
+    def _compact_loop(self):
+        while not self._closed.wait(self.compact_interval):
+            snapshot = self._snapshot
+            if snapshot is None or not (snapshot.journal_records or snapshot.dirty):
+                continue
+            idle = time.monotonic() - self._last_mutation
+            if idle < self.compact_interval and snapshot.journal_records < self.compact_max_records:
+                continue
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"❌ 合并变更日志失败: {e}")
+
+    def _file_mode(self):
+        try:
+            return stat.S_IMODE(os.stat(self.path).st_mode)
+        except FileNotFoundError:
+            return 0o644
+
+    @staticmethod
+    def _fsync_directory(directory):
+        """确保重命名本身落盘（Windows 不支持对目录 fsync）"""
+        if os.name != 'posix':
+            return
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
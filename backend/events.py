@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置变更推送（Server-Sent Events）
+功能: 配置每次提交新版本时，向所有订阅者推送版本号和发生变化的配置部分
+
+- 每个订阅者有一个有界队列，写入方只做非阻塞投递，慢客户端不会拖住写入
+- 队列溢出的订阅者收到 resync 事件，提示重新拉取完整配置
+- 最近的事件保存在环形缓冲区中，断线重连时按 Last-Event-ID 补发
+- 单个连接有最长存活时间，到期后断开并由浏览器按 retry 自动重连，
+  避免长期占用服务线程；订阅者总数也有上限，多个广播器（多个站点）可以共用一个连接数上限（slots）
+
+事件格式:
+    id: 13
+    event: change
+    data: {"version": 13, "sections": ["skills"]}
+"""
+
+import time
+import queue
+import select
+import socket
+import threading
+import logging
+from collections import deque
+
+import codec
+
+logger = logging.getLogger(__name__)
+
+
+class TooManySubscribers(Exception):
+    """订阅者数量已达上限"""
+
+
+def format_event(event, data, event_id=None):
+    """编码一条 SSE 消息"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {codec.dumps_text(data)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def peer_closed(sock):
+    """客户端已断开连接时返回 True（只窥探，不消耗请求数据）
+
+    推送连接大部分时间没有数据可写，只靠写入失败发现断开要等到第二次心跳，
+    期间白白占用一个服务线程和连接名额。
+    """
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable) and not sock.recv(1, socket.MSG_PEEK)
+    except (OSError, ValueError):
+        return True
+
+
+class Subscription:
+    """一个订阅者的事件队列"""
+
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """非阻塞投递，队列已满时标记溢出并丢弃积压的事件"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def drain(self):
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+class ChangeBroadcaster:
+    """把配置变更广播给所有 SSE 订阅者"""
+
+    def __init__(self, history=256, queue_size=64, heartbeat=15.0, poll_interval=1.0,
+                 max_lifetime=300.0, max_subscribers=100, slots=None, retry=3000):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        # 等待事件的间隔，每次超时都会校验一次配置文件，以便发现其他进程提交的修改
+        self.poll_interval = poll_interval
+        self.max_lifetime = max_lifetime
+        self.max_subscribers = max_subscribers
+        # 进程内所有广播器共用的连接名额（BoundedSemaphore），None 表示只按 max_subscribers 限制
+        self.slots = slots
+        # 浏览器断线后的重连等待时间（毫秒）
+        self.retry = retry
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._version = None
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, snapshot, previous):
+        """配置存储发布新快照时调用（在存储的加载锁内执行，不能阻塞）"""
+        if previous is None:
+            self._version = snapshot.version
+            return
+        sections = snapshot.changed_sections(previous)
+        if snapshot.version == previous.version and not sections:
+            return
+        event = (snapshot.version, format_event('change', {
+            'version': snapshot.version,
+            'sections': sorted(sections)
+        }, event_id=snapshot.version))
+        with self._lock:
+            self._version = snapshot.version
+            self._history.append(event)
+            for subscription in self._subscribers:
+                subscription.deliver(event)
+
+    def subscribe(self, last_event_id=None):
+        """注册订阅者，返回 (订阅, 需要补发的事件列表)
+
+        last_event_id 早于缓冲区中最早的事件时，补发列表为 None，表示需要完整同步。
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers(f"订阅者数量已达上限 {self.max_subscribers}")
+            if self.slots is not None and not self.slots.acquire(blocking=False):
+                raise TooManySubscribers("本进程的推送连接数已达上限")
+            subscription = Subscription(self.queue_size)
+            self._subscribers.add(subscription)
+
+            backlog = []
+            if last_event_id is not None and last_event_id != self._version:
+                oldest = self._history[0][0] if self._history else None
+                if (oldest is None or last_event_id < oldest - 1
+                        or self._version is None or last_event_id > self._version):
+                    # 缺失的事件已不在缓冲区中（或服务端版本已重置）
+                    backlog = None
+                else:
+                    backlog = [event for version, event in self._history if version > last_event_id]
+            return subscription, backlog
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription not in self._subscribers:
+                return
+            self._subscribers.discard(subscription)
+        if self.slots is not None:
+            self.slots.release()
+
+    def _resync(self, subscription):
+        subscription.drain()
+        subscription.overflowed = False
+        version = self._version
+        return format_event('resync', {'version': version}, event_id=version)
+
+    def stream(self, subscription, backlog, poll=None, stop=None):
+        """生成 SSE 消息流，连接关闭、到达最长存活时间或 stop() 返回 True 后结束
+
+        poll 在每次等待超时后调用，用于发现其他进程提交的修改。
+        """
+        started = time.monotonic()
+        last_sent = started
+        try:
+            yield f"retry: {self.retry}\n\n"
+            if backlog is None:
+                yield self._resync(subscription)
+            elif backlog:
+                for event in backlog:
+                    yield event
+            else:
+                version = self._version
+                yield format_event('version', {'version': version}, event_id=version)
+
+            while time.monotonic() - started < self.max_lifetime:
+                if subscription.overflowed:
+                    logger.warning("⚠️ SSE 客户端处理过慢，要求其重新同步")
+                    yield self._resync(subscription)
+                    last_sent = time.monotonic()
+                    continue
+                try:
+                    _, event = subscription.queue.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    if stop is not None and stop():
+                        break
+                    if poll is not None:
+                        poll()
+                    if time.monotonic() - last_sent >= self.heartbeat:
+                        # 注释行作为心跳，防止代理因空闲断开连接
+                        yield ": heartbeat\n\n"
+                        last_sent = time.monotonic()
+                    continue
+                yield event
+                last_sent = time.monotonic()
+        finally:
+            self.unsubscribe(subscription)
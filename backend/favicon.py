@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网站图标解析
+功能: 在服务端为项目 / 友链地址查找可用的网站图标
+
+解析顺序（优先级从高到低）:
+    1. 首页 <link rel="icon"> / <link rel="apple-touch-icon"> 声明的图标
+    2. /favicon.ico、/favicon.png、/apple-touch-icon.png
+    3. 第三方图标服务（可配置，不做探测，作为兜底）
+
+首页和各候选地址在有界线程池中并发探测，连接按主机复用；
+结果按站点缓存到磁盘，找到和找不到的结果分别有不同的过期时间。
+地址由访客提供，指向本机、内网或保留地址的站点直接拒绝（见 http_pool.py）。
+"""
+
+import time
+import logging
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urljoin, quote
+from concurrent.futures import ThreadPoolExecutor
+
+from caching import MISSING, PersistentCache, SingleFlight
+from http_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = ('/favicon.ico', '/favicon.png', '/apple-touch-icon.png')
+# 第三方图标服务，{domain} 会被替换为站点域名
+DEFAULT_SERVICES = ('https://www.google.com/s2/favicons?domain={domain}&sz=64',)
+
+_ICON_RELS = {'icon', 'shortcut icon', 'apple-touch-icon', 'apple-touch-icon-precomposed', 'mask-icon'}
+# 首页只读取开头这么多字节（<head> 一般都在其中）
+HOMEPAGE_BYTES = 256 * 1024
+
+
+class _IconLinkParser(HTMLParser):
+    """收集 <link rel="icon" href="..."> 的地址，遇到 <body> 后停止"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.icons = []
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == 'body':
+            self.done = True
+            return
+        if tag != 'link':
+            return
+        attrs = dict(attrs)
+        rel = ' '.join((attrs.get('rel') or '').lower().split())
+        if attrs.get('href') and (rel in _ICON_RELS or 'icon' in rel.split()):
+            self.icons.append(attrs['href'].strip())
+
+
+def parse_icon_links(html, base_url):
+    """从 HTML 中解析图标链接，返回绝对地址列表"""
+    parser = _IconLinkParser()
+    try:
+        parser.feed(html)
+    except Exception:
+        pass
+    icons = []
+    for href in parser.icons:
+        url = urljoin(base_url, href)
+        if urlsplit(url).scheme in ('http', 'https') and url not in icons:
+            icons.append(url)
+    return icons
+
+
+def site_origin(url):
+    """规范化为站点根地址，作为缓存键；地址无效时抛出 ValueError"""
+    if '://' not in url:
+        url = 'https://' + url
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f"无效的网站地址: {url}")
+    netloc = parts.hostname.lower()
+    if parts.port:
+        netloc += f":{parts.port}"
+    return f"{parts.scheme}://{netloc}"
+
+
+class FaviconResolver:
+    """并发探测并缓存网站图标"""
+
+    def __init__(self, cache_path, ttl=7 * 86400.0, negative_ttl=3600.0, max_workers=8,
+                 timeout=5.0, services=DEFAULT_SERVICES, paths=DEFAULT_PATHS, max_entries=2000,
+                 allow_hosts=()):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.services = tuple(services)
+        self.paths = tuple(paths)
+        self.cache = PersistentCache(cache_path, max_entries=max_entries, ttl=ttl)
+        self.http = ConnectionPool(timeout=timeout, allow_hosts=allow_hosts)
+        # 探测请求和批量解析使用不同的线程池，避免批量任务占满线程后等待自己的探测任务
+        self._probes = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='favicon-probe')
+        self._resolvers = ThreadPoolExecutor(max_workers=max(1, max_workers // 2),
+                                             thread_name_prefix='favicon-resolve')
+        self._flight = SingleFlight()
+
+    # ---------- 探测 ----------
+
+    def _probe_icon(self, url):
+        """候选图标可用时返回最终地址，否则返回 None"""
+        try:
+            response = self.http.fetch('HEAD', url)
+            if response.status in (405, 501):
+                # 不支持 HEAD 的服务器改用 GET
+                response = self.http.fetch('GET', url, max_body=HOMEPAGE_BYTES)
+        except Exception as e:
+            logger.debug(f"探测图标 {url} 失败: {e}")
+            return None
+        content_type = response.content_type
+        if response.status != 200:
+            return None
+        if content_type and not (content_type.startswith('image/') or 'icon' in content_type
+                                 or content_type == 'application/octet-stream'):
+            return None
+        if response.headers.get('content-length') == '0':
+            return None
+        return response.url
+
+    def _declared_icons(self, origin):
+        try:
+            response = self.http.fetch('GET', origin + '/', headers={'Accept': 'text/html'},
+                                       max_body=HOMEPAGE_BYTES)
+        except Exception as e:
+            logger.debug(f"获取首页 {origin} 失败: {e}")
+            return []
+        if response.status != 200 or 'html' not in response.content_type:
+            return []
+        charset = 'utf-8'
+        for part in (response.headers.get('content-type') or '').split(';')[1:]:
+            name, _, value = part.strip().partition('=')
+            if name.lower() == 'charset' and value:
+                charset = value.strip('"\'')
+        try:
+            html = response.body.decode(charset, errors='replace')
+        except LookupError:
+            html = response.body.decode('utf-8', errors='replace')
+        return parse_icon_links(html, response.url)
+
+    def _service_icon(self, origin):
+        if not self.services:
+            return None
+        domain = urlsplit(origin).hostname
+        return self.services[0].replace('{domain}', quote(domain))
+
+    def _lookup(self, origin):
+        started = time.monotonic()
+        homepage = self._probes.submit(self._declared_icons, origin)
+        defaults = [self._probes.submit(self._probe_icon, origin + path) for path in self.paths]
+
+        # 首页返回后立即并发探测其中声明的图标，同时常见路径的探测仍在进行
+        declared = [self._probes.submit(self._probe_icon, url) for url in homepage.result()]
+
+        icon, source = None, None
+        for future, kind in [(f, 'link') for f in declared] + [(f, 'default') for f in defaults]:
+            result = future.result()
+            if result:
+                icon, source = result, kind
+                break
+        if icon is None:
+            icon = self._service_icon(origin)
+            source = 'service' if icon else None
+
+        logger.info(f"🔍 解析 {origin} 的图标: {icon or '未找到'}（{(time.monotonic() - started) * 1000:.0f} ms）")
+        return {'icon': icon, 'source': source}
+
+    # ---------- 对外接口 ----------
+
+    def resolve(self, url, refresh=False):
+        """返回 {'site', 'icon', 'source', 'cached'}，找不到图标时 icon 为 None
+
+        站点指向内网或保留地址时抛出 BlockedAddress（ValueError 的子类）。
+        """
+        origin = site_origin(url)
+        if not refresh:
+            cached = self.cache.get(origin)
+            if cached is not MISSING:
+                return dict(cached, site=origin, cached=True)
+
+        def lookup():
+            # 探测失败会退回第三方图标服务，所以在探测之前单独检查，明确拒绝内网地址
+            self.http.check_url(origin)
+            result = self._lookup(origin)
+            # 兜底服务的结果视为未真正找到，按较短的时间缓存
+            ttl = self.ttl if result['source'] in ('link', 'default') else self.negative_ttl
+            self.cache.set(origin, result, ttl=ttl)
+            return result
+
+        result = self._flight.do(origin, lookup)
+        return dict(result, site=origin, cached=False)
+
+    def resolve_many(self, urls, refresh=False):
+        """并发解析多个地址，返回与输入顺序一致的结果列表（无效地址的结果带 error 字段）"""
+        def safe_resolve(url):
+            try:
+                return self.resolve(url, refresh=refresh)
+            except Exception as e:
+                return {'site': None, 'icon': None, 'source': None, 'cached': False, 'error': str(e)}
+        return list(self._resolvers.map(safe_resolve, urls))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置版本差异
+功能: 在内存中保留最近若干个版本之间的差异，客户端可以只下载自某个版本以来的修改
+
+每次发布新快照都记录一条 (旧版本, 新版本, 旧配置, 新配置)。配置以写时复制方式修改，
+相邻版本共享未改动的部分，保留旧配置引用的额外内存开销很小；
+JSON Patch 差异在第一次被请求时才计算并缓存。
+"""
+
+import threading
+from collections import deque
+
+from patch import make_json_patch
+
+
+class _Change:
+    __slots__ = ('from_version', 'to_version', 'old', 'new', '_ops', '_lock')
+
+    def __init__(self, from_version, to_version, old, new):
+        self.from_version = from_version
+        self.to_version = to_version
+        self.old = old
+        self.new = new
+        self._ops = None
+        self._lock = threading.Lock()
+
+    def ops(self):
+        if self._ops is None:
+            with self._lock:
+                if self._ops is None:
+                    self._ops = make_json_patch(self.old, self.new)
+        return self._ops
+
+
+class ChangeHistory:
+    """最近版本差异的环形缓冲区"""
+
+    def __init__(self, size=256):
+        self._changes = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, snapshot, previous):
+        """配置存储发布新快照时调用（在存储的加载锁内执行，只保存引用）"""
+        if previous is None or snapshot.version == previous.version:
+            return
+        with self._lock:
+            if self._changes and self._changes[-1].to_version != previous.version:
+                # 版本不连续（例如被外部修改后重新加载），更早的差异无法衔接
+                self._changes.clear()
+            self._changes.append(_Change(previous.version, snapshot.version,
+                                         previous.config, snapshot.config))
+
+    def changes_since(self, version, snapshot):
+        """返回从 version 到 snapshot 所在版本的 JSON Patch 操作列表
+
+        version 已超出保留范围或无法衔接时返回 None，调用方应改为返回完整配置。
+        """
+        if version == snapshot.version:
+            return []
+        with self._lock:
+            changes = list(self._changes)
+
+        ops = None
+        for change in changes:
+            if ops is None:
+                if change.from_version != version:
+                    continue
+                ops = []
+            ops.extend(change.ops())
+            if change.to_version == snapshot.version:
+                return ops
+        return None
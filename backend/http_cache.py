@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 响应缓存辅助
+功能: 预序列化的响应体及其 gzip / brotli 压缩版本，按 Accept-Encoding 协商编码；
+      以及使用 codec 的 Flask JSON 实现
+"""
+
+import gzip
+import hashlib
+import threading
+
+from flask.json.provider import DefaultJSONProvider
+
+import codec
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
+# 小于该长度的响应不压缩（与 nginx 的 gzip_min_length 保持一致）
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+# 按优先级排列的可用编码
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _compress(body, encoding):
+    if encoding == 'gzip':
+        # mtime 固定为 0，保证同一内容的压缩结果完全一致
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    raise ValueError(f"不支持的编码: {encoding}")
+
+
+class CachedPayload:
+    """一份预先序列化好的 JSON 响应体
+
+    原始字节和各压缩版本都只生成一次，之后由所有请求共享。
+    """
+
+    def __init__(self, data):
+        self.body = codec.dumps(data)
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def negotiate(self, accept_encodings):
+        """根据 Accept-Encoding 选择编码，返回 (编码, 响应体, ETag)
+
+        不压缩时编码为 None。不同编码的响应体不同，ETag 也带上编码后缀加以区分。
+        """
+        if len(self.body) >= MIN_COMPRESS_SIZE:
+            for encoding in SUPPORTED_ENCODINGS:
+                if accept_encodings.quality(encoding) > 0:
+                    return encoding, self.encoded(encoding), f"{self.etag}-{encoding}"
+        return None, self.body, self.etag
+
+    def encoded(self, encoding):
+        """返回指定编码的响应体，首次调用时压缩并缓存"""
+        body = self._encoded.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._encoded.get(encoding)
+                if body is None:
+                    body = _compress(self.body, encoding)
+                    self._encoded[encoding] = body
+        return body
+
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """Flask 的 JSON 实现: jsonify 和 request.get_json() 使用 codec（安装了 orjson 时更快）
+
+    响应体直接生成字节，不再经过 str 再编码；键保持原有顺序，中文不转义。
+    """
+
+    def dumps(self, obj, **kwargs):
+        return codec.dumps(obj, pretty='indent' in kwargs, sort_keys=kwargs.get('sort_keys', False),
+                           default=kwargs.get('default', self.default)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return codec.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        body = codec.dumps(obj, pretty=pretty, default=self.default) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
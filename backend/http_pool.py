@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+出站 HTTP 连接池
+功能: 按 (协议, 主机, 端口) 复用 http.client 连接，供访问第三方站点的后台功能使用
+
+目标地址由访客提供（网站图标）或来自配置，建立连接时解析域名并拒绝本机、内网、
+链路本地（含云平台元数据服务 169.254.169.254）和保留地址，重定向的每一跳都重新检查；
+连接直接使用检查过的 IP，域名不会在检查之后被重新解析到其他地址。
+需要访问内网服务（如本地测试用的替身服务）时把它加入 allow_hosts。
+"""
+
+import socket
+import ipaddress
+import http.client
+import threading
+from collections import deque
+from urllib.parse import urlsplit, urljoin
+
+USER_AGENT = 'Mozilla/5.0 (compatible; HomepageBot/2.0)'
+
+# 连接被服务端关闭等可以换一个新连接重试的错误
+_RETRYABLE = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+              ConnectionResetError, BrokenPipeError)
+
+
+class BlockedAddress(ValueError):
+    """目标地址是本机、内网、链路本地或保留地址"""
+
+
+def is_public_address(address):
+    """IP 地址可以从公网访问时返回 True（IPv4 映射的 IPv6 地址按 IPv4 判断）"""
+    ip = ipaddress.ip_address(address)
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class HTTPResponse:
+    """读取完毕的响应"""
+
+    __slots__ = ('status', 'headers', 'body', 'url', 'truncated')
+
+    def __init__(self, status, headers, body, url, truncated=False):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.url = url
+        self.truncated = truncated
+
+    @property
+    def content_type(self):
+        return (self.headers.get('content-type') or '').split(';')[0].strip().lower()
+
+
+class ConnectionPool:
+    """线程安全的 keep-alive 连接池
+
+    每个主机最多保留 max_idle 个空闲连接；响应体没有读完（超过 max_body）的连接直接关闭。
+    allow_hosts 中的域名、IP 或网段（如 127.0.0.1、10.0.0.0/8）不做公网地址检查。
+    """
+
+    def __init__(self, timeout=5.0, max_idle=4, max_body=512 * 1024, allow_hosts=()):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_body = max_body
+        self.allow_names = set()
+        self.allow_networks = []
+        for entry in allow_hosts:
+            entry = entry.strip().lower()
+            if not entry:
+                continue
+            try:
+                self.allow_networks.append(ipaddress.ip_network(entry, strict=False))
+            except ValueError:
+                self.allow_names.add(entry.rstrip('.'))
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    # ---------- 地址检查 ----------
+
+    def _address_allowed(self, address):
+        ip = ipaddress.ip_address(address)
+        return is_public_address(ip) or any(ip in network for network in self.allow_networks)
+
+    def resolve(self, host, port):
+        """解析域名，返回 getaddrinfo 的结果；任一地址不允许访问时抛出 BlockedAddress"""
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        if host.lower().rstrip('.') not in self.allow_names:
+            for info in infos:
+                if not self._address_allowed(info[4][0]):
+                    raise BlockedAddress(f"不允许访问内网或保留地址: {host} ({info[4][0]})")
+        return infos
+
+    def check_url(self, url):
+        """请求之前检查地址，目标不允许访问时抛出 BlockedAddress；域名无法解析时不报错（由请求本身失败）"""
+        parts = urlsplit(url)
+        if not parts.hostname:
+            return
+        try:
+            self.resolve(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        except socket.gaierror:
+            pass
+
+    def _create_connection(self, address, timeout=None, source_address=None):
+        """替换 http.client 的 socket.create_connection: 先检查解析结果，再直接连接检查过的 IP"""
+        host, port = address
+        error = None
+        for family, socktype, proto, _, sockaddr in self.resolve(host, port):
+            sock = socket.socket(family, socktype, proto)
+            try:
+                # http.client 总是传入连接池的 timeout
+                sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as e:
+                sock.close()
+                error = e
+        raise error or OSError(f"无法连接 {host}:{port}")
+
+    # ---------- 连接 ----------
+
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        conn = cls(host, port, timeout=self.timeout)
+        # HTTPS 仍按域名做 SNI 和证书校验，只是 TCP 连接使用检查过的 IP
+        conn._create_connection = self._create_connection
+        return conn, False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, url, headers=None, max_body=None):
+        """发送单个请求（不跟随重定向），返回 HTTPResponse"""
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"不支持的地址: {url}")
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        request_headers = {'User-Agent': USER_AGENT, 'Accept': '*/*'}
+        request_headers.update(headers or {})
+        limit = self.max_body if max_body is None else max_body
+
+        for attempt in range(2):
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(method, path, headers=request_headers)
+                response = conn.getresponse()
+                body = response.read(limit + 1) if method != 'HEAD' else response.read()
+            except _RETRYABLE:
+                conn.close()
+                if reused and attempt == 0:
+                    # 空闲连接已被服务端关闭，换新连接重试一次
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            truncated = len(body) > limit
+            if truncated:
+                body = body[:limit]
+            if response.isclosed() and not response.will_close:
+                self._release(key, conn)
+            else:
+                conn.close()
+            return HTTPResponse(response.status, {k.lower(): v for k, v in response.getheaders()},
+                                body, url, truncated)
+
+    def fetch(self, method, url, headers=None, max_body=None, max_redirects=3):
+        """发送请求并跟随重定向，返回最终的 HTTPResponse（url 为最终地址）"""
+        for _ in range(max_redirects + 1):
+            response = self.request(method, url, headers=headers, max_body=max_body)
+            location = response.headers.get('location')
+            if response.status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                if response.status == 303:
+                    method = 'GET'
+                continue
+            return response
+        return response
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片缩略图服务
+功能: 把背景预设等大图缩放为几档标准宽度的 WebP / JPEG 版本
+
+- 源图可以是站点目录下的本地文件，也可以是配置中引用的远程图片（下载一次后缓存原图）
+- 同一源图、宽度、格式的结果只生成一次，由有界线程池渲染，并发请求合并为一次渲染
+- 结果按内容寻址保存在磁盘缓存中（源图内容变化后自动生成新文件），
+  总大小超过上限时按最近使用时间淘汰
+- Pillow 为可选依赖，未安装时 available 为 False
+"""
+
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from io import BytesIO
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import safe_join
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 为可选依赖，未安装时缩略图接口返回 501
+    Image = ImageOps = None
+
+from caching import MISSING, PersistentCache, SingleFlight
+from http_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# 标准宽度，请求的宽度向上取整到其中一档，避免任意宽度把缓存撑爆
+STANDARD_WIDTHS = (160, 320, 640, 960, 1280, 1920)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+LOCAL_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp')
+# 渲染参数变化时递增，使旧的缓存文件不再命中
+RENDER_VERSION = 1
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+MAX_SOURCE_PIXELS = 50_000_000
+
+
+class ImageSourceError(ValueError):
+    """源图地址无效、不允许或无法读取"""
+
+
+class ImageUnavailable(Exception):
+    """未安装 Pillow"""
+
+
+def snap_width(width):
+    """把请求的宽度向上取整到标准宽度"""
+    for standard in STANDARD_WIDTHS:
+        if width <= standard:
+            return standard
+    return STANDARD_WIDTHS[-1]
+
+
+def collect_image_urls(value, urls=None):
+    """收集配置中出现的所有 http(s) 地址，只有这些远程图片允许缩放"""
+    if urls is None:
+        urls = set()
+    if isinstance(value, dict):
+        for item in value.values():
+            collect_image_urls(item, urls)
+    elif isinstance(value, list):
+        for item in value:
+            collect_image_urls(item, urls)
+    elif isinstance(value, str) and value.startswith(('http://', 'https://')):
+        urls.add(value)
+    return urls
+
+
+def render(data, width, fmt):
+    """把源图缩放到不超过 width 的宽度并编码为 fmt，返回字节串（在工作线程中执行）"""
+    pil_format, _, options = FORMATS[fmt]
+    with Image.open(BytesIO(data)) as image:
+        if image.width * image.height > MAX_SOURCE_PIXELS:
+            raise ImageSourceError(f"图片尺寸过大: {image.width}x{image.height}")
+        # JPEG 可以在解码时直接按 2 的幂缩小，大图省去大部分解码开销
+        # （按正方形请求，EXIF 旋转后宽度仍不小于 width）
+        image.draft('RGB', (width, width))
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+
+        if fmt == 'jpeg' or image.mode not in ('RGB', 'RGBA'):
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha and fmt == 'webp' else 'RGB')
+
+        output = BytesIO()
+        image.save(output, pil_format, **options)
+        return output.getvalue()
+
+
+class ThumbnailService:
+    """生成并缓存缩略图"""
+
+    def __init__(self, cache_dir, local_roots, max_bytes=256 * 1024 * 1024, max_workers=2,
+                 source_ttl=86400.0, timeout=10.0, allow_hosts=()):
+        self.cache_dir = cache_dir
+        self.local_roots = [os.path.abspath(root) for root in local_roots]
+        self.max_bytes = max_bytes
+        self.source_ttl = source_ttl
+        self.http = ConnectionPool(timeout=timeout, max_body=MAX_SOURCE_BYTES, allow_hosts=allow_hosts)
+        # 远程地址 -> 原图内容哈希
+        self.remote_sources = PersistentCache(os.path.join(cache_dir, 'sources.json'),
+                                              max_entries=1000, ttl=source_ttl)
+        # (本地路径, 修改时间, 大小) -> 原图内容哈希
+        self._local_digests = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='thumbnail')
+        self._flight = SingleFlight()
+        self._size_lock = threading.Lock()
+        self._total_bytes = None
+
+    @property
+    def available(self):
+        return Image is not None
+
+    # ---------- 源图 ----------
+
+    def _blob_path(self, kind, digest, ext=''):
+        return os.path.join(self.cache_dir, kind, digest[:2], digest + ext)
+
+    def _local_source(self, src, local_roots=None):
+        path = None
+        roots = self.local_roots if local_roots is None else [os.path.abspath(root) for root in local_roots]
+        for root in roots:
+            candidate = safe_join(root, src.lstrip('/'))
+            if candidate is not None and os.path.isfile(candidate):
+                path = candidate
+                break
+        if path is None or not path.lower().endswith(LOCAL_EXTENSIONS):
+            raise ImageSourceError(f"图片不存在: {src}")
+
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        digest = self._local_digests.get(key)
+        if digest is None:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            self._local_digests[key] = digest
+        return digest, path
+
+    def _remote_source(self, url, refresh):
+        if not refresh:
+            digest = self.remote_sources.get(url)
+            if digest is not MISSING:
+                path = self._blob_path('sources', digest)
+                try:
+                    # 与缩略图一样更新修改时间，常用的原图不会被优先淘汰
+                    os.utime(path)
+                    return digest, path
+                except FileNotFoundError:
+                    pass
+
+        def download():
+            try:
+                response = self.http.fetch('GET', url, headers={'Accept': 'image/*'})
+            except Exception as e:
+                raise ImageSourceError(f"下载图片失败: {e}") from e
+            if response.status != 200:
+                raise ImageSourceError(f"下载图片失败: HTTP {response.status}")
+            if response.truncated:
+                raise ImageSourceError("图片文件过大")
+            digest = hashlib.sha1(response.body).hexdigest()
+            path = self._blob_path('sources', digest)
+            if not os.path.exists(path):
+                self._store(path, response.body)
+            self.remote_sources.set(url, digest)
+            logger.info(f"🖼️ 已缓存原图 {url} ({len(response.body) // 1024} KB)")
+            return digest, path
+
+        return self._flight.do(('source', url), download)
+
+    def resolve_source(self, src, allowed_urls, refresh=False, local_roots=None):
+        """返回 (原图内容哈希, 原图路径)；地址无效或不允许时抛出 ImageSourceError
+
+        local_roots 不为空时在这些目录（而不是构造时指定的目录）中查找站内图片。
+        """
+        if src.startswith(('http://', 'https://')):
+            if src not in allowed_urls:
+                raise ImageSourceError("只能缩放配置中引用的远程图片")
+            if not urlsplit(src).hostname:
+                raise ImageSourceError(f"无效的图片地址: {src}")
+            return self._remote_source(src, refresh)
+        if '://' in src or src.startswith('//'):
+            raise ImageSourceError(f"不支持的图片地址: {src}")
+        return self._local_source(src, local_roots)
+
+    # ---------- 缩略图 ----------
+
+    def thumbnail(self, src, width, fmt, allowed_urls, refresh=False, local_roots=None):
+        """返回 (缩略图路径, 内容类型, ETag)，结果不存在时在线程池中生成"""
+        if not self.available:
+            raise ImageUnavailable("服务端未安装 Pillow")
+        if fmt not in FORMATS:
+            raise ImageSourceError(f"不支持的图片格式: {fmt}")
+        width = snap_width(width)
+        digest, source_path = self.resolve_source(src, allowed_urls, refresh, local_roots)
+
+        key = hashlib.sha1(f"{digest}:{width}:{fmt}:{RENDER_VERSION}".encode()).hexdigest()
+        path = self._blob_path('renditions', key, '.' + fmt)
+        mimetype = FORMATS[fmt][1]
+        try:
+            # 更新修改时间，淘汰时按它判断最近使用
+            os.utime(path)
+            return path, mimetype, key
+        except FileNotFoundError:
+            pass
+
+        def read_source():
+            try:
+                with open(source_path, 'rb') as f:
+                    return f.read()
+            except OSError:
+                pass
+            # 解析之后原图可能已被淘汰（或站内图片被删除），重新获取一次
+            try:
+                retry_digest, retry_path = self.resolve_source(src, allowed_urls, True, local_roots)
+                if retry_digest != digest:
+                    raise ImageSourceError("原图内容已变化，请重试")
+                with open(retry_path, 'rb') as f:
+                    return f.read()
+            except OSError as e:
+                raise ImageSourceError(f"读取原图失败: {e}") from e
+
+        def generate():
+            if os.path.exists(path):
+                return
+            data = read_source()
+            started = time.monotonic()
+            try:
+                output = self._pool.submit(render, data, width, fmt).result()
+            except ImageSourceError:
+                raise
+            except Exception as e:
+                raise ImageSourceError(f"无法处理图片: {e}") from e
+            self._store(path, output)
+            logger.info(f"🖼️ 生成缩略图 {src} {width}w {fmt}: {len(data) // 1024} KB -> "
+                        f"{len(output) // 1024} KB（{(time.monotonic() - started) * 1000:.0f} ms）")
+
+        self._flight.do(key, generate)
+        return path, mimetype, key
+
+    # ---------- 磁盘缓存 ----------
+
+    def _store(self, path, data):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.image.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        with self._size_lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data)
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _files(self):
+        for kind in ('sources', 'renditions'):
+            for root, _, names in os.walk(os.path.join(self.cache_dir, kind)):
+                for name in names:
+                    if not name.startswith('.'):
+                        yield os.path.join(root, name)
+
+    def _scan_size(self):
+        total = 0
+        for path in self._files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def evict(self):
+        """删除最久未使用的文件，直到总大小降到上限的 80% 以下"""
+        with self._size_lock:
+            entries = []
+            for path in self._files():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * 0.8
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            self._total_bytes = total
+        if removed:
+            logger.info(f"🧹 图片缓存淘汰了 {removed} 个文件，当前 {total // 1024 // 1024} MB")
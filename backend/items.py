@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数组类配置项目的稳定 ID
+功能: 为 skills / projects / friendLinks / socialLinks 中的每个项目分配服务端 ID，
+      使接口可以按 ID 而不是易变的数组下标定位项目
+"""
+
+import json
+import secrets
+import hashlib
+
+# 需要分配 ID 的配置部分及其 ID 前缀（前缀保证 ID 不会是纯数字，与下标路由区分）
+ID_COLLECTIONS = {
+    'skills': 'sk',
+    'projects': 'pj',
+    'friendLinks': 'fl',
+    'socialLinks': 'sl',
+}
+
+ID_FIELD = 'id'
+
+
+def new_item_id(section):
+    """生成一个随机的新项目 ID"""
+    return f"{ID_COLLECTIONS[section]}-{secrets.token_hex(5)}"
+
+
+def _derived_item_id(section, item, salt):
+    """根据项目内容推导 ID
+
+    同一份配置在任何进程、任何时候推导出的 ID 都相同，
+    这样重放变更日志或多个工作进程各自迁移时结果一致。
+    """
+    data = json.dumps(item, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha1(f"{section}:{salt}:{data}".encode('utf-8')).hexdigest()
+    return f"{ID_COLLECTIONS[section]}-{digest[:10]}"
+
+
+def _assign_ids(section, items):
+    """返回补齐 ID 后的列表；没有需要修改的项目时原样返回"""
+    seen = set()
+    result = None
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        item_id = item.get(ID_FIELD)
+        if isinstance(item_id, str) and item_id and item_id not in seen:
+            seen.add(item_id)
+            continue
+
+        salt = 0
+        item_id = _derived_item_id(section, item, salt)
+        while item_id in seen:
+            salt += 1
+            item_id = _derived_item_id(section, item, salt)
+        seen.add(item_id)
+
+        if result is None:
+            result = list(items)
+        result[position] = dict(item, **{ID_FIELD: item_id})
+    return items if result is None else result
+
+
+def assign_item_ids(config, previous=None):
+    """为缺少 ID（或 ID 重复）的项目补齐 ID，返回新配置；无需修改时原样返回
+
+    previous 为上一版本的配置时，与之相同（同一对象）的部分直接跳过。
+    不修改传入的配置，只复制发生变化的列表。
+    """
+    new_config = None
+    for section in ID_COLLECTIONS:
+        items = config.get(section)
+        if not isinstance(items, list):
+            continue
+        if previous is not None and previous.get(section) is items:
+            continue
+        assigned = _assign_ids(section, items)
+        if assigned is not items:
+            if new_config is None:
+                new_config = dict(config)
+            new_config[section] = assigned
+    return config if new_config is None else new_config
+
+
+def build_id_index(items):
+    """构建 ID -> 数组下标 的索引"""
+    index = {}
+    if isinstance(items, list):
+        for position, item in enumerate(items):
+            if isinstance(item, dict) and ID_FIELD in item:
+                index[item[ID_FIELD]] = position
+    return index
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置变更日志（预写日志）
+功能: 细粒度的配置修改以紧凑的 JSON 行追加到日志文件，
+      并发提交的修改合并为一次 fsync（组提交），由后台整理线程定期合并回 config.json
+
+日志文件格式（每行一个 JSON 对象）:
+    {"type": "header", "base": "<config.json 内容的 sha1>", "version": 12}
+    {"v": 13, "op": "append", "section": "skills", "value": {...}}
+    {"v": 14, "op": "delete", "section": "projects", "index": 3}
+    {"v": 15, "op": "patch", "format": "json-patch", "patch": [...]}
+
+header 记录了日志所基于的 config.json 内容，只有 config.json 与之匹配时
+后续记录才会被重放；不匹配说明日志已合并过或配置文件被外部修改。
+"""
+
+import os
+import time
+import tempfile
+import threading
+import logging
+
+import codec
+from items import ID_FIELD
+from patch import apply_patch
+
+logger = logging.getLogger(__name__)
+
+
+def apply_mutation(config, record):
+    """把一条变更记录应用到配置上，返回 (新配置, 操作结果)
+
+    不会修改传入的配置: 只复制被修改的容器，未改动的部分与旧配置共享，
+    因此旧快照仍可被读请求安全使用。
+    """
+    op = record['op']
+    if op == 'patch':
+        return apply_patch(config, record['format'], record['patch']), None
+
+    section = record['section']
+    new_config = dict(config)
+
+    if op == 'set':
+        new_config[section] = record['value']
+        return new_config, None
+
+    if op == 'append':
+        items = config.get(section)
+        if items is None:
+            items = []
+        if not isinstance(items, list):
+            raise ValueError(f"配置部分 '{section}' 不是数组类型")
+        new_config[section] = items + [record['value']]
+        return new_config, None
+
+    if op in ('replace', 'delete'):
+        if section not in config:
+            raise ValueError(f"配置部分 '{section}' 不存在")
+        items = config[section]
+        if not isinstance(items, list):
+            raise ValueError(f"配置部分 '{section}' 不是数组类型")
+        index = record['index']
+        if index < 0 or index >= len(items):
+            raise ValueError(f"索引 {index} 超出范围")
+
+        items = list(items)
+        if op == 'replace':
+            value = record['value']
+            previous = items[index]
+            # 替换时保留原项目的 ID
+            if (isinstance(previous, dict) and ID_FIELD in previous
+                    and isinstance(value, dict) and ID_FIELD not in value):
+                value = dict(value, **{ID_FIELD: previous[ID_FIELD]})
+            items[index] = value
+            result = None
+        else:
+            result = items.pop(index)
+        new_config[section] = items
+        return new_config, result
+
+    raise ValueError(f"未知的变更操作: {op}")
+
+
+def encode_record(record):
+    return codec.dumps(record) + b'\n'
+
+
+class MutationJournal:
+    """追加写入的变更日志，支持组提交
+
+    append() 需要在调用方的写锁内执行，只负责把记录写入文件（不 fsync）；
+    sync() 在写锁外调用，等待记录落盘。同一时刻只有一个线程执行 fsync，
+    期间到达的其他记录由下一次 fsync 一并提交。
+    """
+
+    def __init__(self, path, commit_delay=0.0):
+        self.path = path
+        self.commit_delay = commit_delay
+        self._fd = None
+        self._fd_ino = None
+        self._cond = threading.Condition()
+        self._written = 0
+        self._synced = 0
+        self._syncing = False
+        # fsync 失败的批次 [(首个凭据, 最后一个凭据, 异常)]，这些记录不能报告为已落盘
+        self._sync_errors = []
+
+    # ---------- 读取 ----------
+
+    def stat(self):
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    def read(self, offset=0):
+        """从 offset 开始读取完整的记录行，返回 (记录列表, 新的 offset)
+
+        末尾没有换行的半行（写入时崩溃留下的）会被忽略。
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+
+        end = data.rfind(b'\n') + 1
+        records = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(codec.loads(line))
+            except ValueError:
+                logger.warning("⚠️ 跳过无法解析的变更日志记录")
+        return records, offset + end
+
+    # ---------- 写入 ----------
+
+    def _ensure_open(self):
+        """打开（或在日志被其他进程替换后重新打开）追加写入的文件描述符"""
+        st = self.stat()
+        if self._fd is not None and st is not None and st.st_ino == self._fd_ino:
+            return
+        self._close()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        # 截掉崩溃遗留的半行，避免新记录拼接在残缺数据之后
+        size = os.fstat(fd).st_size
+        if size:
+            os.lseek(fd, 0, os.SEEK_SET)
+            data = os.read(fd, size)
+            end = data.rfind(b'\n') + 1
+            if end != size:
+                os.ftruncate(fd, end)
+        self._fd = fd
+        self._fd_ino = os.fstat(fd).st_ino
+
+    def append(self, record):
+        """写入一条记录（调用方需持有写锁），返回 (提交凭据, 写入后的文件状态)"""
+        self._ensure_open()
+        os.write(self._fd, encode_record(record))
+        st = os.fstat(self._fd)
+        with self._cond:
+            self._written += 1
+            return self._written, st
+
+    def _sync_error(self, ticket):
+        """凭据所在批次 fsync 失败时返回该异常（调用方需持有 _cond）"""
+        for first, last, error in self._sync_errors:
+            if first <= ticket <= last:
+                return error
+        return None
+
+    def sync(self, ticket):
+        """等待凭据对应的记录落盘（组提交）；所在批次 fsync 失败时抛出 OSError"""
+        with self._cond:
+            while True:
+                error = self._sync_error(ticket)
+                if error is not None:
+                    raise OSError(f"变更日志落盘失败: {error}") from error
+                if self._synced >= ticket:
+                    return
+                if not self._syncing:
+                    self._syncing = True
+                    break
+                self._cond.wait()
+
+        batch = None
+        try:
+            if self.commit_delay:
+                # 稍等片刻，让同一时间窗口内的其他修改搭上这次 fsync
+                time.sleep(self.commit_delay)
+            with self._cond:
+                batch = (self._synced + 1, self._written)
+                fd = self._fd
+            os.fsync(fd)
+        except BaseException as e:
+            with self._cond:
+                self._syncing = False
+                if batch is not None:
+                    # 同一批次的其他等待者醒来后同样报告失败，而不是误以为已经落盘
+                    self._sync_errors.append(batch + (e,))
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._syncing = False
+            # 只有 fsync 成功返回后才推进已落盘位置
+            self._synced = max(self._synced, batch[1])
+            self._cond.notify_all()
+
+    def reset(self, header):
+        """以只包含 header 的新文件原子替换日志（调用方需持有写锁）
+
+        调用前日志中的记录必须已经合并进 config.json 并落盘。
+        """
+        with self._cond:
+            # 等待进行中的 fsync 结束，之后旧记录都已由 config.json 覆盖
+            while self._syncing:
+                self._cond.wait()
+            self._synced = self._written
+            # 旧记录（包括 fsync 失败的批次）已随 config.json 落盘，失败记录一并清空
+            self._sync_errors.clear()
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.journal.', suffix='.tmp', dir=directory)
+        try:
+            os.chmod(tmp_path, 0o644)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(encode_record(header))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._close()
+        self._ensure_open()
+        return os.fstat(self._fd)
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._fd_ino = None
+
+    def close(self):
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+        self._close()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志管道
+功能: 请求线程只把日志记录放进队列，由后台线程写文件，磁盘 I/O 不再占用请求耗时
+
+- 队列有上限，写满时丢弃新记录而不是阻塞请求（丢弃数见 /api/metrics）
+- 日志文件按大小或按时间轮转，保留固定数量的旧文件
+- 文件中每行一个 JSON 对象，带请求 ID；每个请求一行访问日志，带状态码和耗时
+- 配置读取等高频事件按消息限速，高频只读接口的访问日志按比例采样
+- 多进程部署（serve.py）时所有工作进程的记录经同一个进程间队列交给主进程写出，
+  只有一个进程写文件和轮转
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing
+import logging.handlers
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+from metrics import REGISTRY
+
+LOG_DROPPED = REGISTRY.counter('homepage_log_records_dropped_total', '日志队列已满被丢弃的记录数')
+LOG_SUPPRESSED = REGISTRY.counter(
+    'homepage_log_records_suppressed_total', '被限速或采样省略的日志记录数', ('reason',))
+_SUPPRESSED_RATE = LOG_SUPPRESSED.labels('rate_limit')
+_SUPPRESSED_SAMPLE = LOG_SUPPRESSED.labels('sample')
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# 高频事件的限速规则: (logger 名称, 消息前缀, 间隔秒数, 每个间隔内最多输出的条数)
+DEFAULT_RATE_LIMITS = (
+    ('config_store', '📖', 60.0, 5),
+)
+# 访问日志按比例采样的只读接口（失败的请求总是记录）
+SAMPLED_ENDPOINTS = frozenset({'get_config', 'get_config_changes', 'index', 'static_files',
+                               'get_metrics', 'get_image_thumbnail'})
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# LogRecord 自带的属性，其余属性视为调用方通过 extra 传入的字段
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行 JSON"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """在请求线程中为记录补上请求 ID（必须挂在队列处理器上，写出线程没有请求上下文）"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id') and has_request_context():
+            request_id = g.get('request_id')
+            if request_id is not None:
+                record.request_id = request_id
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """按 (logger, 消息前缀) 限速，每个间隔内最多输出 burst 条
+
+    被省略的条数附在下一条输出的记录上（suppressed 字段）。
+    """
+
+    def __init__(self, rules=DEFAULT_RATE_LIMITS):
+        super().__init__()
+        self.rules = tuple(rules)
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        for index, (name, prefix, interval, burst) in enumerate(self.rules):
+            if record.name != name or not isinstance(record.msg, str) or not record.msg.startswith(prefix):
+                continue
+            now = time.monotonic()
+            with self._lock:
+                started, count, suppressed = self._windows.get(index, (now, 0, 0))
+                if now - started >= interval:
+                    started, count = now, 0
+                if count >= burst:
+                    self._windows[index] = (started, count, suppressed + 1)
+                    _SUPPRESSED_RATE.inc()
+                    return False
+                self._windows[index] = (started, count + 1, 0)
+            if suppressed:
+                record.suppressed = suppressed
+            return True
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列已满时丢弃记录，绝不阻塞调用方"""
+
+    def prepare(self, record):
+        # 在调用线程中展开消息和异常文本，记录可以安全地跨线程 / 跨进程传递；
+        # 队列处理器是根 logger 唯一的处理器，直接修改记录，省去复制一份的开销
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # 队列满时也要等到结束标记放进去，保证停止前写完已入队的记录
+        self.queue.put(self._sentinel)
+
+
+def file_handler(path, max_bytes=10 * 1024 * 1024, backup_count=7, when=None):
+    """when 不为空（如 'midnight'、'H'）时按时间轮转，否则按大小轮转"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding='utf-8', delay=True)
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+
+
+class LogPipeline:
+    """根 logger -> 有界队列 -> 后台写出线程 -> 文件 / 控制台"""
+
+    def __init__(self, handlers, queue_size=10000, level=logging.INFO, rate_limits=DEFAULT_RATE_LIMITS):
+        self.handlers = handlers
+        self.queue_size = queue_size
+        self.handler = DroppingQueueHandler(queue.Queue(queue_size))
+        self.handler.addFilter(RequestContextFilter())
+        self.handler.addFilter(RateLimitFilter(rate_limits))
+        self.listener = None
+        self._listener_pid = None
+
+        root = logging.getLogger()
+        for existing in root.handlers[:]:
+            root.removeHandler(existing)
+        root.addHandler(self.handler)
+        root.setLevel(level)
+        self._start(self.handler.queue)
+        # 退出前写完队列中剩余的记录
+        atexit.register(self.stop)
+
+    def _start(self, log_queue):
+        self.listener = _Listener(log_queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+        self._listener_pid = os.getpid()
+
+    def use_process_queue(self):
+        """改用进程间队列（在 fork 工作进程之前于主进程调用）
+
+        工作进程继承的处理器把记录放进同一个队列，只有主进程的写出线程写文件，
+        多个进程不会同时轮转同一个日志文件。
+        """
+        self.listener.stop()
+        process_queue = multiprocessing.Queue(self.queue_size)
+        self.handler.queue = process_queue
+        self._start(process_queue)
+
+    def stop(self):
+        """停止写出线程（会先写完队列中剩余的记录）
+
+        工作进程继承的 listener 并没有在运行，不能向共享队列发送结束标记。
+        """
+        if self.listener is not None and self._listener_pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+
+
+def setup_logging(log_file, level='INFO', json_format=True, console=None, max_bytes=10 * 1024 * 1024,
+                  backup_count=7, when=None, queue_size=10000, rate_limits=DEFAULT_RATE_LIMITS):
+    """配置全局日志，返回 LogPipeline
+
+    console 为 None 时仅在标准错误是终端时输出到控制台（nohup 启动时不再重复写一份）。
+    """
+    handlers = []
+    output = file_handler(log_file, max_bytes=max_bytes, backup_count=backup_count, when=when)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    handlers.append(output)
+    if console is None:
+        console = sys.stderr.isatty()
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(stream)
+
+    pipeline = LogPipeline(handlers, queue_size=queue_size,
+                           level=getattr(logging, str(level).upper(), logging.INFO),
+                           rate_limits=rate_limits)
+    return pipeline
+
+
+def _request_id():
+    """沿用上游（nginx 等）传入的请求 ID，否则生成一个"""
+    incoming = request.headers.get(REQUEST_ID_HEADER, '')
+    if 0 < len(incoming) <= 64 and incoming.replace('-', '').isalnum():
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+def install_request_logging(app, access_log=True, sample_every=10):
+    """为每个请求分配请求 ID（响应头 X-Request-ID），并写一行访问日志
+
+    SAMPLED_ENDPOINTS 中成功的请求每 sample_every 条只记录一条（sampled 字段为采样倍数）。
+    """
+    access = logging.getLogger('access')
+    counters = {}
+    counter_lock = threading.Lock()
+    if access_log:
+        # 开发服务器自己的请求日志与访问日志重复
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    @app.before_request
+    def _assign_request_id():
+        g.request_id = _request_id()
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        request_id = g.get('request_id')
+        if request_id is None:
+            return response
+        response.headers[REQUEST_ID_HEADER] = request_id
+        if not access_log:
+            return response
+
+        endpoint = request.endpoint or 'unmatched'
+        sampled = 1
+        if endpoint in SAMPLED_ENDPOINTS and response.status_code < 400 and sample_every > 1:
+            with counter_lock:
+                count = counters.get(endpoint, 0)
+                counters[endpoint] = count + 1
+            if count % sample_every:
+                _SUPPRESSED_SAMPLE.inc()
+                return response
+            sampled = sample_every
+
+        duration_ms = round((time.perf_counter() - g.request_started) * 1000, 2)
+        access.info(f"{request.method} {request.full_path.rstrip('?')} {response.status_code} {duration_ms}ms",
+                    extra={'method': request.method, 'path': request.path, 'endpoint': endpoint,
+                           'status': response.status_code, 'duration_ms': duration_ms,
+                           'remote_addr': request.headers.get('X-Real-IP', request.remote_addr),
+                           'sampled': sampled})
+        return response
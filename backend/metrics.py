@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标
+功能: 进程内的计数器 / 仪表 / 直方图，以 Prometheus 文本格式导出
+
+- 记录一次指标只是一次加锁的整数加法，可以在生产环境常开
+- 多进程部署（serve.py）时每个工作进程定期把自己的指标写到共享目录，
+  导出时合并所有进程的结果，无论请求落到哪个进程看到的都是全局数据
+- 不依赖 prometheus_client
+"""
+
+import os
+import json
+import time
+import bisect
+import atexit
+import tempfile
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# 请求耗时的默认分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _CounterChild:
+    __slots__ = ('_value', '_lock')
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def state(self):
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = 0.0
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value):
+        self._value = value
+
+
+class _HistogramChild:
+    __slots__ = ('_bounds', '_counts', '_sum', '_lock')
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def state(self):
+        with self._lock:
+            return self._counts[:] + [self._sum]
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self._bounds) + 1)
+            self._sum = 0.0
+
+
+class _Metric:
+    kind = None
+    child_class = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        return self.child_class()
+
+    def labels(self, *values):
+        """返回指定标签值的子指标（热路径上应预先取好并复用）"""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def collect(self):
+        """返回 {标签值: 状态}"""
+        return {values: child.state() for values, child in list(self._children.items())}
+
+    def reset(self):
+        """清零所有子指标（保留对象本身，调用方预先取好的子指标仍然有效）"""
+        for child in list(self._children.values()):
+            child.reset()
+
+    @staticmethod
+    def merge(states):
+        merged = {}
+        for state in states:
+            for values, value in state.items():
+                merged[values] = merged.get(values, 0) + value
+        return merged
+
+    def render(self, state):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in sorted(state.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    child_class = _CounterChild
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """仪表；function 不为空时在导出时调用 function() 取值
+    （有标签时 function 返回 {标签值元组: 值}）
+
+    multiprocess_mode 决定多进程合并方式: 'sum' 为存活进程之和，'max' 为最大值。
+    """
+    kind = 'gauge'
+    child_class = _GaugeChild
+
+    def __init__(self, name, documentation, labelnames=(), function=None, multiprocess_mode='sum'):
+        self.function = function
+        self.multiprocess_mode = multiprocess_mode
+        super().__init__(name, documentation, labelnames)
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def collect(self):
+        if self.function is None:
+            return super().collect()
+        try:
+            value = self.function()
+        except Exception as e:
+            logger.debug(f"读取指标 {self.name} 失败: {e}")
+            return {}
+        if value is None:
+            return {}
+        if self.labelnames:
+            return {tuple(str(label) for label in values): item
+                    for values, item in value.items() if item is not None}
+        return {(): value}
+
+    def merge(self, states):
+        if self.multiprocess_mode != 'max':
+            return super().merge(states)
+        merged = {}
+        for state in states:
+            for values, value in state.items():
+                merged[values] = max(merged.get(values, value), value)
+        return merged
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    @staticmethod
+    def merge(states):
+        merged = {}
+        for state in states:
+            for values, value in state.items():
+                if values in merged:
+                    merged[values] = [a + b for a, b in zip(merged[values], value)]
+                else:
+                    merged[values] = list(value)
+        return merged
+
+    def render(self, state):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, value in sorted(state.items()):
+            counts, total = value[:-1], value[-1]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, [('le', _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._share_dir = None
+        self._share_pid = None
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标 {metric.name} 已存在")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None, multiprocess_mode='sum'):
+        return self.register(Gauge(name, documentation, labelnames, function, multiprocess_mode))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collect(self):
+        return {name: metric.collect() for name, metric in list(self._metrics.items())}
+
+    # ---------- 多进程 ----------
+
+    def share(self, directory, interval=5.0):
+        """定期把本进程的指标写到 directory，导出时合并目录中所有进程的数据
+
+        在 fork 出的工作进程中调用：先清空继承自主进程的数值（主进程的数值已由
+        dump() 写入它自己的文件），再启动后台写出线程。
+        """
+        if self._share_pid == os.getpid():
+            return
+        for metric in list(self._metrics.values()):
+            metric.reset()
+        self._share_dir = directory
+        self._share_pid = os.getpid()
+        threading.Thread(target=self._share_loop, args=(interval,),
+                         name='metrics-share', daemon=True).start()
+        atexit.register(self.dump)
+
+    def prepare_share(self, directory, reset=True):
+        """在主进程 fork 之前调用: 清除上次运行留下的文件，并写出主进程已有的指标
+
+        只删除已退出进程的文件；平滑重启时 reset 为 False，旧主进程及其工作进程的数据全部保留，
+        新旧两代进程并存期间导出的仍是全局数据，重启前后计数连续。
+        """
+        if reset:
+            try:
+                for name in os.listdir(directory):
+                    pid = self._file_pid(name)
+                    if pid is not None and not self._alive(pid):
+                        os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+        self.dump(directory)
+        self._share_dir = directory
+
+    def mark_process_dead(self, pid):
+        """在主进程中回收退出的工作进程后调用: 去掉它文件中的仪表值并标记为已退出
+
+        计数和直方图保留（已退出进程的计数仍计入总数）；不再依赖 PID 是否存活判断，
+        PID 被新进程复用后旧的仪表值也不会重新出现。
+        """
+        if self._share_dir is None:
+            return
+        path = os.path.join(self._share_dir, f'metrics-{pid}.json')
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            data['metrics'] = {name: samples for name, samples in data['metrics'].items()
+                               if name in self._metrics and self._metrics[name].kind != 'gauge'}
+            data['dead'] = True
+            fd, tmp_path = tempfile.mkstemp(prefix='.metrics.', suffix='.tmp', dir=self._share_dir)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ 标记进程 {pid} 的运行指标失败: {e}")
+
+    @staticmethod
+    def _file_pid(name):
+        """metrics-<pid>.json 中的 PID，不是指标文件时返回 None"""
+        if not (name.startswith('metrics-') and name.endswith('.json')):
+            return None
+        try:
+            return int(name[len('metrics-'):-len('.json')])
+        except ValueError:
+            return None
+
+    def _share_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            self.dump()
+
+    def dump(self, directory=None):
+        """把本进程当前的指标写到 directory/metrics-<pid>.json"""
+        directory = directory or self._share_dir
+        if directory is None:
+            return
+        data = {name: [[list(values), value] for values, value in state.items()]
+                for name, state in self.collect().items()}
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.metrics.', suffix='.tmp', dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'pid': os.getpid(), 'metrics': data}, f, separators=(',', ':'))
+            os.replace(tmp_path, os.path.join(directory, f'metrics-{os.getpid()}.json'))
+        except Exception as e:
+            logger.warning(f"⚠️ 写出运行指标失败: {e}")
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _other_processes(self):
+        """读取其他进程写出的指标，返回 [(是否存活, {指标名: 状态})]"""
+        results = []
+        try:
+            names = os.listdir(self._share_dir)
+        except FileNotFoundError:
+            return results
+        for name in names:
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self._share_dir, name)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data['pid'] == os.getpid():
+                continue
+            state = {metric: {tuple(values): value for values, value in samples}
+                     for metric, samples in data['metrics'].items()}
+            results.append((not data.get('dead') and self._alive(data['pid']), state))
+        return results
+
+    # ---------- 导出 ----------
+
+    def render(self):
+        """生成 Prometheus 文本格式"""
+        local = self.collect()
+        others = self._other_processes() if self._share_dir is not None else []
+        lines = []
+        for name, metric in list(self._metrics.items()):
+            states = [local.get(name, {})]
+            for alive, state in others:
+                # 已退出进程的计数仍然有效，仪表值则不再有意义
+                if name in state and (alive or metric.kind != 'gauge'):
+                    states.append(state[name])
+            lines.extend(metric.render(metric.merge(states) if len(states) > 1 else states[0]))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'homepage_http_requests_total', 'HTTP 请求数', ('endpoint', 'method', 'status'))
+HTTP_LATENCY = REGISTRY.histogram(
+    'homepage_http_request_duration_seconds', 'HTTP 请求处理耗时（流式响应只计到开始发送）', ('endpoint',))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'homepage_http_requests_in_flight', '正在处理的 HTTP 请求数', ('endpoint',))
+
+
+def instrument_app(app):
+    """为 Flask 应用登记请求数、状态码、耗时和并发数，按路由的 endpoint 名称区分"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        endpoint = request.endpoint or 'unmatched'
+        g._metrics = (endpoint, time.perf_counter())
+        HTTP_IN_FLIGHT.labels(endpoint).inc()
+
+    @app.after_request
+    def _record(response):
+        started = g.get('_metrics')
+        if started is not None:
+            endpoint, start = started
+            HTTP_LATENCY.labels(endpoint).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+        return response
+
+    @app.teardown_request
+    def _finish(exc):
+        started = g.pop('_metrics', None)
+        if started is not None:
+            HTTP_IN_FLIGHT.labels(started[0]).dec()
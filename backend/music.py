@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音乐信息代理
+功能: 由服务端获取并缓存歌曲信息，访客浏览器不再直接请求第三方音乐接口
+
+- 每首歌的信息缓存在磁盘上的 LRU 中，过期前不再请求上游，重启后仍然有效
+- 同一首歌的并发请求合并为一次上游请求
+- 歌单批量获取在有界线程池中并发进行，一次响应返回全部歌曲
+- 上游地址可配置（MUSIC_API_BASE），测试时可以指向本地的假服务
+"""
+
+import json
+import logging
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+from caching import MISSING, PersistentCache, SingleFlight
+from http_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE = 'https://api.paugram.com/netease/?id='
+# 上游返回的字段中转发给前端的部分
+TRACK_FIELDS = ('id', 'title', 'artist', 'album', 'cover', 'link', 'lyric', 'sub_lyric', 'served')
+MAX_SONG_ID_LENGTH = 20
+
+
+class MusicUpstreamError(Exception):
+    """上游音乐接口不可用或返回了无效数据"""
+
+
+def check_song_id(song_id):
+    """歌曲 ID 只能是数字，返回规范化后的字符串；无效时抛出 ValueError"""
+    song_id = str(song_id).strip()
+    if not song_id.isdigit() or len(song_id) > MAX_SONG_ID_LENGTH:
+        raise ValueError(f"无效的歌曲 ID: {song_id}")
+    return song_id
+
+
+class MusicMetadataProxy:
+    """带缓存和请求合并的歌曲信息代理"""
+
+    def __init__(self, cache_path, api_base=DEFAULT_API_BASE, ttl=86400.0, negative_ttl=60.0,
+                 max_workers=4, timeout=8.0, max_entries=500, allow_hosts=()):
+        self.api_base = api_base
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache = PersistentCache(cache_path, max_entries=max_entries, ttl=ttl)
+        self.http = ConnectionPool(timeout=timeout, allow_hosts=allow_hosts)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='music')
+        self._flight = SingleFlight()
+
+    def _upstream_url(self, song_id):
+        # 地址中含 {id} 时替换，否则把 ID 拼接在末尾
+        if '{id}' in self.api_base:
+            return self.api_base.replace('{id}', quote(song_id))
+        return self.api_base + quote(song_id)
+
+    def _fetch(self, song_id):
+        url = self._upstream_url(song_id)
+        try:
+            response = self.http.fetch('GET', url, headers={'Accept': 'application/json'})
+        except Exception as e:
+            raise MusicUpstreamError(f"请求音乐接口失败: {e}") from e
+        if response.status != 200:
+            raise MusicUpstreamError(f"音乐接口返回 HTTP {response.status}")
+        if response.truncated:
+            raise MusicUpstreamError("音乐接口响应过大")
+        try:
+            data = json.loads(response.body.decode('utf-8'))
+        except ValueError as e:
+            raise MusicUpstreamError(f"音乐接口返回了无效的 JSON: {e}") from e
+        if not isinstance(data, dict) or not data.get('title'):
+            raise MusicUpstreamError("音乐接口没有返回歌曲信息")
+
+        track = {field: data[field] for field in TRACK_FIELDS if field in data}
+        track['id'] = song_id
+        return track
+
+    def track(self, song_id, refresh=False):
+        """返回 (歌曲信息, 是否来自缓存)；上游失败时抛出 MusicUpstreamError"""
+        song_id = check_song_id(song_id)
+        if not refresh:
+            cached = self.cache.get(song_id)
+            if cached is not MISSING:
+                if 'error' in cached:
+                    raise MusicUpstreamError(cached['error'])
+                return cached, True
+
+        def load():
+            try:
+                track = self._fetch(song_id)
+            except MusicUpstreamError as e:
+                # 失败结果短暂缓存，上游故障时不会被每个访客的请求反复冲击
+                logger.warning(f"⚠️ 获取歌曲 {song_id} 信息失败: {e}")
+                self.cache.set(song_id, {'error': str(e)}, ttl=self.negative_ttl)
+                raise
+            self.cache.set(song_id, track)
+            logger.info(f"🎵 已缓存歌曲 {song_id}: {track.get('title')}")
+            return track
+
+        return self._flight.do(song_id, load), False
+
+    def tracks(self, song_ids, refresh=False):
+        """并发获取多首歌，返回与输入顺序一致的列表（失败的条目带 error 字段）"""
+        def safe_track(song_id):
+            try:
+                track, cached = self.track(song_id, refresh=refresh)
+                return dict(track, cached=cached)
+            except (ValueError, MusicUpstreamError) as e:
+                return {'id': str(song_id), 'error': str(e)}
+        return list(self._pool.map(safe_track, song_ids))
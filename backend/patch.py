@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置补丁
+功能: 应用 JSON Patch (RFC 6902) 和 JSON Merge Patch (RFC 7396) 文档
+
+两种补丁都以写时复制方式应用: 只复制被修改路径上的容器，
+未改动的部分与原文档共享，原文档保持不变。
+"""
+
+JSON_PATCH = 'json-patch'
+MERGE_PATCH = 'merge-patch'
+
+_MISSING = object()
+
+
+class PatchError(ValueError):
+    """补丁文档格式错误"""
+
+
+class PatchConflict(PatchError):
+    """补丁无法应用到当前配置（路径不存在、test 操作不通过等）"""
+
+
+def escape_pointer(token):
+    """把一个路径片段编码为 JSON Pointer 片段（~ 写作 ~0，/ 写作 ~1）"""
+    return token.replace('~', '~0').replace('/', '~1')
+
+
+def parse_pointer(pointer):
+    """解析 JSON Pointer (RFC 6901)，返回路径片段列表"""
+    if not isinstance(pointer, str):
+        raise PatchError(f"无效的路径: {pointer!r}")
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise PatchError(f"路径必须以 / 开头: {pointer}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _array_index(items, token, allow_end=False):
+    if allow_end and token == '-':
+        return len(items)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise PatchConflict(f"无效的数组下标: {token}")
+    index = int(token)
+    limit = len(items) if allow_end else len(items) - 1
+    if index > limit:
+        raise PatchConflict(f"数组下标超出范围: {token}")
+    return index
+
+
+def _child(container, token):
+    if isinstance(container, dict):
+        if token not in container:
+            raise PatchConflict(f"路径不存在: {token}")
+        return container[token]
+    if isinstance(container, list):
+        return container[_array_index(container, token)]
+    raise PatchConflict(f"无法在非容器类型上访问: {token}")
+
+
+def resolve(doc, tokens):
+    """按路径片段取值"""
+    for token in tokens:
+        doc = _child(doc, token)
+    return doc
+
+
+def _update(doc, tokens, apply):
+    """沿路径复制容器，并对最后一级的父容器调用 apply(父容器副本, 最后一个片段)"""
+    if isinstance(doc, dict):
+        new_doc = dict(doc)
+    elif isinstance(doc, list):
+        new_doc = list(doc)
+    else:
+        raise PatchConflict(f"无法在非容器类型上访问: {tokens[0]}")
+
+    if len(tokens) == 1:
+        apply(new_doc, tokens[0])
+        return new_doc
+
+    token = tokens[0]
+    child = _child(doc, token)
+    if isinstance(new_doc, list):
+        token = _array_index(new_doc, token)
+    new_doc[token] = _update(child, tokens[1:], apply)
+    return new_doc
+
+
+def _add(doc, tokens, value):
+    if not tokens:
+        return value
+
+    def apply(parent, token):
+        if isinstance(parent, list):
+            parent.insert(_array_index(parent, token, allow_end=True), value)
+        else:
+            parent[token] = value
+    return _update(doc, tokens, apply)
+
+
+def _remove(doc, tokens):
+    if not tokens:
+        raise PatchConflict("不能删除整个配置")
+
+    def apply(parent, token):
+        if isinstance(parent, list):
+            parent.pop(_array_index(parent, token))
+        elif token in parent:
+            del parent[token]
+        else:
+            raise PatchConflict(f"路径不存在: {token}")
+    return _update(doc, tokens, apply)
+
+
+def _replace(doc, tokens, value):
+    if not tokens:
+        return value
+
+    def apply(parent, token):
+        if isinstance(parent, list):
+            parent[_array_index(parent, token)] = value
+        elif token in parent:
+            parent[token] = value
+        else:
+            raise PatchConflict(f"路径不存在: {token}")
+    return _update(doc, tokens, apply)
+
+
+def apply_json_patch(doc, operations):
+    """应用 JSON Patch 操作列表，任一操作失败则整体失败（原文档不受影响）"""
+    if not isinstance(operations, list):
+        raise PatchError("JSON Patch 文档必须是操作数组")
+
+    for number, operation in enumerate(operations):
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise PatchError(f"第 {number + 1} 个操作缺少 op 或 path")
+        op = operation['op']
+        tokens = parse_pointer(operation['path'])
+        value = operation.get('value', _MISSING)
+        if op in ('add', 'replace', 'test') and value is _MISSING:
+            raise PatchError(f"第 {number + 1} 个操作缺少 value")
+
+        if op == 'add':
+            doc = _add(doc, tokens, value)
+        elif op == 'remove':
+            doc = _remove(doc, tokens)
+        elif op == 'replace':
+            doc = _replace(doc, tokens, value)
+        elif op in ('move', 'copy'):
+            if 'from' not in operation:
+                raise PatchError(f"第 {number + 1} 个操作缺少 from")
+            source = parse_pointer(operation['from'])
+            moved = resolve(doc, source)
+            if op == 'move':
+                if tokens[:len(source)] == source and len(tokens) > len(source):
+                    raise PatchConflict("不能把节点移动到它自己的子节点中")
+                doc = _remove(doc, source)
+            doc = _add(doc, tokens, moved)
+        elif op == 'test':
+            if resolve(doc, tokens) != value:
+                raise PatchConflict(f"test 操作未通过: {operation['path']}")
+        else:
+            raise PatchError(f"不支持的操作: {op}")
+    return doc
+
+
+def apply_merge_patch(doc, patch):
+    """应用 JSON Merge Patch: 值为 null 的键被删除，对象递归合并，其余类型整体替换"""
+    if not isinstance(patch, dict):
+        return patch
+    new_doc = dict(doc) if isinstance(doc, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            new_doc.pop(key, None)
+        else:
+            new_doc[key] = apply_merge_patch(new_doc.get(key), value)
+    return new_doc
+
+
+def _escape(token):
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def make_json_patch(old, new, path=''):
+    """生成把 old 变为 new 的 JSON Patch 操作列表
+
+    与旧文档共享（同一对象）的部分直接跳过，因此对写时复制产生的相邻版本，
+    耗时只与被修改的部分有关。数组只追加或只删除一个元素时生成单个 add / remove 操作。
+    """
+    if old is new:
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({'op': 'remove', 'path': f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({'op': 'add', 'path': child, 'value': value})
+            else:
+                ops.extend(make_json_patch(old[key], value, child))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        if len(old) == len(new):
+            ops = []
+            for index, (old_item, new_item) in enumerate(zip(old, new)):
+                ops.extend(make_json_patch(old_item, new_item, f"{path}/{index}"))
+            return ops
+        if len(new) == len(old) + 1 and all(a is b or a == b for a, b in zip(old, new)):
+            return [{'op': 'add', 'path': f"{path}/-", 'value': new[-1]}]
+        if len(new) == len(old) - 1:
+            index = next((i for i, (a, b) in enumerate(zip(old, new)) if a is not b and a != b), len(new))
+            if all(a is b or a == b for a, b in zip(old[index + 1:], new[index:])):
+                return [{'op': 'remove', 'path': f"{path}/{index}"}]
+
+    if old == new:
+        return []
+    return [{'op': 'replace', 'path': path, 'value': new}]
+
+
+def apply_patch(doc, patch_format, patch):
+    """按格式应用补丁，结果必须仍是一个对象"""
+    if patch_format == JSON_PATCH:
+        result = apply_json_patch(doc, patch)
+    elif patch_format == MERGE_PATCH:
+        result = apply_merge_patch(doc, patch)
+    else:
+        raise PatchError(f"不支持的补丁格式: {patch_format}")
+    if not isinstance(result, dict):
+        raise PatchConflict("配置数据必须是字典格式")
+    return result
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+集合查询
+功能: 为数组类配置部分提供分页（offset/limit 或游标）、过滤和字段投影
+
+查询直接在缓存的配置快照上计算: 过滤只收集下标，分页只复制返回的那一页，
+名称前缀过滤使用按版本构建的有序名称索引，不需要遍历整个数组。
+
+查询参数:
+    offset=20&limit=10        跳过前 20 条，最多返回 10 条
+    cursor=<id>               从指定 ID 的项目之后开始（与 offset 可同时使用）
+    prefix=Py                 name 字段以 Py 开头（不区分大小写）
+    filter=level:精通          字段等值过滤，可重复，多个条件同时满足
+    fields=name,icon          只返回指定字段
+"""
+
+import bisect
+
+from items import ID_FIELD
+
+MAX_LIMIT = 1000
+QUERY_PARAMS = ('offset', 'limit', 'cursor', 'prefix', 'filter', 'fields')
+PREFIX_FIELD = 'name'
+
+_MISSING = object()
+
+
+class QueryError(ValueError):
+    """查询参数无效"""
+
+
+def _as_text(value):
+    """把字段值转换为与查询字符串比较用的文本"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if value is None:
+        return 'null'
+    return str(value)
+
+
+def _parse_int(args, name, default, maximum=None):
+    value = args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise QueryError(f"参数 {name} 必须是整数")
+    if number < 0:
+        raise QueryError(f"参数 {name} 不能为负数")
+    return min(number, maximum) if maximum is not None else number
+
+
+def build_name_index(items):
+    """构建按小写名称排序的 (名称, 下标) 列表，用于前缀查找"""
+    index = []
+    if isinstance(items, list):
+        for position, item in enumerate(items):
+            if isinstance(item, dict) and isinstance(item.get(PREFIX_FIELD), str):
+                index.append((item[PREFIX_FIELD].casefold(), position))
+    index.sort()
+    return index
+
+
+class CollectionQuery:
+    """一次集合查询的参数"""
+
+    __slots__ = ('offset', 'limit', 'cursor', 'prefix', 'filters', 'fields')
+
+    def __init__(self, offset=0, limit=None, cursor=None, prefix=None, filters=(), fields=None):
+        self.offset = offset
+        self.limit = limit
+        self.cursor = cursor
+        self.prefix = prefix
+        self.filters = filters
+        self.fields = fields
+
+    @classmethod
+    def parse(cls, args):
+        """从请求参数解析查询，没有任何查询参数时返回 None"""
+        if not any(name in args for name in QUERY_PARAMS):
+            return None
+
+        filters = []
+        for condition in args.getlist('filter'):
+            field, sep, value = condition.partition(':')
+            if not sep or not field:
+                raise QueryError(f"过滤条件格式应为 字段:值，实际为 {condition}")
+            filters.append((field, value))
+
+        fields = args.get('fields')
+        if fields is not None:
+            fields = tuple(name.strip() for name in fields.split(',') if name.strip())
+
+        prefix = args.get('prefix')
+        return cls(
+            offset=_parse_int(args, 'offset', 0),
+            limit=_parse_int(args, 'limit', None, MAX_LIMIT),
+            cursor=args.get('cursor') or None,
+            prefix=prefix.casefold() if prefix else None,
+            filters=tuple(filters),
+            fields=fields or None
+        )
+
+    def _candidates(self, snapshot, section, items):
+        """满足前缀条件的下标（升序）；没有前缀条件时为全部下标"""
+        if self.prefix is None:
+            return range(len(items))
+        index = snapshot.derive(('names', section), lambda: build_name_index(items))
+        start = bisect.bisect_left(index, (self.prefix,))
+        positions = []
+        for name, position in index[start:]:
+            if not name.startswith(self.prefix):
+                break
+            positions.append(position)
+        positions.sort()
+        return positions
+
+    def _matches(self, item):
+        if not isinstance(item, dict):
+            return False
+        for field, value in self.filters:
+            actual = item.get(field, _MISSING)
+            if actual is _MISSING or _as_text(actual) != value:
+                return False
+        return True
+
+    def _project(self, item):
+        if self.fields is None or not isinstance(item, dict):
+            return item
+        return {field: item[field] for field in self.fields if field in item}
+
+    def run(self, snapshot, section):
+        """在快照上执行查询，返回 (当前页, 分页信息)"""
+        items = snapshot.section(section, [])
+        if not isinstance(items, list):
+            raise QueryError(f"配置部分 '{section}' 不是数组类型")
+
+        positions = self._candidates(snapshot, section, items)
+        if self.filters:
+            positions = [position for position in positions if self._matches(items[position])]
+        total = len(positions)
+
+        start = 0
+        if self.cursor is not None:
+            after = snapshot.find_item(section, self.cursor)
+            if after is None:
+                raise QueryError(f"游标 {self.cursor} 无效")
+            start = bisect.bisect_right(positions, after)
+        start += self.offset
+        end = total if self.limit is None else min(total, start + self.limit)
+
+        page = [self._project(items[position]) for position in positions[start:end]]
+
+        next_cursor = None
+        if end < total and page:
+            last = items[positions[end - 1]]
+            if isinstance(last, dict):
+                next_cursor = last.get(ID_FIELD)
+        return page, {
+            'total': total,
+            'offset': start,
+            'limit': self.limit,
+            'next_cursor': next_cursor
+        }
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置结构校验
+功能: 为每个配置部分声明结构（字段类型、长度、取值、数组上限），启动时编译为校验函数，
+      所有写入在提交前校验，不合法时返回逐字段的错误列表
+
+- 只校验发生变化的部分；数组中与上一版本是同一个对象的项目已经校验过，直接跳过，
+  修改一个项目的开销与数组长度基本无关
+- 未声明的字段允许保留，但只能是长度有限的标量，不能借此塞入大块数据
+"""
+
+import re
+
+# 一次最多报告多少条错误
+MAX_ERRORS = 20
+
+
+class ConfigValidationError(ValueError):
+    """配置不符合结构定义，errors 为 [{'path', 'code', 'message'}]"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        first = errors[0]
+        more = f"（共 {len(errors)} 处错误）" if len(errors) > 1 else ''
+        super().__init__(f"{first['path'] or '配置'}: {first['message']}{more}")
+
+
+def _error(errors, path, code, message):
+    errors.append({'path': path, 'code': code, 'message': message})
+
+
+def expect_object(value, path):
+    """value 不是对象时抛出 ConfigValidationError（用于需要先当作字典处理的请求数据）"""
+    if not isinstance(value, dict):
+        raise ConfigValidationError([{'path': path, 'code': 'type',
+                                      'message': f"应为对象，实际为{_type_name(value)}"}])
+
+
+def _type_name(value):
+    return {dict: '对象', list: '数组', str: '字符串', bool: '布尔值', int: '整数',
+            float: '数字', type(None): 'null'}.get(type(value), type(value).__name__)
+
+
+# ---------- 结构声明 ----------
+
+class String:
+    """字符串；url 为 True 时只允许 http(s)、mailto、tel、站内路径和 #"""
+
+    URL_SCHEMES = ('http://', 'https://', 'mailto:', 'tel:')
+
+    def __init__(self, max_length=200, pattern=None, choices=None, url=False):
+        self.max_length = max_length
+        self.pattern = pattern
+        self.choices = choices
+        self.url = url
+
+    def compile(self):
+        max_length = self.max_length
+        regex = re.compile(self.pattern) if self.pattern else None
+        choices = frozenset(self.choices) if self.choices else None
+        url = self.url
+        schemes = self.URL_SCHEMES
+
+        def check(value, path, errors):
+            if not isinstance(value, str):
+                _error(errors, path, 'type', f"应为字符串，实际为{_type_name(value)}")
+                return
+            if len(value) > max_length:
+                _error(errors, path, 'too_long', f"长度不能超过 {max_length} 个字符")
+            elif choices is not None and value not in choices:
+                _error(errors, path, 'choice', f"只能是 {' / '.join(sorted(choices))} 之一")
+            elif regex is not None and not regex.fullmatch(value):
+                _error(errors, path, 'pattern', "格式不正确")
+            elif url and value and not (value.startswith(schemes) or value[0] in '/#.'
+                                        or ':' not in value.split('/', 1)[0]):
+                _error(errors, path, 'url', "只允许 http(s)、mailto、tel 链接或站内路径")
+        return check
+
+
+class Boolean:
+    def compile(self):
+        def check(value, path, errors):
+            if not isinstance(value, bool):
+                _error(errors, path, 'type', f"应为布尔值，实际为{_type_name(value)}")
+        return check
+
+
+class Scalar:
+    """未声明字段: 字符串（限长）、数字、布尔值或 null"""
+
+    def __init__(self, max_length=1000):
+        self.max_length = max_length
+
+    def compile(self):
+        max_length = self.max_length
+
+        def check(value, path, errors):
+            if isinstance(value, str):
+                if len(value) > max_length:
+                    _error(errors, path, 'too_long', f"长度不能超过 {max_length} 个字符")
+            elif value is not None and not isinstance(value, (bool, int, float)):
+                _error(errors, path, 'type', f"未定义的字段只能是字符串、数字或布尔值，实际为{_type_name(value)}")
+        return check
+
+
+class Array:
+    def __init__(self, items, max_items=1000):
+        self.items = items
+        self.max_items = max_items
+
+    def compile(self):
+        item_check = self.items.compile()
+        max_items = self.max_items
+
+        def check(value, path, errors, known=()):
+            """known 为已校验过的项目的 id() 集合，这些项目直接跳过"""
+            if not isinstance(value, list):
+                _error(errors, path, 'type', f"应为数组，实际为{_type_name(value)}")
+                return
+            if len(value) > max_items:
+                _error(errors, path, 'too_many_items', f"最多 {max_items} 项，实际 {len(value)} 项")
+                return
+            for position, item in enumerate(value):
+                if known and id(item) in known:
+                    continue
+                item_check(item, f"{path}[{position}]", errors)
+                if len(errors) >= MAX_ERRORS:
+                    return
+        return check
+
+
+class Object:
+    def __init__(self, fields, required=(), extra=Scalar(), max_fields=50):
+        self.fields = fields
+        self.required = tuple(required)
+        self.extra = extra
+        self.max_fields = max_fields
+
+    def compile(self):
+        fields = {name: spec.compile() for name, spec in self.fields.items()}
+        required = self.required
+        extra = self.extra.compile() if self.extra is not None else None
+        max_fields = self.max_fields
+
+        def check(value, path, errors):
+            if not isinstance(value, dict):
+                _error(errors, path, 'type', f"应为对象，实际为{_type_name(value)}")
+                return
+            if len(value) > max_fields:
+                _error(errors, path, 'too_many_fields', f"最多 {max_fields} 个字段")
+                return
+            for name in required:
+                if name not in value:
+                    _error(errors, f"{path}.{name}", 'required', "缺少必填字段")
+            for name, item in value.items():
+                field_check = fields.get(name, extra)
+                if field_check is None:
+                    _error(errors, f"{path}.{name}", 'unknown', "不允许的字段")
+                else:
+                    field_check(item, f"{path}.{name}", errors)
+        return check
+
+
+# ---------- 各配置部分 ----------
+
+NAME = String(max_length=100)
+TEXT = String(max_length=2000)
+URL = String(max_length=2048, url=True)
+# 图标可以是 Font Awesome 类名或图片地址
+ICON = String(max_length=2048)
+DATE = String(max_length=32)
+ITEM_ID = String(max_length=64, pattern=r'[A-Za-z0-9_-]+')
+SONG_ID = String(max_length=20, pattern=r'\d*')
+BACKGROUND_TYPE = String(choices=('image', 'video'))
+
+
+def section_schemas(max_items=1000, max_playlist=500, max_presets=200):
+    """各配置部分的结构定义"""
+    preset = Array(Object({'name': NAME, 'url': URL, 'custom': Boolean()}, required=('url',)),
+                   max_items=max_presets)
+    return {
+        'profile': Object({
+            'name': NAME,
+            'title': NAME,
+            'description': TEXT,
+            'avatar': URL,
+            'birthday': DATE,
+            'siteStart': DATE,
+            # 备案号等展示用文本，不是项目 ID
+            'id': NAME,
+            'backgroundType': BACKGROUND_TYPE,
+            'backgroundImage': URL,
+            'backgroundVideo': URL,
+            'profileBackground': URL,
+            'profileBackgroundType': BACKGROUND_TYPE,
+        }),
+        'contact': Object({
+            'email': String(max_length=254),
+            'phone': String(max_length=50),
+            'address': String(max_length=200),
+        }),
+        'skills': Array(Object({
+            'id': ITEM_ID,
+            'name': NAME,
+            'level': String(max_length=50),
+        }, required=('name',)), max_items=max_items),
+        'projects': Array(Object({
+            'id': ITEM_ID,
+            'name': NAME,
+            'desc': TEXT,
+            'icon': ICON,
+            'url': URL,
+        }, required=('name',)), max_items=max_items),
+        'friendLinks': Array(Object({
+            'id': ITEM_ID,
+            'name': NAME,
+            'description': TEXT,
+            'icon': ICON,
+            'url': URL,
+        }, required=('name',)), max_items=max_items),
+        'socialLinks': Array(Object({
+            'id': ITEM_ID,
+            'name': NAME,
+            'icon': ICON,
+            'url': URL,
+        }, required=('name',)), max_items=max_items),
+        'music': Object({
+            'currentSongId': SONG_ID,
+            'playlist': Array(SONG_ID, max_items=max_playlist),
+        }),
+        'background': Object({
+            'profileImage': URL,
+            'showBackgroundImage': Boolean(),
+            'enableGlassMorphism': Boolean(),
+        }),
+        'backgroundPresets': Object({
+            'profile': preset,
+            'right': preset,
+            'video': preset,
+        }, extra=None),
+    }
+
+
+class ConfigValidator:
+    """编译后的配置校验器，可直接作为 ConfigStore 的 validate 回调
+
+    validator(新配置, 旧配置) 只校验与旧配置相比发生变化的部分，不合法时抛出 ConfigValidationError。
+    未声明的顶层部分不校验（由请求体大小上限约束）。
+    """
+
+    def __init__(self, schemas=None, max_sections=50):
+        schemas = schemas if schemas is not None else section_schemas()
+        self.max_sections = max_sections
+        self._checks = {section: spec.compile() for section, spec in schemas.items()}
+        self._arrays = frozenset(section for section, spec in schemas.items() if isinstance(spec, Array))
+
+    def check_section(self, section, value, previous=None):
+        """校验单个部分，返回错误列表；previous 为上一版本的同一部分"""
+        errors = []
+        check = self._checks.get(section)
+        if check is None:
+            return errors
+        if section in self._arrays and isinstance(previous, list):
+            check(value, section, errors, {id(item) for item in previous})
+        else:
+            check(value, section, errors)
+        return errors
+
+    def __call__(self, config, previous=None):
+        expect_object(config, '')
+        errors = []
+        if len(config) > self.max_sections:
+            _error(errors, '', 'too_many_fields', f"最多 {self.max_sections} 个配置部分")
+        for section, value in config.items():
+            old = previous.get(section) if previous is not None else None
+            if value is old and old is not None:
+                continue
+            errors.extend(self.check_section(section, value, old))
+            if len(errors) >= MAX_ERRORS:
+                break
+        if errors:
+            raise ConfigValidationError(errors[:MAX_ERRORS])
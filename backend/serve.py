@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生产环境启动入口
+功能: 使用 gunicorn 预先 fork 多个工作进程，共享同一个监听端口；
+      每个工作进程内使用线程池处理请求，充分利用多核 CPU
+
+用法:
+    cd backend && python3 serve.py
+    cd backend && python3 -m serve
+
+环境变量:
+    PORT            监听端口（默认 3001）
+    HOST            监听地址（默认 0.0.0.0）
+    WORKERS         工作进程数（默认 CPU 核数）
+    THREADS         每个工作进程的线程数（默认 8）
+    WORKER_TIMEOUT  工作进程无响应多久（秒）后被重启（默认 30）
+    GRACEFUL_TIMEOUT 平滑退出时等待进行中的请求完成的最长时间（秒，默认 30）
+    PID_FILE        主进程 PID 文件（默认 ../run/serve.pid）
+
+平滑重启（start.sh 在服务已运行时自动执行）:
+    kill -USR2 <主进程>   新主进程继承监听端口并启动新的工作进程，新工作进程预热完成后才开始接受连接；
+                          所有工作进程就绪后写出 <PID_FILE>.ready（内容为新主进程 PID）
+    kill -TERM <旧主进程> 旧工作进程不再接受新连接，处理完进行中的请求后退出
+    kill -HUP <主进程>    只重新读取 gunicorn 配置并轮换工作进程（不加载新代码）
+"""
+
+import os
+import logging
+import multiprocessing
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # Windows 等不支持 gunicorn 的环境退回开发服务器
+    BaseApplication = None
+
+logger = logging.getLogger(__name__)
+
+PID_FILE = os.environ.get('PID_FILE', '../run/serve.pid')
+READY_FILE = f"{PID_FILE}.ready"
+# 各站点的共享修改代数，平滑重启前后的两代主进程映射同一个文件
+GENERATIONS_FILE = os.path.join(os.path.dirname(PID_FILE), 'generations')
+
+# 已完成预热的工作进程数，主进程在 fork 之前创建
+_warm_workers = None
+
+
+def post_worker_init(worker):
+    """工作进程启动后预热缓存，并启动监视线程和指标写出线程（线程不能在 fork 之前创建）
+
+    gunicorn 在这个回调返回后工作进程才开始接受连接，未预热的进程不会收到请求。
+    """
+    import app as homepage
+    homepage.start_config_watcher()
+    homepage.start_metrics_sharing()
+    homepage.warm_up()
+    # 收到 TERM 后 worker.alive 变为 False: 就绪检查返回 503，SSE 推送结束
+    homepage.set_drain_check(lambda: not worker.alive)
+    _report_warm(worker)
+
+
+def _report_warm(worker):
+    """本主进程的工作进程全部预热完成时写出就绪文件（内容为主进程 PID），供 start.sh 切换新旧主进程"""
+    if _warm_workers is None:
+        return
+    with _warm_workers.get_lock():
+        _warm_workers.value += 1
+        # 之后补充启动的工作进程不再重写
+        if _warm_workers.value != worker.cfg.workers:
+            return
+    temp_path = f"{READY_FILE}.{os.getpid()}"
+    with open(temp_path, 'w') as f:
+        f.write(str(os.getppid()))
+    os.replace(temp_path, READY_FILE)
+
+
+def child_exit(server, worker):
+    """工作进程退出后（在主进程中）标记它的指标文件: 计数保留，仪表值不再导出"""
+    import app as homepage
+    homepage.metrics_registry.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    """主进程退出时删除自己写出的就绪文件"""
+    try:
+        with open(READY_FILE) as f:
+            owner = f.read().strip()
+        if owner == str(server.pid):
+            os.remove(READY_FILE)
+    except OSError:
+        pass
+
+
+def server_options():
+    """从环境变量读取 gunicorn 配置"""
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', 3001))
+    return {
+        'bind': f"{host}:{port}",
+        'workers': int(os.environ.get('WORKERS', os.cpu_count() or 1)),
+        # gthread: 每个进程一个线程池，SSE 长连接只占用一个线程而不是整个进程
+        'worker_class': 'gthread',
+        'threads': int(os.environ.get('THREADS', 8)),
+        'timeout': int(os.environ.get('WORKER_TIMEOUT', 30)),
+        'graceful_timeout': int(os.environ.get('GRACEFUL_TIMEOUT', 30)),
+        'keepalive': 5,
+        'pidfile': PID_FILE,
+        # 在主进程中导入应用后再 fork，共享内存中的修改代数必须在 fork 之前创建
+        'preload_app': True,
+        'post_worker_init': post_worker_init,
+        'child_exit': child_exit,
+        'on_exit': on_exit,
+        'accesslog': None,
+        'errorlog': '-',
+    }
+
+
+if BaseApplication is not None:
+    class HomepageServer(BaseApplication):
+        """以代码方式配置的 gunicorn 应用"""
+
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+
+def main():
+    global _warm_workers
+    import app as homepage
+
+    if BaseApplication is None:
+        logger.warning("⚠️ 未安装 gunicorn，使用开发服务器单进程运行")
+        homepage.start_config_watcher()
+        homepage.warm_up()
+        homepage.app.run(host=os.environ.get('HOST', '0.0.0.0'),
+                         port=int(os.environ.get('PORT', 3001)), threaded=True)
+        return
+
+    # 平滑重启时 gunicorn 通过 GUNICORN_PID 把旧主进程的 PID 传给新主进程
+    reloading = 'GUNICORN_PID' in os.environ
+    # 任一工作进程写入配置后，其他工作进程（包括平滑重启期间的旧工作进程）的下一次读取立即重新校验
+    homepage.site_registry.enable_shared_invalidation(GENERATIONS_FILE)
+    # 各工作进程的指标写到同一目录，/api/metrics 合并导出；平滑重启时保留旧进程的数据
+    homepage.metrics_registry.prepare_share(homepage.METRICS_DIR, reset=not reloading)
+    # 工作进程的日志经进程间队列交给主进程统一写出和轮转
+    homepage.log_pipeline.use_process_queue()
+    # 统计预热完成的工作进程（平滑重启时判断新主进程是否就绪）
+    _warm_workers = multiprocessing.Value('i', 0)
+
+    options = server_options()
+    os.makedirs(os.path.dirname(os.path.abspath(PID_FILE)), exist_ok=True)
+    print("🚀 个人主页配置管理系统（生产模式）启动中...")
+    print(f"📍 监听地址: http://{options['bind']}")
+    print(f"⚙️ 工作进程: {options['workers']} × {options['threads']} 线程")
+    if homepage.SITES_FILE:
+        print(f"🌐 站点清单: {os.path.abspath(homepage.SITES_FILE)}（{len(homepage.site_specs)} 个站点）")
+    else:
+        print(f"📁 配置文件: {os.path.abspath(homepage.CONFIG_FILE)}")
+        if homepage.CONFIG_BACKEND == 'sqlite':
+            print(f"🗄️ 配置数据库: {os.path.abspath(homepage.CONFIG_DB)}")
+    print(f"📝 日志文件: {os.path.abspath(homepage.LOG_FILE)}")
+    HomepageServer(homepage.app, options).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多站点托管
+功能: 一个后端进程按请求的 Host 服务多个主页，每个站点有自己的配置文件、静态文件目录和管理密码
+
+站点清单（SITES_FILE，JSON，相对路径相对于清单所在目录）:
+    {
+      "default": "name666",
+      "sites": {
+        "name666": {
+          "hosts": ["home.name666.top", "www.name666.top"],
+          "config": "name666/config.json",
+          "static": "name666/frontend",
+          "password_hash": "scrypt:32768:8:1$..."
+        },
+        "alice": {
+          "hosts": ["alice.example.com"],
+          "config": "alice/config.json",
+          "password_env": "ALICE_ADMIN_PASSWORD"
+        }
+      }
+    }
+
+- static 省略时使用默认的前端目录；目录中有 dist/index.html 时提供构建结果
+- 管理密码: password_hash（werkzeug 格式，由 `python3 sites.py hash-password` 生成）
+  或 password_env（从该环境变量读取），都未设置时使用 ADMIN_PASSWORD
+- default 为可选项: 不匹配任何站点的 Host 使用该站点，省略时返回 404
+- 站点在第一次被访问时加载，最多同时加载 max_loaded 个（LRU），空闲超过 idle_timeout 秒
+  的站点被卸载（合并变更日志、停止后台线程），再次访问时重新加载
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import getpass
+import argparse
+import threading
+import multiprocessing
+import logging
+from collections import OrderedDict
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config_store import SharedGenerations
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownSite(LookupError):
+    """请求的 Host 不属于任何站点"""
+
+
+def normalize_host(host):
+    """去掉端口和末尾的点并转为小写: 'Home.Example.com:443' -> 'home.example.com'"""
+    host = (host or '').strip().lower()
+    if host.startswith('['):
+        # IPv6 地址: [::1]:3001
+        host = host[:host.find(']') + 1]
+    else:
+        host = host.rsplit(':', 1)[0]
+    return host.rstrip('.')
+
+
+class SiteSpec:
+    """站点定义（来自站点清单，加载前后都不变）"""
+
+    def __init__(self, name, hosts=(), config_file=None, static_root='../frontend', db=None,
+                 password_hash=None, password_env=None):
+        self.name = name
+        self.hosts = tuple(normalize_host(host) for host in hosts)
+        self.config_file = config_file
+        self.static_root = static_root
+        # 运行过 build_assets.py 时使用构建结果，否则直接使用源文件
+        dist = os.path.join(static_root, 'dist')
+        self.static_dir = dist if os.path.exists(os.path.join(dist, 'index.html')) else static_root
+        self.db = db
+        self.password_hash = password_hash
+        self.password_env = password_env
+
+    @property
+    def static_roots(self):
+        """本地图片的查找目录（构建结果和源文件）"""
+        return (self.static_dir, self.static_root) if self.static_dir != self.static_root else (self.static_root,)
+
+    def check_password(self, password, default=None):
+        """校验管理密码；站点没有单独设置密码时与 default 比较"""
+        if self.password_hash:
+            return check_password_hash(self.password_hash, password)
+        expected = os.environ.get(self.password_env) if self.password_env else None
+        if expected is None:
+            expected = default
+        if expected is None:
+            return False
+        return hmac.compare_digest(password.encode('utf-8'), expected.encode('utf-8'))
+
+
+def load_site_specs(path, static_root='../frontend'):
+    """读取站点清单，返回 ({站点名: SiteSpec}, 默认站点名或 None)
+
+    清单有误时抛出 ValueError（启动时即失败，而不是在请求中才发现）。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(value):
+        return os.path.join(base, value) if value else None
+
+    sites = manifest.get('sites') if isinstance(manifest, dict) else None
+    if not isinstance(sites, dict) or not sites:
+        raise ValueError(f"{path}: 缺少 sites")
+
+    specs = {}
+    owners = {}
+    for name, entry in sites.items():
+        if not isinstance(entry, dict) or not entry.get('config'):
+            raise ValueError(f"{path}: 站点 {name} 缺少 config")
+        spec = SiteSpec(
+            name,
+            hosts=entry.get('hosts', ()),
+            config_file=resolve(entry['config']),
+            static_root=resolve(entry.get('static')) or static_root,
+            db=resolve(entry.get('db')),
+            password_hash=entry.get('password_hash'),
+            password_env=entry.get('password_env'),
+        )
+        for host in spec.hosts:
+            if host in owners:
+                raise ValueError(f"{path}: 域名 {host} 同时属于站点 {owners[host]} 和 {name}")
+            owners[host] = name
+        specs[name] = spec
+
+    default = manifest.get('default')
+    if default is not None and default not in specs:
+        raise ValueError(f"{path}: 默认站点 {default} 不存在")
+    return specs, default
+
+
+class Site:
+    """已加载的站点: 定义 + 配置存储 + 变更推送 + 变更历史 + 版本存档（可选）"""
+
+    def __init__(self, spec, store, broadcaster, history, archive=None):
+        self.spec = spec
+        self.store = store
+        self.broadcaster = broadcaster
+        self.history = history
+        self.archive = archive
+        self.last_used = time.monotonic()
+
+    @property
+    def name(self):
+        return self.spec.name
+
+    def close(self):
+        self.store.close()
+        if self.archive is not None:
+            self.archive.close()
+
+
+class SiteRegistry:
+    """按 Host 查找站点，已加载的站点按最近使用顺序保存（LRU）
+
+    factory(spec) -> Site 负责创建站点的存储等对象。
+    """
+
+    def __init__(self, specs, factory, default=None, max_loaded=32, idle_timeout=600.0):
+        self.specs = specs
+        self.factory = factory
+        self.default = default
+        self.max_loaded = max(1, max_loaded)
+        self.idle_timeout = idle_timeout
+        self._hosts = {host: spec for spec in specs.values() for host in spec.hosts}
+        self._sites = OrderedDict()
+        self._lock = threading.Lock()
+        # 多进程部署时每个站点的共享修改代数，fork 之前按站点清单预先分配
+        self._generations = None
+        self._generation_lock = None
+        # 启动监视后新加载的站点也立即启动监视
+        self._watch_interval = None
+
+    def resolve(self, host):
+        """返回 Host 对应的站点定义，没有匹配的站点且没有默认站点时抛出 UnknownSite"""
+        spec = self._hosts.get(normalize_host(host))
+        if spec is None:
+            if self.default is None:
+                raise UnknownSite(f"未配置的站点: {host}")
+            spec = self.specs[self.default]
+        return spec
+
+    def get(self, host):
+        """返回 Host 对应的站点，未加载时加载"""
+        return self.load(self.resolve(host).name)
+
+    def load(self, name):
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(name)
+            if site is not None:
+                site.last_used = now
+                self._sites.move_to_end(name)
+            evicted = self._evict_idle(now)
+        self._close(evicted)
+        if site is not None:
+            return site
+
+        site = self._create(self.specs[name])
+        with self._lock:
+            existing = self._sites.get(name)
+            if existing is None:
+                self._sites[name] = site
+                evicted = []
+                while len(self._sites) > self.max_loaded:
+                    evicted.append(self._sites.popitem(last=False)[1])
+            else:
+                # 其他线程已经加载了同一个站点，使用先加载的那个
+                evicted = [site]
+                site = existing
+        self._close(evicted)
+        return site
+
+    def _create(self, spec):
+        site = self.factory(spec)
+        if self._generations is not None:
+            site.store.enable_shared_invalidation(self._generations[spec.name], self._generation_lock)
+        if self._watch_interval is not None:
+            site.store.watch(self._watch_interval)
+        logger.info(f"🌐 已加载站点 {spec.name}")
+        return site
+
+    def _evict_idle(self, now):
+        """取出空闲超时的站点（调用方持有 _lock）；有推送订阅者的站点不算空闲"""
+        evicted = []
+        if self.idle_timeout <= 0:
+            return evicted
+        for name, site in list(self._sites.items()):
+            if now - site.last_used < self.idle_timeout:
+                break
+            if site.broadcaster.subscriber_count:
+                continue
+            del self._sites[name]
+            evicted.append(site)
+        return evicted
+
+    @staticmethod
+    def _close(sites):
+        for site in sites:
+            try:
+                site.close()
+                logger.info(f"💤 已卸载站点 {site.name}")
+            except Exception as e:
+                logger.error(f"❌ 卸载站点 {site.name} 失败: {e}")
+
+    @property
+    def loaded(self):
+        """当前已加载的站点"""
+        with self._lock:
+            return list(self._sites.values())
+
+    def enable_shared_invalidation(self, path=None):
+        """为每个站点预先分配共享修改代数（必须在 fork 工作进程之前调用）
+
+        指定 path 时代数保存在该文件的映射中，平滑重启期间新旧两代工作进程也能互相通知。
+        """
+        if self._generations is None:
+            if path is not None:
+                shared = SharedGenerations(path)
+                self._generations = {name: shared.slot(name) for name in self.specs}
+                self._generation_lock = shared.lock
+            else:
+                self._generations = {name: multiprocessing.RawValue('Q', 0) for name in self.specs}
+                self._generation_lock = multiprocessing.Lock()
+            for site in self.loaded:
+                site.store.enable_shared_invalidation(self._generations[site.name], self._generation_lock)
+
+    def watch(self, interval):
+        """监视已加载和之后加载的站点的配置文件；有默认站点时立即加载它"""
+        self._watch_interval = interval
+        for site in self.loaded:
+            site.store.watch(interval)
+        if self.default is not None:
+            self.load(self.default)
+
+    def close(self):
+        """卸载所有站点"""
+        with self._lock:
+            sites = list(self._sites.values())
+            self._sites.clear()
+        self._close(sites)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多站点托管工具')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    subcommands.add_parser('hash-password', help='生成站点清单中 password_hash 的值')
+    check = subcommands.add_parser('check', help='检查站点清单')
+    check.add_argument('sites_file')
+    args = parser.parse_args()
+
+    if args.command == 'hash-password':
+        password = getpass.getpass('管理密码: ')
+        if password != getpass.getpass('再次输入: '):
+            print("❌ 两次输入的密码不一致")
+            sys.exit(1)
+        print(generate_password_hash(password))
+        return
+
+    try:
+        specs, default = load_site_specs(args.sites_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    for spec in specs.values():
+        marker = '（默认）' if spec.name == default else ''
+        missing = '' if os.path.exists(spec.config_file) else '  ⚠️ 配置文件不存在'
+        print(f"🌐 {spec.name}{marker}: {', '.join(spec.hosts) or '-'}")
+        print(f"   配置: {spec.config_file}{missing}")
+        print(f"   静态文件: {spec.static_dir}")
+
+
+if __name__ == '__main__':
+    main()
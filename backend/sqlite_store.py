@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 配置存储
+功能: 与 ConfigStore 接口相同的存储后端，配置保存在 SQLite 数据库中（WAL 模式），
+      每个配置部分一行、数组类部分的每个项目一行，修改一个项目只写这一行
+
+- 读请求使用内存中的快照；其他进程提交后只重新读取版本号变化了的部分
+- WAL 模式下读者与写者互不阻塞，写入以 BEGIN IMMEDIATE 在进程间串行化
+- 首次启动时从 config.json（含尚未合并的变更日志）一次性导入；
+  修改后由后台线程把完整配置导出回 config.json，nginx 直接提供的静态文件保持最新
+
+表结构:
+    meta(key, value)                                    版本号、最后修改时间、已导出的版本
+    sections(name, position, kind, value, revision)     kind 为 items 时内容在 items 表中
+    items(section, item_id, position, value, revision)  按 (section, position) 排序
+
+用法:
+    python3 sqlite_store.py import --db ../data/config.db --config ../frontend/public/config.json
+    python3 sqlite_store.py export --db ../data/config.db --config ../frontend/public/config.json
+"""
+
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+
+import codec
+from config_store import (CONFIG_LOOKUPS, CONFIG_WRITE_BYTES, CONFIG_WRITE_SECONDS,
+                          ConfigSnapshot, ConfigStore, ItemNotFound, SnapshotStore)
+from items import ID_COLLECTIONS, ID_FIELD
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+CREATE TABLE IF NOT EXISTS sections (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT,
+    revision INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    section TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    position REAL NOT NULL,
+    value TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    PRIMARY KEY (section, item_id)
+);
+CREATE INDEX IF NOT EXISTS items_by_position ON items (section, position);
+"""
+
+KIND_VALUE = 'value'
+KIND_ITEMS = 'items'
+# 项目位置之间的间隔，在中间插入时取相邻位置的中点，间隔用尽时整体重新编号
+POSITION_STEP = 1024.0
+MIN_POSITION_GAP = 1e-6
+
+_LOOKUP_HIT = CONFIG_LOOKUPS.labels('hit')
+_LOOKUP_RELOAD = CONFIG_LOOKUPS.labels('reload')
+_WRITE_SECONDS = CONFIG_WRITE_SECONDS.labels('sqlite')
+_WRITE_BYTES = CONFIG_WRITE_BYTES.labels('sqlite')
+
+
+def _dumps(value):
+    return codec.dumps_text(value)
+
+
+def _is_item_collection(section, value):
+    """数组类部分且每个项目都是带唯一 ID 的对象时按项目分行存储，否则整体存为一行"""
+    if section not in ID_COLLECTIONS or not isinstance(value, list):
+        return False
+    seen = set()
+    for item in value:
+        if not isinstance(item, dict):
+            return False
+        item_id = item.get(ID_FIELD)
+        if not isinstance(item_id, str) or item_id in seen:
+            return False
+        seen.add(item_id)
+    return True
+
+
+def _place_items(new_ids, old_positions):
+    """保留项目的原位置，为新项目在相邻位置之间分配位置
+
+    保留项目的相对顺序变了或间隔用尽时返回 None，由调用方整体重新编号。
+    """
+    retained = [item_id for item_id in new_ids if item_id in old_positions]
+    if any(old_positions[a] >= old_positions[b] for a, b in zip(retained, retained[1:])):
+        return None
+
+    positions = {}
+    previous = None
+    index = 0
+    while index < len(new_ids):
+        item_id = new_ids[index]
+        if item_id in old_positions:
+            previous = positions[item_id] = old_positions[item_id]
+            index += 1
+            continue
+        end = index
+        while end < len(new_ids) and new_ids[end] not in old_positions:
+            end += 1
+        count = end - index
+        upper = old_positions[new_ids[end]] if end < len(new_ids) else None
+        if upper is None:
+            lower = previous if previous is not None else 0.0
+            step = POSITION_STEP
+        else:
+            lower = previous if previous is not None else upper - POSITION_STEP * (count + 1)
+            step = (upper - lower) / (count + 1)
+            if step < MIN_POSITION_GAP:
+                return None
+        for offset in range(count):
+            positions[new_ids[index + offset]] = lower + step * (offset + 1)
+        previous = positions[new_ids[end - 1]]
+        index = end
+    return positions
+
+
+class SqliteConfigStore(SnapshotStore):
+    """SQLite 配置存储（接口与 ConfigStore 相同）"""
+
+    def __init__(self, path, stat_ttl=1.0, export_path=None, export_interval=5.0,
+                 synchronous='FULL', pretty=True, normalize=None, validate=None):
+        super().__init__(stat_ttl=stat_ttl, normalize=normalize, validate=validate)
+        self.path = path
+        self.export_path = export_path
+        # 导出的 config.json 是否缩进（见 ConfigStore）
+        self.pretty = pretty
+        self.export_interval = export_interval
+        self.synchronous = synchronous
+        self._local = threading.local()
+        # 与当前快照对应的数据库状态: 各部分的存储方式、项目 ID -> 位置
+        self._kinds = {}
+        self._positions = {}
+        self._last_mutation = 0.0
+        self._exporter = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    @property
+    def watch_paths(self):
+        # 其他进程的提交先写入 WAL 文件
+        return (self.path, self.path + '-wal')
+
+    def _conn(self):
+        """每个线程一个连接；fork 出的子进程不使用父进程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA synchronous={self.synchronous}')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self, mode=''):
+        """mode 为 IMMEDIATE 时立即取得写锁（其他进程的写入等待，读者不受影响）"""
+        conn = self._conn()
+        conn.execute(f'BEGIN {mode}')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @staticmethod
+    def _meta(conn):
+        return dict(conn.execute('SELECT key, value FROM meta'))
+
+    # ---------- 读取 ----------
+
+    def _lookup(self, fresh):
+        if self._watcher is not None and not fresh and self._snapshot is not None:
+            _LOOKUP_HIT.inc()
+            return self._snapshot
+        if self._generation_changed():
+            fresh = True
+        snapshot = self._snapshot
+        if (not fresh and snapshot is not None
+                and time.monotonic() - self._checked_at < self.stat_ttl):
+            _LOOKUP_HIT.inc()
+            return snapshot
+
+        if not self._load_lock.acquire(blocking=fresh or snapshot is None):
+            # 其他线程正在加载或提交，先继续使用当前快照
+            _LOOKUP_HIT.inc()
+            return self._snapshot
+        try:
+            with self._transaction() as conn:
+                return self._refresh_locked(conn)
+        except sqlite3.Error as e:
+            logger.error(f"❌ 读取配置数据库失败: {e}")
+            return self._snapshot
+        finally:
+            self._load_lock.release()
+
+    def _refresh_locked(self, conn):
+        """版本号变化时重新读取发生变化的部分（调用方需持有加载锁并处于事务中）"""
+        previous = self._snapshot
+        meta = self._meta(conn)
+        version = meta.get('version')
+        if version is None:
+            return None
+        if previous is not None and previous.version == version:
+            self._checked_at = time.monotonic()
+            _LOOKUP_HIT.inc()
+            return previous
+
+        _LOOKUP_RELOAD.inc()
+        seen = previous.version if previous is not None else -1
+        old = previous.config if previous is not None else {}
+        config, kinds, positions = {}, {}, {}
+        reloaded = 0
+        for name, kind, value, revision in conn.execute(
+                'SELECT name, kind, value, revision FROM sections ORDER BY position'):
+            kinds[name] = kind
+            if revision <= seen and name in old:
+                # 本进程已有该部分的最新内容，沿用同一个对象（派生缓存随之保留）
+                config[name] = old[name]
+                if kind == KIND_ITEMS:
+                    positions[name] = self._positions[name]
+                continue
+            reloaded += 1
+            if kind == KIND_ITEMS:
+                rows = conn.execute('SELECT item_id, position, value FROM items '
+                                    'WHERE section = ? ORDER BY position', (name,)).fetchall()
+                config[name] = [codec.loads(data) for _, _, data in rows]
+                positions[name] = {item_id: position for item_id, position, _ in rows}
+            else:
+                config[name] = codec.loads(value)
+
+        self._kinds, self._positions = kinds, positions
+        self._publish(ConfigSnapshot(config, ('sqlite', version), meta.get('updated_at') or time.time(),
+                                     version), previous=previous)
+        logger.info(f"📖 配置数据库读取成功（版本 {version}，重新读取 {reloaded} 个部分）")
+        return self._snapshot
+
+    # ---------- 写入 ----------
+
+    def mutate(self, record):
+        """提交一条细粒度变更，返回 (操作结果, 新版本号)；只写入发生变化的行"""
+        def change(snapshot):
+            if ID_FIELD in record:
+                position = snapshot.find_item(record['section'], record[ID_FIELD]) if snapshot else None
+                if position is None:
+                    raise ItemNotFound(f"项目 {record[ID_FIELD]} 不存在")
+                return self._apply(snapshot.config, dict(record, index=position))
+            return self._apply(snapshot.config if snapshot is not None else {}, record)
+
+        return self._commit(change, check=True)
+
+    def write(self, config, version=None):
+        """整体保存配置（与当前内容比较，只写入发生变化的部分和项目），返回版本号
+
+        version 为 None 时版本号加一并先经过 validate 校验。
+        """
+        def change(snapshot):
+            new_config = config
+            if self.normalize is not None:
+                new_config = self.normalize(config, snapshot.config if snapshot is not None else None)
+            return new_config, None
+
+        return self._commit(change, check=version is None, version=version)[1]
+
+    def _commit(self, change, check=True, version=None):
+        """在写事务中读取最新配置，调用 change(快照) 得到 (新配置, 操作结果) 并写入差异
+
+        change 返回 None 时放弃本次写入；version 可以是 version(快照) -> 版本号。
+        """
+        started = time.perf_counter()
+        with self._write_lock, self._load_lock:
+            conn = self._conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # 写锁内先读到其他进程刚提交的内容
+                snapshot = self._refresh_locked(conn)
+                changed = change(snapshot)
+                if changed is None:
+                    conn.execute('ROLLBACK')
+                    return None, snapshot.version if snapshot is not None else 0
+                config, result = changed
+                old_config = snapshot.config if snapshot is not None else {}
+                if check and self.validate is not None:
+                    self.validate(config, snapshot.config if snapshot is not None else None)
+                if callable(version):
+                    version = version(snapshot)
+                elif version is None:
+                    version = (snapshot.version if snapshot is not None else 0) + 1
+                kinds, positions, written = self._persist(conn, old_config, config, version)
+                conn.execute('COMMIT')
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+            # 提交成功后再更新内存状态
+            self._kinds = kinds
+            self._positions = positions
+            self._publish(ConfigSnapshot(config, ('sqlite', version), time.time(), version),
+                          previous=snapshot)
+            self._last_mutation = time.monotonic()
+        _WRITE_SECONDS.observe(time.perf_counter() - started)
+        _WRITE_BYTES.inc(written)
+        self._bump_generation()
+        self._ensure_exporter()
+        return result, version
+
+    def _persist(self, conn, old_config, config, version):
+        """把新旧配置的差异写入数据库，返回 (各部分存储方式, 项目位置, 写入字节数)"""
+        kinds = dict(self._kinds)
+        positions = dict(self._positions)
+        written = 0
+        reorder = list(config) != list(old_config)
+
+        for order, (name, value) in enumerate(config.items()):
+            old = old_config.get(name)
+            if name in old_config and value is old:
+                if reorder:
+                    conn.execute('UPDATE sections SET position = ? WHERE name = ?', (order, name))
+                continue
+
+            if _is_item_collection(name, value):
+                if kinds.get(name) == KIND_ITEMS and isinstance(old, list):
+                    positions[name], size = self._persist_items(conn, name, old, value,
+                                                                positions[name], version)
+                else:
+                    conn.execute('DELETE FROM items WHERE section = ?', (name,))
+                    positions[name], size = self._insert_items(conn, name, value, version)
+                conn.execute('INSERT OR REPLACE INTO sections (name, position, kind, value, revision) '
+                             'VALUES (?, ?, ?, NULL, ?)', (name, order, KIND_ITEMS, version))
+                kinds[name] = KIND_ITEMS
+            else:
+                if kinds.get(name) == KIND_ITEMS:
+                    conn.execute('DELETE FROM items WHERE section = ?', (name,))
+                    positions.pop(name, None)
+                data = _dumps(value)
+                size = len(data)
+                conn.execute('INSERT OR REPLACE INTO sections (name, position, kind, value, revision) '
+                             'VALUES (?, ?, ?, ?, ?)', (name, order, KIND_VALUE, data, version))
+                kinds[name] = KIND_VALUE
+            written += size
+
+        for name in old_config:
+            if name not in config:
+                conn.execute('DELETE FROM sections WHERE name = ?', (name,))
+                conn.execute('DELETE FROM items WHERE section = ?', (name,))
+                kinds.pop(name, None)
+                positions.pop(name, None)
+
+        conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                         [('version', version), ('updated_at', time.time())])
+        return kinds, positions, written
+
+    @staticmethod
+    def _insert_items(conn, section, items, version):
+        positions = {}
+        rows = []
+        written = 0
+        for index, item in enumerate(items):
+            position = positions[item[ID_FIELD]] = (index + 1) * POSITION_STEP
+            data = _dumps(item)
+            written += len(data)
+            rows.append((section, item[ID_FIELD], position, data, version))
+        conn.executemany('INSERT INTO items (section, item_id, position, value, revision) '
+                         'VALUES (?, ?, ?, ?, ?)', rows)
+        return positions, written
+
+    @staticmethod
+    def _persist_items(conn, section, old_items, items, old_positions, version):
+        """只写入新增、修改和移动了的项目，删除不再存在的项目"""
+        old_by_id = {item[ID_FIELD]: item for item in old_items}
+        new_ids = [item[ID_FIELD] for item in items]
+        new_id_set = set(new_ids)
+        conn.executemany('DELETE FROM items WHERE section = ? AND item_id = ?',
+                         [(section, item_id) for item_id in old_by_id if item_id not in new_id_set])
+
+        positions = _place_items(new_ids, old_positions)
+        if positions is None:
+            positions = {item_id: (index + 1) * POSITION_STEP for index, item_id in enumerate(new_ids)}
+
+        rows = []
+        moved = []
+        written = 0
+        for item in items:
+            item_id = item[ID_FIELD]
+            position = positions[item_id]
+            if old_by_id.get(item_id) is item:
+                if old_positions.get(item_id) != position:
+                    moved.append((position, section, item_id))
+                continue
+            data = _dumps(item)
+            written += len(data)
+            rows.append((section, item_id, position, data, version))
+        conn.executemany('UPDATE items SET position = ? WHERE section = ? AND item_id = ?', moved)
+        conn.executemany('INSERT OR REPLACE INTO items (section, item_id, position, value, revision) '
+                         'VALUES (?, ?, ?, ?, ?)', rows)
+        return positions, written
+
+    # ---------- 导入与导出 ----------
+
+    def import_json(self, json_path, replace=False):
+        """从 config.json（含尚未合并的变更日志）导入，返回是否实际导入
+
+        数据库中已有配置且 replace 为 False 时不做任何修改（多个进程同时启动时只导入一次）。
+        导入的是现有文件内容，不按新规则校验；版本号从文件的版本继续递增。
+        """
+        source = ConfigStore(json_path, normalize=self.normalize).refresh()
+        if source is None:
+            return False
+
+        def change(snapshot):
+            if snapshot is not None and not replace:
+                return None
+            return source.config, True
+
+        def next_version(snapshot):
+            return max(source.version, snapshot.version + 1 if snapshot is not None else 1)
+
+        imported, version = self._commit(change, check=False, version=next_version)
+        if not imported:
+            return False
+        # 文件内容即为导入的版本，无需再导出
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('exported_version', ?)", (version,))
+        logger.info(f"📥 已从 {json_path} 导入配置（版本 {version}）")
+        return True
+
+    def export(self, path=None):
+        """把当前配置写成 JSON 文件（临时文件 + fsync + 原子重命名），返回导出的版本号"""
+        path = path or self.export_path
+        snapshot = self.snapshot(fresh=True)
+        if snapshot is None or path is None:
+            return None
+        data = codec.dumps(snapshot.config, pretty=self.pretty)
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        fd, tmp_path = tempfile.mkstemp(prefix='.config.', suffix='.tmp', dir=directory)
+        try:
+            os.chmod(tmp_path, mode)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._transaction('IMMEDIATE') as conn:
+            exported = self._meta(conn).get('exported_version') or 0
+            if snapshot.version > exported:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('exported_version', ?)",
+                             (snapshot.version,))
+        return snapshot.version
+
+    def close(self):
+        """停止后台线程，导出尚未导出的修改，并关闭当前线程的数据库连接"""
+        super().close()
+        if self._exporter is not None:
+            try:
+                self._export_pending()
+            except Exception as e:
+                logger.error(f"❌ 导出配置失败: {e}")
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+            self._local.conn = None
+
+    def _ensure_exporter(self):
+        """按需启动后台导出线程（在首次修改时启动，确保在工作进程内运行）"""
+        if self.export_path is None or self._closed.is_set():
+            return
+        if self._exporter is not None and self._exporter.is_alive():
+            return
+        with self._load_lock:
+            if self._exporter is not None and self._exporter.is_alive():
+                return
+            self._exporter = threading.Thread(target=self._export_loop, name='config-exporter', daemon=True)
+            self._exporter.start()
+
+    def _export_pending(self):
+        """数据库中有尚未导出的版本时导出"""
+        with self._transaction() as conn:
+            meta = self._meta(conn)
+        if (meta.get('exported_version') or 0) >= (meta.get('version') or 0):
+            return
+        version = self.export()
+        logger.info(f"📤 已导出配置版本 {version} 到 {self.export_path}")
+
+    def _export_loop(self):
+        while not self._closed.wait(self.export_interval):
+            if time.monotonic() - self._last_mutation < self.export_interval:
+                continue
+            try:
+                self._export_pending()
+            except Exception as e:
+                logger.error(f"❌ 导出配置失败: {e}")
+
+
+def main():
+    from items import assign_item_ids
+
+    parser = argparse.ArgumentParser(description='在 config.json 与 SQLite 配置数据库之间导入 / 导出')
+    parser.add_argument('action', choices=('import', 'export'))
+    parser.add_argument('--db', default='../data/config.db', help='SQLite 数据库文件')
+    parser.add_argument('--config', default='../frontend/public/config.json', help='config.json 路径')
+    parser.add_argument('--replace', action='store_true', help='导入时覆盖数据库中已有的配置')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    store = SqliteConfigStore(args.db, normalize=assign_item_ids)
+    if args.action == 'import':
+        if store.import_json(args.config, replace=args.replace):
+            print(f"✅ 已导入 {args.config} -> {args.db}")
+        else:
+            print(f"ℹ️ 未导入: 数据库中已有配置（使用 --replace 覆盖）或 {args.config} 不存在")
+    else:
+        version = store.export(args.config)
+        if version is None:
+            print("❌ 数据库中没有配置")
+            raise SystemExit(1)
+        print(f"✅ 已导出版本 {version} -> {args.config}")
+
+
+if __name__ == '__main__':
+    main()
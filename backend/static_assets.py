@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态文件服务
+功能: 在没有 nginx 的部署中直接由 Flask 提供 build_assets.py 的构建结果
+
+- 按 Accept-Encoding 选择预先生成的 .br / .gz 文件，附带 Content-Encoding 和 Vary
+- 文件名带内容哈希的资源使用一年的 immutable 缓存，其余文件（页面等）每次重新验证
+- ETag / Last-Modified 由 send_from_directory 生成，支持 304 和 Range 请求
+"""
+
+import os
+import re
+import mimetypes
+
+from flask import send_from_directory
+from werkzeug.security import safe_join
+
+# build_assets.py 生成的文件名: name.<10 位十六进制哈希>.ext
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{10}\.[A-Za-z0-9]+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# 预压缩文件的后缀，按优先级排列（发送 .br 文件不需要安装 brotli）
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def send_static(root, filename, accept_encodings):
+    """发送 root 下的静态文件，存在预压缩版本且客户端支持时发送压缩版本"""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    immutable = FINGERPRINTED.search(filename) is not None
+
+    name, encoding = filename, None
+    for candidate, suffix in PRECOMPRESSED:
+        if accept_encodings.quality(candidate) <= 0:
+            continue
+        variant = filename + suffix
+        path = safe_join(root, variant)
+        if path is not None and os.path.isfile(path):
+            name, encoding = variant, candidate
+            break
+
+    response = send_from_directory(root, name, mimetype=mimetype,
+                                   max_age=IMMUTABLE_MAX_AGE if immutable else 0)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
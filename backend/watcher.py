@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置文件监视
+功能: 在后台线程中监视 config.json 及其变更日志，文件变化后立即重新加载，
+      请求线程只读取内存中的快照，不再访问磁盘或解析 JSON
+
+Linux 下通过 ctypes 调用 inotify 监视配置文件所在目录（原子替换会更换 inode，
+因此监视目录而不是文件本身）；其他平台或 inotify 不可用时退回定时 stat 轮询。
+"""
+
+import os
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+# 收到事件后稍等片刻再加载，把同一次保存产生的多个事件合并为一次
+DEBOUNCE = 0.02
+
+
+class _Inotify:
+    """最小化的 inotify 封装"""
+
+    def __init__(self, directory):
+        if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+            raise OSError(errno.ENOSYS, "inotify 仅在 Linux 下可用")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"无法监视目录 {directory}")
+
+    def wait(self, timeout):
+        """等待事件，返回发生变化的文件名集合（超时返回空集合）"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    raise OSError(errno.ENOENT, "被监视的目录已被删除或移动")
+                names.add(os.fsdecode(name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigWatcher:
+    """监视配置文件并在变化后刷新存储中的快照
+
+    interval 为轮询间隔；使用 inotify 时也按该间隔做一次兜底校验。
+    """
+
+    def __init__(self, store, interval=2.0):
+        self.store = store
+        self.interval = interval
+        paths = store.watch_paths
+        self.names = {os.path.basename(path) for path in paths}
+        self.directory = os.path.dirname(os.path.abspath(paths[0]))
+        self.mode = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _refresh(self):
+        try:
+            self.store.refresh()
+        except Exception as e:
+            logger.error(f"❌ 刷新配置失败: {e}")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                inotify = _Inotify(self.directory)
+            except OSError as e:
+                logger.info(f"ℹ️ inotify 不可用（{e}），改为每 {self.interval} 秒轮询配置文件")
+                self.mode = 'poll'
+                self._poll()
+                return
+
+            self.mode = 'inotify'
+            logger.info(f"👀 正在监视配置文件: {self.store.watch_paths[0]}")
+            try:
+                # 监视建立之前的修改可能被错过，先校验一次
+                self._refresh()
+                while not self._stopped.is_set():
+                    names = inotify.wait(self.interval)
+                    if names and not (names & self.names):
+                        continue
+                    if names:
+                        self._stopped.wait(DEBOUNCE)
+                        inotify.wait(0)
+                    self._refresh()
+            except OSError as e:
+                logger.warning(f"⚠️ 配置文件监视中断，重新建立: {e}")
+                self._stopped.wait(self.interval)
+            finally:
+                inotify.close()
+
+    def _poll(self):
+        while not self._stopped.wait(self.interval):
+            self._refresh()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 编解码基准测试
+功能: 对不同规模的配置，比较标准库 json 与 codec（安装了 orjson 时为 orjson）的解析和序列化耗时，
+      以及缩进格式与紧凑格式的文件大小
+
+用法:
+    python3 benchmarks/bench_codec.py --sizes 100,1000,10000
+    python3 benchmarks/bench_codec.py --sizes 1000 --output codec.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(ROOT), 'backend'))
+sys.path.insert(0, ROOT)
+
+import codec  # noqa: E402
+from generate_config import generate_config  # noqa: E402
+
+
+def _best_of(function, repeat):
+    """返回 repeat 次中最短的耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1000, 3)
+
+
+def measure(size, repeat, seed=0):
+    config = generate_config(size, seed)
+    pretty = json.dumps(config, ensure_ascii=False, indent=2).encode('utf-8')
+    compact = codec.dumps(config)
+    cases = {
+        'stdlib_loads_pretty': lambda: json.loads(pretty.decode('utf-8')),
+        'codec_loads_pretty': lambda: codec.loads(pretty),
+        'codec_loads_compact': lambda: codec.loads(compact),
+        'stdlib_dumps_pretty': lambda: json.dumps(config, ensure_ascii=False, indent=2).encode('utf-8'),
+        'codec_dumps_pretty': lambda: codec.dumps(config, pretty=True),
+        'stdlib_dumps_compact': lambda: json.dumps(config, ensure_ascii=False,
+                                                   separators=(',', ':')).encode('utf-8'),
+        'codec_dumps_compact': lambda: codec.dumps(config),
+    }
+    return {
+        'size': size,
+        'pretty_bytes': len(pretty),
+        'compact_bytes': len(compact),
+        'ms': {name: _best_of(function, repeat) for name, function in cases.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON 编解码基准测试')
+    parser.add_argument('--sizes', default='100,1000,10000', help='项目和友链的数量，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=20, help='每项重复次数（取最短耗时）')
+    parser.add_argument('--output', help='结果保存为 JSON 文件')
+    args = parser.parse_args()
+
+    print(f"⚙️ codec 实现: {codec.BACKEND}")
+    results = []
+    for size in (int(value) for value in args.sizes.split(',') if value.strip()):
+        result = measure(size, args.repeat)
+        results.append(result)
+        ms = result['ms']
+        print(f"\n📦 size={size}: 缩进 {result['pretty_bytes'] // 1024} KB / 紧凑 {result['compact_bytes'] // 1024} KB")
+        print(f"   解析:   标准库 {ms['stdlib_loads_pretty']} ms, codec {ms['codec_loads_pretty']} ms"
+              f"（紧凑文件 {ms['codec_loads_compact']} ms）")
+        print(f"   序列化: 缩进 标准库 {ms['stdlib_dumps_pretty']} ms, codec {ms['codec_dumps_pretty']} ms；"
+              f"紧凑 标准库 {ms['stdlib_dumps_compact']} ms, codec {ms['codec_dumps_compact']} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'codec': codec.BACKEND, 'repeat': args.repeat, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n💾 结果已保存到 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
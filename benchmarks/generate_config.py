@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成基准测试用的配置文件
+功能: 以仓库中的 config.json 为模板，生成指定数量的项目 / 友链 / 技能，结果可重复（固定随机种子）
+
+用法:
+    python3 benchmarks/generate_config.py --size 1000 --output /tmp/config.json
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+
+from items import assign_item_ids  # noqa: E402
+
+TEMPLATE = os.path.join(ROOT, 'frontend', 'public', 'config.json')
+ICONS = ('fas fa-code', 'fab fa-github', 'fas fa-book', 'fas fa-star', 'fab fa-react', 'fas fa-link')
+LEVELS = ('了解', '熟悉', '掌握', '精通')
+WORDS = ('智能', '笔记', '工具', '博客', '社区', '设计', '开源', '效率', '数据', '云端', '助手', '实验室')
+
+
+def _text(rng, words):
+    return ''.join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate_config(size, seed=0, template=TEMPLATE):
+    """返回包含 size 个项目、size 个友链和 max(10, size // 10) 个技能的配置（已带项目 ID）"""
+    rng = random.Random(seed)
+    with open(template, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    config['projects'] = [{
+        'name': f"{_text(rng, 2)}-{i}",
+        'desc': _text(rng, rng.randint(4, 12)),
+        'icon': rng.choice(ICONS),
+        'url': f"https://project-{i}.example.com/",
+    } for i in range(size)]
+    config['friendLinks'] = [{
+        'name': f"{_text(rng, 2)}-{i}",
+        'description': _text(rng, rng.randint(3, 8)),
+        'icon': rng.choice(ICONS),
+        'url': f"https://friend-{i}.example.com/",
+    } for i in range(size)]
+    config['skills'] = [{
+        'name': f"Skill-{i}",
+        'level': rng.choice(LEVELS),
+    } for i in range(max(10, size // 10))]
+    return assign_item_ids(config)
+
+
+def write_config(path, size, seed=0):
+    """生成配置并写入 path，返回文件字节数"""
+    data = json.dumps(generate_config(size, seed), ensure_ascii=False, indent=2).encode('utf-8')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成基准测试用的配置文件')
+    parser.add_argument('--size', type=int, default=100, help='项目和友链的数量')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--output', required=True, help='输出文件')
+    args = parser.parse_args()
+    size = write_config(args.output, args.size, args.seed)
+    print(f"📝 已生成 {args.output}（{args.size} 个项目 / 友链，{size // 1024} KB）")
+
+
+if __name__ == '__main__':
+    main()
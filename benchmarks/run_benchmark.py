@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后端基准测试
+功能: 在本机启动后端（独立的临时配置、缓存和日志目录），按指定的读写比例和并发数压测，
+      输出吞吐量、p50 / p95 / p99 延迟和错误率（JSON），并可与保存的基线对比
+
+用法:
+    python3 benchmarks/run_benchmark.py --sizes 10,1000,10000 --concurrency 16 --duration 10 \\
+        --mix mixed --output results.json
+    python3 benchmarks/run_benchmark.py --sizes 1000 --baseline benchmarks/baseline.json
+
+不访问任何外部服务，也不会修改仓库中的 config.json。
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+from datetime import datetime, timezone
+
+from generate_config import ROOT, write_config
+
+BACKEND_DIR = os.path.join(ROOT, 'backend')
+
+# 预设的读写比例: 操作名 -> 权重
+MIXES = {
+    'read-heavy': {'config': 30, 'config_cached': 10, 'section': 10, 'collection': 15, 'item': 10,
+                   'static': 20, 'update_item': 4, 'add_delete': 1},
+    'mixed': {'config': 20, 'config_cached': 5, 'section': 10, 'collection': 15, 'item': 10,
+              'static': 15, 'update_item': 15, 'add_delete': 10},
+    'write-heavy': {'config': 10, 'collection': 10, 'item': 10, 'update_item': 50, 'add_delete': 20},
+}
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def parse_mix(value):
+    """预设名称，或形如 config=50,update_item=10 的自定义比例"""
+    if value in MIXES:
+        return dict(MIXES[value])
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"未知的操作: {name}（可选: {', '.join(OPERATIONS)}）")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# ---------- 服务端 ----------
+
+class Server:
+    """在临时目录中启动后端进程"""
+
+    def __init__(self, workdir, config_path, mode='serve', workers=2, threads=8, max_items=0, env=None):
+        self.port = free_port()
+        self.console_path = os.path.join(workdir, 'console.log')
+        script = 'serve.py' if mode == 'serve' else 'app.py'
+        environment = dict(os.environ)
+        environment.update({
+            'CONFIG_FILE': config_path,
+            # CONFIG_BACKEND=sqlite 时使用的数据库（从 config_path 导入）
+            'CONFIG_DB': os.path.join(workdir, 'config.db'),
+            'CONFIG_SNAPSHOT_DIR': os.path.join(workdir, 'history'),
+            'CACHE_DIR': os.path.join(workdir, 'cache'),
+            'LOG_FILE': os.path.join(workdir, 'logs', 'app.log'),
+            'PID_FILE': os.path.join(workdir, 'serve.pid'),
+            'LOG_CONSOLE': 'false',
+            'HOST': '127.0.0.1',
+            'PORT': str(self.port),
+            'WORKERS': str(workers),
+            'THREADS': str(threads),
+            # 大规模配置超过默认的项目数上限时放宽限制
+            'CONFIG_MAX_ITEMS': str(max(1000, max_items)),
+        })
+        environment.update(env or {})
+        self._console = open(self.console_path, 'wb')
+        self.process = subprocess.Popen([sys.executable, script], cwd=BACKEND_DIR, env=environment,
+                                        stdout=self._console, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                # 就绪检查在预热完成后才返回 200，压测从第一个请求起就面对预热后的服务
+                conn.request('GET', '/api/health/ready')
+                if conn.getresponse().status == 200:
+                    conn.close()
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        with open(self.console_path, 'r', encoding='utf-8', errors='replace') as f:
+            output = f.read()[-2000:]
+        raise RuntimeError(f"后端启动失败:\n{output}")
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._console.close()
+
+
+# ---------- 压测客户端 ----------
+
+class Client:
+    """一个并发连接: 持有 keep-alive 连接，记录每个操作的耗时"""
+
+    def __init__(self, port, rng, state):
+        self.port = port
+        self.rng = rng
+        self.state = state
+        self.conn = None
+        self.samples = {}
+        self.recording = False
+        self.created = []
+
+    def request(self, op, method, path, body=None, headers=None, expect=(200,)):
+        """发送请求并记录耗时，返回 (状态码, 响应体)"""
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+            self.conn.request(method, path, body=data, headers=headers or {})
+            response = self.conn.getresponse()
+            payload = response.read()
+            status = response.status
+            if response.will_close:
+                self.conn.close()
+                self.conn = None
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            status, payload = None, b''
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            latencies, errors = self.samples.setdefault(op, ([], [0]))
+            latencies.append(elapsed)
+            if status not in expect:
+                errors[0] += 1
+        return status, payload
+
+    def run(self, mix, deadline):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        while time.monotonic() < deadline:
+            OPERATIONS[self.rng.choices(names, weights)[0]](self)
+        # 清理本连接新增但还没删除的项目，保持配置规模不变（不计入结果）
+        self.recording = False
+        for item_id in self.created:
+            self.request('delete_item', 'DELETE', f'/api/friendlinks/{item_id}')
+        self.created = []
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def _random_id(client, section):
+    return client.rng.choice(client.state['ids'][section])
+
+
+def op_config(client):
+    client.request('config', 'GET', '/api/config')
+
+
+def op_config_cached(client):
+    client.request('config_cached', 'GET', '/api/config',
+                   headers={'If-None-Match': client.state['etag']}, expect=(200, 304))
+
+
+def op_section(client):
+    client.request('section', 'GET', client.rng.choice(('/api/profile', '/api/contact', '/api/music')))
+
+
+def op_collection(client):
+    total = len(client.state['ids']['projects'])
+    offset = client.rng.randrange(max(1, total))
+    client.request('collection', 'GET', f'/api/projects?offset={offset}&limit=20')
+
+
+def op_item(client):
+    client.request('item', 'GET', f"/api/projects/{_random_id(client, 'projects')}")
+
+
+def op_static(client):
+    client.request('static', 'GET', client.rng.choice(client.state['static']),
+                   headers={'Accept-Encoding': 'gzip, br'})
+
+
+def op_update_item(client):
+    item_id = _random_id(client, 'projects')
+    client.request('update_item', 'PUT', f'/api/projects/{item_id}', body={
+        'name': f'bench-{item_id}',
+        'desc': f'updated {client.rng.random():.6f}',
+        'icon': 'fas fa-code',
+        'url': 'https://bench.example.com/',
+    }, headers=JSON_HEADERS)
+
+
+def op_add_delete(client):
+    """新增一个友链，随后删除本连接之前新增的一个，配置规模保持不变"""
+    status, payload = client.request('add_item', 'POST', '/api/friendlinks', body={
+        'name': 'bench', 'description': 'benchmark', 'icon': 'fas fa-link', 'url': 'https://bench.example.com/',
+    }, headers=JSON_HEADERS)
+    if status == 200:
+        try:
+            client.created.append(json.loads(payload)['data']['id'])
+        except (ValueError, KeyError, TypeError):
+            pass
+    if len(client.created) > 1:
+        item_id = client.created.pop(0)
+        client.request('delete_item', 'DELETE', f'/api/friendlinks/{item_id}')
+
+
+OPERATIONS = {
+    'config': op_config,
+    'config_cached': op_config_cached,
+    'section': op_section,
+    'collection': op_collection,
+    'item': op_item,
+    'static': op_static,
+    'update_item': op_update_item,
+    'add_delete': op_add_delete,
+}
+
+
+def discover_state(port):
+    """读取当前配置，取得项目 ID、ETag 和静态文件地址"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('GET', '/api/config')
+    response = conn.getresponse()
+    config = json.loads(response.read())['data']
+    etag = response.getheader('ETag') or ''
+    conn.close()
+    static = ['/', '/favicon.ico']
+    for name in ('src/styles.css', 'src/script.js'):
+        static.append('/' + name)
+    return {
+        'etag': etag,
+        'ids': {section: [item['id'] for item in config.get(section, [])]
+                for section in ('projects', 'friendLinks')},
+        'static': static,
+    }
+
+
+def run_load(port, mix, concurrency, duration, warmup, seed):
+    """并发压测 duration 秒（之前先预热 warmup 秒），返回 (各连接的客户端, 实际耗时)"""
+    state = discover_state(port)
+    clients = [Client(port, random.Random(seed * 1000 + i), state) for i in range(concurrency)]
+
+    def phase(seconds, recording):
+        for client in clients:
+            client.recording = recording
+        deadline = time.monotonic() + seconds
+        threads = [threading.Thread(target=client.run, args=(mix, deadline)) for client in clients]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    if warmup > 0:
+        phase(warmup, False)
+    elapsed = phase(duration, True)
+    return clients, elapsed
+
+
+# ---------- 统计 ----------
+
+def percentile(values, fraction):
+    """values 已排序，最近秩法"""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 6) if count else 0.0,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': to_ms(sum(latencies) / count) if count else None,
+            'p50': to_ms(percentile(latencies, 0.50)),
+            'p95': to_ms(percentile(latencies, 0.95)),
+            'p99': to_ms(percentile(latencies, 0.99)),
+            'max': to_ms(latencies[-1]) if count else None,
+        },
+    }
+
+
+def collect_results(clients, elapsed):
+    merged = {}
+    for client in clients:
+        for op, (latencies, errors) in client.samples.items():
+            all_latencies, all_errors = merged.setdefault(op, ([], [0]))
+            all_latencies.extend(latencies)
+            all_errors[0] += errors[0]
+    operations = {op: summarize(latencies, errors[0], elapsed)
+                  for op, (latencies, errors) in sorted(merged.items())}
+    overall = summarize([value for latencies, _ in merged.values() for value in latencies],
+                        sum(errors[0] for _, errors in merged.values()), elapsed)
+    return overall, operations
+
+
+# ---------- 基线对比 ----------
+
+def compare(results, baseline, max_regression):
+    """与基线逐个规模对比，返回发现的退化列表"""
+    regressions = []
+    previous_runs = {run['size']: run for run in baseline.get('runs', [])}
+    print(f"\n📊 与基线对比（{baseline.get('meta', {}).get('timestamp', '未知时间')}）:")
+    for run in results['runs']:
+        previous = previous_runs.get(run['size'])
+        if previous is None:
+            print(f"   size={run['size']}: 基线中没有该规模，跳过")
+            continue
+        now, before = run['overall'], previous['overall']
+        checks = [
+            ('throughput_rps', now['throughput_rps'], before['throughput_rps'], True),
+            ('p95', now['latency_ms']['p95'], before['latency_ms']['p95'], False),
+            ('p99', now['latency_ms']['p99'], before['latency_ms']['p99'], False),
+        ]
+        for name, value, reference, higher_is_better in checks:
+            if not reference or value is None:
+                continue
+            change = (value - reference) / reference
+            worse = -change if higher_is_better else change
+            flag = '❌' if worse > max_regression else '✅'
+            print(f"   size={run['size']} {name}: {reference} -> {value} ({change:+.1%}) {flag}")
+            if worse > max_regression:
+                regressions.append(f"size={run['size']} {name} {change:+.1%}")
+        if now['error_rate'] > before['error_rate'] + 0.001:
+            regressions.append(f"size={run['size']} error_rate {before['error_rate']} -> {now['error_rate']}")
+            print(f"   size={run['size']} error_rate: {before['error_rate']} -> {now['error_rate']} ❌")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='后端基准测试')
+    parser.add_argument('--sizes', default='10,1000', help='项目 / 友链数量，逗号分隔（每个规模单独启动一次后端）')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发连接数')
+    parser.add_argument('--duration', type=float, default=10.0, help='每个规模的压测时长（秒）')
+    parser.add_argument('--warmup', type=float, default=2.0, help='预热时长（秒），不计入结果')
+    parser.add_argument('--mix', type=parse_mix, default='mixed',
+                        help=f"读写比例: {' / '.join(MIXES)}，或 config=50,update_item=10")
+    parser.add_argument('--server', choices=('serve', 'flask'), default='serve',
+                        help='serve: gunicorn 多进程（serve.py）；flask: 开发服务器（app.py）')
+    parser.add_argument('--workers', type=int, default=2, help='serve 模式的工作进程数')
+    parser.add_argument('--threads', type=int, default=8, help='serve 模式每个工作进程的线程数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（配置内容和请求序列）')
+    parser.add_argument('--output', help='结果 JSON 文件，默认输出到标准输出')
+    parser.add_argument('--baseline', help='基线结果文件，有退化时以状态码 1 退出')
+    parser.add_argument('--max-regression', type=float, default=0.15,
+                        help='允许的退化比例（吞吐量下降或 p95 / p99 上升），默认 0.15')
+    parser.add_argument('--keep', action='store_true', help='保留临时目录（配置、日志）以便排查')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'server': args.server,
+            'workers': args.workers if args.server == 'serve' else 1,
+            'threads': args.threads,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'mix': args.mix,
+            'seed': args.seed,
+        },
+        'runs': [],
+    }
+
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix='homepage-bench-')
+        config_path = os.path.join(workdir, 'config.json')
+        config_bytes = write_config(config_path, size, args.seed)
+        print(f"🚀 size={size}（配置 {config_bytes // 1024} KB），{args.concurrency} 并发压测 {args.duration:g} 秒...",
+              file=sys.stderr)
+        server = Server(workdir, config_path, args.server, args.workers, args.threads, max_items=size * 2)
+        try:
+            server.wait_ready()
+            clients, elapsed = run_load(server.port, args.mix, args.concurrency,
+                                        args.duration, args.warmup, args.seed)
+        finally:
+            server.stop()
+            if not args.keep:
+                subprocess.run(['rm', '-rf', workdir])
+            else:
+                print(f"📁 临时目录: {workdir}", file=sys.stderr)
+        overall, operations = collect_results(clients, elapsed)
+        results['runs'].append({'size': size, 'config_bytes': config_bytes,
+                                'overall': overall, 'operations': operations})
+        print(f"   {overall['throughput_rps']} req/s, p50 {overall['latency_ms']['p50']} ms, "
+              f"p99 {overall['latency_ms']['p99']} ms, 错误率 {overall['error_rate']:.2%}", file=sys.stderr)
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        print(f"💾 结果已保存到 {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print(f"\n❌ 发现 {len(regressions)} 项退化: {'; '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+        print("\n✅ 没有超过阈值的退化", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -22,45 +22,30 @@ else
     pip install -r requirements.txt
 fi
 
-# 检查是否有旧的进程在运行
-echo "🔍 检查现有进程..."
-if pgrep -f "python.*app.py" > /dev/null; then
-    echo "🛑 停止旧的后端进程..."
-    pkill -f "python.*app.py" || true
-    sleep 2
-fi
-
-# 启动后端服务
-echo "🚀 启动后端服务..."
-nohup python3 app.py > ../app.log 2>&1 &
-BACKEND_PID=$!
+# 构建前端静态资源（带哈希的文件名 + 预压缩文件，输出到 frontend/dist）
+echo "📦 构建前端静态资源..."
+python3 build_assets.py
 
-# 等待服务启动
-echo "⏳ 等待服务启动..."
-sleep 3
-
-# 检查服务是否正常启动
-if ps -p $BACKEND_PID > /dev/null; then
-    echo "✅ 后端服务启动成功！PID: $BACKEND_PID"
-    
-    # 测试健康检查
-    sleep 2
-    if curl -f http://127.0.0.1:3001/api/health >/dev/null 2>&1; then
-        echo "✅ 后端健康检查通过"
-    else
-        echo "⚠️ 后端健康检查失败，请检查日志"
-    fi
-else
+# 启动后端服务；已在运行时平滑重启: 新进程预热完成后才接管请求，旧进程处理完进行中的请求后退出
+if ! (cd .. && bash start.sh); then
     echo "❌ 后端服务启动失败"
     exit 1
 fi
 
+# 测试就绪检查
+if curl -f http://127.0.0.1:3001/api/health/ready >/dev/null 2>&1; then
+    echo "✅ 后端就绪检查通过"
+else
+    echo "⚠️ 后端就绪检查失败，请检查日志"
+fi
+
 echo ""
 echo "✅ 部署完成！"
 echo "🔗 后端API地址: http://127.0.0.1:3001"
-echo "🏥 健康检查: http://127.0.0.1:3001/api/health"
-echo "📋 查看日志: tail -f ../app.log"
-echo "🛑 停止服务: pkill -f 'python.*app.py'"
+echo "🏥 健康检查: http://127.0.0.1:3001/api/health/live（存活）、/api/health/ready（就绪）"
+echo "📋 查看日志: tail -f ../logs/app.log"
+echo "🔄 平滑重启: ./start.sh"
+echo "🛑 停止服务: ./stop.sh"
 echo ""
 echo "📝 接下来的步骤："
 echo "1. 更新Nginx配置文件 /etc/nginx/sites-available/home.name666.top"
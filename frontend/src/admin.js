@@ -1,5 +1,9 @@
 // 全局配置数据
 let configData = {};
+// 最近一次与后端同步的配置，用于计算增量补丁
+let savedConfigData = {};
+// 登录时输入的管理密码，解析尚未保存的网站图标等需要管理权限的请求通过 X-Admin-Password 发送
+let adminPassword = '';
 
 // 登录验证
 async function login() {
@@ -33,6 +37,7 @@ async function login() {
 
         if (result.success) {
             // 登录成功
+            adminPassword = password;
             document.getElementById('loginContainer').style.display = 'none';
             document.getElementById('adminLayout').style.display = 'block';
             loadConfig();
@@ -65,6 +70,7 @@ async function loadConfig() {
             const result = await response.json();
             if (result.success && result.data) {
                 configData = result.data;
+                savedConfigData = cloneConfig(configData);
 
                 // 加载预设数据
                 loadPresets();
@@ -399,6 +405,20 @@ async function removeProject(index) {
     }
 }
 
+// 由后端解析网站图标（并发探测 + 缓存），返回图标地址，找不到时返回 null
+async function resolveSiteIcon(siteUrl) {
+    const response = await fetch(`${window.location.origin}/api/favicon?url=${encodeURIComponent(siteUrl)}`, {
+        headers: {
+            'X-Admin-Password': adminPassword
+        }
+    });
+    const result = await response.json();
+    if (!response.ok || !result.success) {
+        throw new Error(result.message || '图标解析失败');
+    }
+    return result.data.icon;
+}
+
 // 自动获取项目图标
 async function autoGetProjectIcon(index) {
     const project = configData.projects[index];
@@ -408,42 +428,14 @@ async function autoGetProjectIcon(index) {
     }
 
     try {
-        // 从URL提取域名
-        const url = new URL(project.url);
-        const domain = url.hostname;
-
-        // 尝试多种favicon获取方式
-        const faviconUrls = [
-            `${url.protocol}//${domain}/favicon.ico`,
-            `${url.protocol}//${domain}/favicon.png`,
-            `${url.protocol}//${domain}/apple-touch-icon.png`,
-            `https://www.google.com/s2/favicons?domain=${domain}&sz=64`,
-            `https://favicon.yandex.net/favicon/${domain}`
-        ];
-
-        // 测试第一个可用的favicon
-        for (const faviconUrl of faviconUrls) {
-            try {
-                const response = await fetch(faviconUrl, {
-                    method: 'HEAD'
-                });
-                if (response.ok) {
-                    await updateProject(index, 'icon', faviconUrl);
-                    renderProjects();
-                    alert('图标获取成功！');
-                    return;
-                }
-            } catch (e) {
-                continue;
-            }
+        const icon = await resolveSiteIcon(project.url);
+        if (!icon) {
+            alert('未找到网站图标，请手动输入图标URL或FontAwesome类名');
+            return;
         }
-
-        // 如果都失败了，使用Google的favicon服务作为备选
-        const fallbackIcon = `https://www.google.com/s2/favicons?domain=${domain}&sz=32`;
-        await updateProject(index, 'icon', fallbackIcon);
+        await updateProject(index, 'icon', icon);
         renderProjects();
-        alert('使用备选图标服务获取成功！');
-
+        alert('图标获取成功！');
     } catch (error) {
         console.error('获取图标失败:', error);
         alert('获取图标失败，请手动输入图标URL或FontAwesome类名');
@@ -545,42 +537,14 @@ async function autoGetFriendIcon(index) {
     }
 
     try {
-        // 从URL提取域名
-        const url = new URL(friend.url);
-        const domain = url.hostname;
-
-        // 尝试多种favicon获取方式
-        const faviconUrls = [
-            `${url.protocol}//${domain}/favicon.ico`,
-            `${url.protocol}//${domain}/favicon.png`,
-            `${url.protocol}//${domain}/apple-touch-icon.png`,
-            `https://www.google.com/s2/favicons?domain=${domain}&sz=64`,
-            `https://favicon.yandex.net/favicon/${domain}`
-        ];
-
-        // 测试第一个可用的favicon
-        for (const faviconUrl of faviconUrls) {
-            try {
-                const response = await fetch(faviconUrl, {
-                    method: 'HEAD'
-                });
-                if (response.ok) {
-                    await updateFriend(index, 'icon', faviconUrl);
-                    renderFriends();
-                    alert('图标获取成功！');
-                    return;
-                }
-            } catch (e) {
-                continue;
-            }
+        const icon = await resolveSiteIcon(friend.url);
+        if (!icon) {
+            alert('未找到网站图标，请手动输入图标URL');
+            return;
         }
-
-        // 如果都失败了，使用Google的favicon服务作为备选
-        const fallbackIcon = `https://www.google.com/s2/favicons?domain=${domain}&sz=32`;
-        await updateFriend(index, 'icon', fallbackIcon);
+        await updateFriend(index, 'icon', icon);
         renderFriends();
-        alert('使用备选图标服务获取成功！');
-
+        alert('图标获取成功！');
     } catch (error) {
         console.error('获取友链图标失败:', error);
         alert('获取图标失败，请手动输入图标URL');
@@ -657,27 +621,138 @@ async function removeSocial(index) {
     }
 }
 
+// 深拷贝配置数据
+function cloneConfig(data) {
+    return JSON.parse(JSON.stringify(data));
+}
+
+// 计算两份配置之间的 JSON Patch (RFC 6902) 操作列表
+function diffConfig(oldValue, newValue, path = '') {
+    if (oldValue === newValue) {
+        return [];
+    }
+
+    const bothObjects = oldValue && newValue && typeof oldValue === 'object' && typeof newValue === 'object';
+    if (!bothObjects || Array.isArray(oldValue) !== Array.isArray(newValue)) {
+        return [{ op: 'replace', path: path, value: newValue }];
+    }
+
+    // 数组长度变化时整体替换，避免下标错位
+    if (Array.isArray(oldValue) && oldValue.length !== newValue.length) {
+        return [{ op: 'replace', path: path, value: newValue }];
+    }
+
+    const ops = [];
+    const escape = key => String(key).replace(/~/g, '~0').replace(/\//g, '~1');
+    for (const key of Object.keys(oldValue)) {
+        // id 由服务端分配，表单重建的项目可能不带 id，不能因此删掉
+        if (!(key in newValue) && key !== 'id') {
+            ops.push({ op: 'remove', path: `${path}/${escape(key)}` });
+        }
+    }
+    for (const key of Object.keys(newValue)) {
+        const childPath = `${path}/${escape(key)}`;
+        if (!(key in oldValue)) {
+            ops.push({ op: 'add', path: childPath, value: newValue[key] });
+        } else {
+            ops.push(...diffConfig(oldValue[key], newValue[key], childPath));
+        }
+    }
+    return ops;
+}
+
+// 带 id 的数组配置
+const ID_COLLECTIONS = ['skills', 'projects', 'friendLinks', 'socialLinks'];
+
+// 保存后把服务端分配的项目 id 同步回本地配置，后续修改才能保持同一个 id
+async function syncItemIds() {
+    try {
+        const response = await fetch(getApiUrl());
+        if (!response.ok) {
+            return;
+        }
+        const result = await response.json();
+        if (!result.success || !result.data) {
+            return;
+        }
+        for (const section of ID_COLLECTIONS) {
+            const serverItems = result.data[section];
+            for (const local of [configData, savedConfigData]) {
+                const items = local[section];
+                if (!Array.isArray(items) || !Array.isArray(serverItems) || items.length !== serverItems.length) {
+                    continue;
+                }
+                items.forEach((item, index) => {
+                    const serverItem = serverItems[index];
+                    if (item && typeof item === 'object' && serverItem && serverItem.id) {
+                        item.id = serverItem.id;
+                    }
+                });
+            }
+        }
+    } catch (error) {
+        console.warn('⚠️ 同步项目 id 失败:', error);
+    }
+}
+
+// 以整个配置覆盖保存
+async function saveFullConfig() {
+    const response = await fetch(getApiUrl(), {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(configData)
+    });
+
+    if (response.ok) {
+        const result = await response.json();
+        if (result.success) {
+            savedConfigData = cloneConfig(configData);
+            return true;
+        }
+    }
+    return false;
+}
+
 // 自动保存配置（静默保存，无弹窗）
+// 只把变化的部分以 JSON Patch 发送给后端，失败时退回整体保存
 async function autoSaveConfig() {
     try {
+        const ops = diffConfig(savedConfigData, configData);
+        if (ops.length === 0) {
+            showSaveIndicator();
+            return true;
+        }
+
         const response = await fetch(getApiUrl(), {
-            method: 'POST',
+            method: 'PATCH',
             headers: {
-                'Content-Type': 'application/json',
+                'Content-Type': 'application/json-patch+json',
             },
-            body: JSON.stringify(configData)
+            body: JSON.stringify(ops)
         });
 
+        let saved = false;
         if (response.ok) {
             const result = await response.json();
             if (result.success) {
-                console.log('✅ 配置已自动保存');
-                // 显示简单的保存提示
-                showSaveIndicator();
-                return true;
+                savedConfigData = cloneConfig(configData);
+                saved = true;
             }
         }
-        return false;
+        if (!saved) {
+            console.warn('⚠️ 增量保存失败，改为整体保存');
+            saved = await saveFullConfig();
+        }
+
+        if (saved) {
+            await syncItemIds();
+            console.log('✅ 配置已自动保存');
+            // 显示简单的保存提示
+            showSaveIndicator();
+        }
+        return saved;
     } catch (error) {
         console.error('❌ 自动保存失败:', error);
         return false;
@@ -728,6 +803,14 @@ function showSaveIndicator() {
     }, 3000);
 }
 
+// 把后端返回的校验错误整理为可读的文本
+function formatValidationErrors(result) {
+    if (!result.details || result.details.length === 0) {
+        return result.message || '';
+    }
+    return result.details.map(item => `• ${item.path}: ${item.message}`).join('\n');
+}
+
 // 手动保存配置（带详细提示）
 async function saveConfig() {
     try {
@@ -743,12 +826,21 @@ async function saveConfig() {
         if (response.ok) {
             const result = await response.json();
             if (result.success) {
+                savedConfigData = cloneConfig(configData);
+                await syncItemIds();
                 alert(`✅ 配置保存成功！\n\n${result.message}\n\n🎉 config.json文件已直接更新，刷新主页即可看到效果！`);
                 console.log('✅ 配置已通过后端API保存');
                 return;
             }
         }
 
+        // 数据未通过校验或过大: 后端可用，提示具体原因而不是降级为下载
+        if (response.status === 400 || response.status === 413) {
+            const result = await response.json().catch(() => ({}));
+            alert(`❌ 配置未保存：${result.error || '数据无效'}\n\n${formatValidationErrors(result)}`);
+            return;
+        }
+
         // 如果后端不可用，降级为下载文件
         console.log('⚠️ 后端不可用，降级为文件下载');
         downloadConfig();
@@ -838,11 +930,26 @@ function renderPresets(type) {
 
         // 创建图片元素
         const img = document.createElement('img');
-        img.src = preset.url;
         img.alt = preset.name;
-        img.onerror = function () {
-            this.style.display = 'none';
-        };
+        img.loading = 'lazy';
+        img.decoding = 'async';
+        if (type === 'video') {
+            img.src = preset.url;
+            img.onerror = function () {
+                this.style.display = 'none';
+            };
+        } else {
+            // 预览只需要小图，原图留给真正使用时加载；缩略图不可用时退回原图
+            img.src = `${window.location.origin}/api/image?src=${encodeURIComponent(preset.url)}&w=320`;
+            img.onerror = function () {
+                if (!this.dataset.fallback) {
+                    this.dataset.fallback = 'true';
+                    this.src = preset.url;
+                } else {
+                    this.style.display = 'none';
+                }
+            };
+        }
 
         // 创建标签元素
         const label = document.createElement('div');
@@ -998,28 +1105,19 @@ function scrollPresets(containerId, direction) {
 // 保存预设到后端
 async function saveBackgroundPresets() {
     try {
-        const response = await fetch('/api/config');
-        if (!response.ok) throw new Error('获取配置失败');
-
-        const result = await response.json();
-        if (!result.success) throw new Error(result.message || '获取配置失败');
-
-        const config = result.data;
-
-        // 更新配置中的预设数据
-        if (!config.backgroundPresets) {
-            config.backgroundPresets = {};
-        }
-        config.backgroundPresets.profile = profileBackgroundPresets;
-        config.backgroundPresets.right = rightBackgroundPresets;
-        config.backgroundPresets.video = videoBackgroundPresets;
+        // 只提交预设部分（JSON Merge Patch），无需先下载再上传整个配置
+        const presets = {
+            profile: profileBackgroundPresets,
+            right: rightBackgroundPresets,
+            video: videoBackgroundPresets
+        };
 
         const saveResponse = await fetch('/api/config', {
-            method: 'POST',
+            method: 'PATCH',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/merge-patch+json'
             },
-            body: JSON.stringify(config)
+            body: JSON.stringify({ backgroundPresets: presets })
         });
 
         if (!saveResponse.ok) throw new Error('保存配置失败');
@@ -1027,6 +1125,9 @@ async function saveBackgroundPresets() {
         const saveResult = await saveResponse.json();
         if (!saveResult.success) throw new Error(saveResult.message || '保存配置失败');
 
+        configData.backgroundPresets = Object.assign({}, configData.backgroundPresets, presets);
+        savedConfigData.backgroundPresets = cloneConfig(configData.backgroundPresets);
+
     } catch (error) {
         console.error('保存预设失败:', error);
         throw error;
@@ -49,6 +49,33 @@ function getApiUrl() {
     return `${baseUrl}/api/config`;
 }
 
+// 缩略图的标准宽度（与服务端一致），请求的宽度向上取整到其中一档
+const THUMBNAIL_WIDTHS = [160, 320, 640, 960, 1280, 1920];
+
+// 获取图片缩放到指定显示宽度的地址
+function thumbnailUrl(src, displayWidth) {
+    if (!src || src.startsWith('data:')) {
+        return src;
+    }
+    const target = Math.ceil(displayWidth * (window.devicePixelRatio || 1));
+    const width = THUMBNAIL_WIDTHS.find(w => w >= target) || THUMBNAIL_WIDTHS[THUMBNAIL_WIDTHS.length - 1];
+    return `${window.location.origin}/api/image?src=${encodeURIComponent(src)}&w=${width}`;
+}
+
+// 预加载缩略图，缩略图不可用时（如服务端未安装 Pillow）返回原图地址
+function loadThumbnail(src, displayWidth) {
+    const url = thumbnailUrl(src, displayWidth);
+    if (url === src) {
+        return Promise.resolve(src);
+    }
+    return new Promise(resolve => {
+        const image = new Image();
+        image.onload = () => resolve(url);
+        image.onerror = () => resolve(src);
+        image.src = url;
+    });
+}
+
 // 应用毛玻璃效果设置
 function applyGlassMorphismSettings(backgroundConfig) {
     const profileSection = document.querySelector('.profile-section');
@@ -80,7 +107,10 @@ async function loadConfig() {
             if (result.success && result.data) {
                 console.log('✅ 从API加载配置成功');
                 console.log('📊 配置数据:', result.data);
+                currentConfig = result.data;
+                currentVersion = result.version;
                 renderProfile(result.data);
+                subscribeConfigChanges();
                 return;
             } else {
                 console.error('❌ API返回错误:', result.message || '未知错误');
@@ -107,6 +137,96 @@ async function loadConfig() {
     `;
 }
 
+// 订阅配置变更推送，配置被修改时自动刷新页面内容
+let configStream = null;
+let configRefreshTimer = null;
+// 当前页面使用的配置及其版本，用于增量同步
+let currentConfig = null;
+let currentVersion = null;
+
+function subscribeConfigChanges() {
+    if (configStream || typeof EventSource === 'undefined') {
+        return;
+    }
+
+    configStream = new EventSource(`${getApiUrl()}/stream`);
+    const scheduleRefresh = () => {
+        // 短时间内的多次修改合并为一次刷新
+        clearTimeout(configRefreshTimer);
+        configRefreshTimer = setTimeout(refreshConfig, 300);
+    };
+    configStream.addEventListener('change', scheduleRefresh);
+    configStream.addEventListener('resync', scheduleRefresh);
+}
+
+// 把 JSON Patch 操作应用到配置副本上（只需支持服务端生成的 add / remove / replace）
+function applyConfigPatch(config, ops) {
+    const doc = JSON.parse(JSON.stringify(config));
+    for (const op of ops) {
+        const tokens = op.path.split('/').slice(1)
+            .map(token => token.replace(/~1/g, '/').replace(/~0/g, '~'));
+        if (tokens.length === 0) {
+            return op.value;
+        }
+        const last = tokens.pop();
+        const parent = tokens.reduce((node, token) => node[token], doc);
+        if (Array.isArray(parent)) {
+            if (op.op === 'add') {
+                parent.splice(last === '-' ? parent.length : Number(last), 0, op.value);
+            } else if (op.op === 'remove') {
+                parent.splice(Number(last), 1);
+            } else {
+                parent[Number(last)] = op.value;
+            }
+        } else if (op.op === 'remove') {
+            delete parent[last];
+        } else {
+            parent[last] = op.value;
+        }
+    }
+    return doc;
+}
+
+// 拉取自当前版本以来的修改并重新渲染，无法增量同步时获取完整配置
+async function refreshConfig() {
+    try {
+        let config = null;
+        let version = null;
+        if (currentConfig && currentVersion !== undefined && currentVersion !== null) {
+            const response = await fetch(`${getApiUrl()}/changes?since=${currentVersion}`);
+            if (response.ok) {
+                const result = await response.json();
+                if (result.success) {
+                    config = result.full ? result.data : applyConfigPatch(currentConfig, result.ops);
+                    version = result.version;
+                }
+            }
+        }
+        if (config === null) {
+            const response = await fetch(getApiUrl());
+            if (!response.ok) {
+                return;
+            }
+            const result = await response.json();
+            if (!result.success || !result.data) {
+                return;
+            }
+            config = result.data;
+            version = result.version;
+        }
+
+        if (version === currentVersion) {
+            return;
+        }
+        currentConfig = config;
+        currentVersion = version;
+        console.log(`🔄 配置已更新到版本 ${version}，重新渲染页面`);
+        renderProfile(config);
+    } catch (error) {
+        console.warn('⚠️ 刷新配置失败:', error);
+    }
+}
+
 // 渲染个人信息
 function renderProfile(config) {
     try {
@@ -400,6 +520,8 @@ class MusicPlayer {
         this.playlist = [];
         this.isPlaying = false;
         this.currentSongData = null;
+        // 歌曲 ID -> 服务端返回的歌曲信息
+        this.trackCache = new Map();
 
         this.init();
     }
@@ -435,6 +557,7 @@ class MusicPlayer {
                     }
 
                     if (this.playlist.length > 0) {
+                        await this.loadPlaylistInfo();
                         await this.loadSong(this.playlist[this.currentSongIndex]);
                         // 自动播放
                         this.autoPlay();
@@ -484,13 +607,35 @@ class MusicPlayer {
         }
     }
 
+    async loadPlaylistInfo() {
+        // 一次请求获取整个歌单的歌曲信息（服务端缓存），切歌时不再逐首请求
+        try {
+            const response = await fetch(`${window.location.origin}/api/music/playlist`);
+            if (!response.ok) {
+                throw new Error('API请求失败');
+            }
+            const result = await response.json();
+            for (const track of result.data.tracks) {
+                if (!track.error) {
+                    this.trackCache.set(String(track.id), track);
+                }
+            }
+        } catch (error) {
+            console.error('获取歌单信息失败:', error);
+        }
+    }
+
     async getSongInfo(songId) {
+        const cached = this.trackCache.get(String(songId));
+        if (cached) {
+            return cached;
+        }
         try {
-            // 调用提供的API
-            const response = await fetch(`https://api.paugram.com/netease/?id=${songId}`);
+            const response = await fetch(`${window.location.origin}/api/music/track/${encodeURIComponent(songId)}`);
             if (response.ok) {
-                const data = await response.json();
-                return data;
+                const result = await response.json();
+                this.trackCache.set(String(songId), result.data);
+                return result.data;
             } else {
                 throw new Error('API请求失败');
             }
@@ -796,8 +941,14 @@ function setRightBackground(profile) {
         rightSection.style.position = '';
 
         if (existingImage) {
+            const original = profile.backgroundImage || '';
             existingImage.style.display = 'block';
-            existingImage.src = profile.backgroundImage || '';
+            existingImage.onerror = () => {
+                // 缩略图加载失败时退回原图
+                existingImage.onerror = null;
+                existingImage.src = original;
+            };
+            existingImage.src = thumbnailUrl(original, rightSection.clientWidth || window.innerWidth);
         }
     }
 }
@@ -848,6 +999,9 @@ async function setProfileBackground() {
                 // 检查是否显示背景图片
                 if (config.background && config.background.showBackgroundImage && config.background.profileImage) {
                     console.log('✅ 显示背景图片:', config.background.profileImage);
+                    const profileSection = document.querySelector('.profile-section');
+                    const imageUrl = await loadThumbnail(config.background.profileImage,
+                        (profileSection && profileSection.clientWidth) || window.innerWidth);
                     // 显示背景图片 - 在毛玻璃效果下方添加背景图片
                     styleElement.textContent = `
                         .profile-section::before {
@@ -856,7 +1010,7 @@ async function setProfileBackground() {
                                     rgba(26, 31, 35, 0.8) 0%,
                                     rgba(26, 31, 35, 0.6) 50%,
                                     rgba(26, 31, 35, 0.7) 100%),
-                                url('${config.background.profileImage}') center center / cover no-repeat !important;
+                                url('${imageUrl}') center center / cover no-repeat !important;
                         }
                     `;
                 } else {
@@ -1,17 +1,69 @@
 #!/bin/bash
-# 启动后端服务
+# 启动后端服务；服务已在运行时平滑重启（不断开连接、不拒绝请求）
 
 cd backend
+
+PID_FILE=${PID_FILE:-../run/serve.pid}
+READY_FILE="$PID_FILE.ready"
+# 等待新工作进程预热完成的最长时间（秒）
+READY_TIMEOUT=${READY_TIMEOUT:-60}
+export PID_FILE
+
+# 等待就绪文件的内容变为 $1 以外的存活进程，输出该进程的 PID
+wait_ready() {
+    local exclude=$1
+    for _ in $(seq 1 $((READY_TIMEOUT * 2))); do
+        if [ -f "$READY_FILE" ]; then
+            local pid
+            pid=$(cat "$READY_FILE")
+            if [ -n "$pid" ] && [ "$pid" != "$exclude" ] && kill -0 "$pid" 2>/dev/null; then
+                echo "$pid"
+                return 0
+            fi
+        fi
+        sleep 0.5
+    done
+    return 1
+}
+
+mkdir -p ../logs ../run
+
+if [ -f "$PID_FILE" ] && kill -0 "$(cat "$PID_FILE")" 2>/dev/null; then
+    OLD_PID=$(cat "$PID_FILE")
+    echo "🔄 平滑重启后端服务（旧主进程 $OLD_PID）..."
+    # 新主进程继承监听端口，工作进程预热完成后才开始接受连接，旧进程在此期间照常服务
+    kill -USR2 "$OLD_PID"
+    if NEW_PID=$(wait_ready "$OLD_PID"); then
+        # 旧工作进程处理完进行中的请求后退出（最长 GRACEFUL_TIMEOUT 秒）
+        kill -TERM "$OLD_PID"
+        echo "✅ 新主进程已就绪，PID: $NEW_PID；旧进程正在处理剩余请求后退出"
+    else
+        echo "❌ 新进程在 ${READY_TIMEOUT} 秒内未就绪，继续使用旧进程，请检查 ../logs/console.log"
+        [ -f "$PID_FILE.2" ] && kill -TERM "$(cat "$PID_FILE.2")" 2>/dev/null
+        exit 1
+    fi
+    echo "📋 查看日志: tail -f ../logs/app.log"
+    exit 0
+fi
+
 echo "🚀 启动后端服务..."
 
-# 检查是否有旧进程
-if pgrep -f "python.*app.py" > /dev/null; then
+# 没有 PID 文件的旧进程（开发服务器或早期版本）只能先停止再启动
+if pgrep -f "python.*(app|serve).py" > /dev/null; then
     echo "🛑 停止旧进程..."
-    pkill -f "python.*app.py"
+    pkill -f "python.*(app|serve).py"
     sleep 2
 fi
 
-# 启动服务
-nohup python3 app.py > ../app.log 2>&1 &
-echo "✅ 后端服务已启动，PID: $!"
-echo "📋 查看日志: tail -f ../app.log"
+# 启动服务（多进程生产模式，开发调试可改用 python3 app.py）
+# 工作进程数和线程数可通过 WORKERS / THREADS 环境变量调整
+# 应用日志由程序写入 ../logs/app.log（JSON 行格式，自动轮转）；
+# 这里只收集启动输出和崩溃信息，不再把同一份日志重复写进文件
+nohup python3 serve.py > ../logs/console.log 2>&1 &
+BACKEND_PID=$!
+if wait_ready "" > /dev/null; then
+    echo "✅ 后端服务已启动并完成预热，PID: $BACKEND_PID"
+else
+    echo "⚠️ 后端服务已启动（PID: $BACKEND_PID），但 ${READY_TIMEOUT} 秒内未就绪，请检查 ../logs/console.log"
+fi
+echo "📋 查看日志: tail -f ../logs/app.log"
@@ -1,10 +1,22 @@
 #!/bin/bash
-# 停止后端服务
+# 停止后端服务（进行中的请求处理完后退出）
 
 echo "🛑 停止后端服务..."
 
-if pgrep -f "python.*app.py" > /dev/null; then
-    pkill -f "python.*app.py"
+PID_FILE=${PID_FILE:-run/serve.pid}
+
+# 平滑重启刚完成时新主进程的 PID 还在 .2 文件中，新旧主进程都要通知
+STOPPED=0
+for pid in $(cat "$PID_FILE" "$PID_FILE.2" "$PID_FILE.ready" 2>/dev/null | sort -u); do
+    if kill -TERM "$pid" 2>/dev/null; then
+        STOPPED=1
+    fi
+done
+
+if [ $STOPPED = 1 ]; then
+    echo "✅ 后端服务正在退出"
+elif pgrep -f "python.*(app|serve).py" > /dev/null; then
+    pkill -f "python.*(app|serve).py"
     echo "✅ 后端服务已停止"
 else
     echo "ℹ️ 没有运行中的后端服务"